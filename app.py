@@ -1,10 +1,14 @@
 import streamlit as st
 import os
-import base64
+import time
 import json
-from datetime import datetime
 import config
 import utils
+import jobs
+import metrics
+import rate_limit
+import response_cache
+import hedging
 
 # Configuração da página Streamlit
 st.set_page_config(
@@ -14,57 +18,265 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Função para criar um link de download
-def get_download_link(file_path, link_text, file_format):
+# Função para exibir um botão de download
+# O conteúdo é servido pelo endpoint de mídia do Streamlit, sem ser embutido no HTML da página
+def show_download_button(label, file_format, file_path=None, data=None, file_name=None, key=None):
+    mime_type = "application/pdf" if file_format.lower() == "pdf" else "application/json"
+    file_name = file_name or os.path.basename(file_path)
+    if data is not None:
+        st.download_button(label, data=data, file_name=file_name, mime=mime_type, key=key)
+        return
     with open(file_path, "rb") as file:
-        contents = file.read()
+        st.download_button(label, data=file, file_name=file_name, mime=mime_type, key=key)
+
+# Nomes das seções exibidos durante a geração em streaming
+SECTION_LABELS = {
+    "titulo": "Título",
+    "introducao": "Introdução",
+    "desenvolvimento": "Desenvolvimento",
+    "conclusao": "Conclusão",
+    "referencias": "Referências",
+}
+
+# Nomes dos modos de geração do desenvolvimento exibidos no formulário
+DEVELOPMENT_MODE_LABELS = {
+    "completo": "Chamada única",
+    "esboco": "Esboço + seções em paralelo (mais rápido)",
+}
+
+# Função para exibir um texto gerado em streaming, trecho a trecho
+def stream_to_placeholder(chunks):
+    placeholder = st.empty()
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(text)
+    return text.strip()
+
+# Função para exibir as seções de um trabalho gerado em streaming
+def render_streamed_work(events):
+    placeholders = {}
+    texts = {}
+    for secao, trecho in events:
+        if secao is None:
+            return trecho
+        if secao not in placeholders:
+            st.subheader(SECTION_LABELS.get(secao, secao))
+            placeholders[secao] = st.empty()
+        texts[secao] = texts.get(secao, "") + trecho
+        placeholders[secao].markdown(texts[secao])
+
+# Função para exibir os controles de paginação e retornar o deslocamento da página atual
+def show_page_controls(total, key):
+    page_size = config.HISTORY_PAGE_SIZE
+    pages = max(1, (total + page_size - 1) // page_size)
+    page = min(st.session_state.get(key, 0), pages - 1)
+    # A página é alterada no callback dos botões, antes da próxima execução do script
+    def _go_to(target):
+        st.session_state[key] = target
     
-    b64_contents = base64.b64encode(contents).decode()
-    mime_type = "application/pdf" if file_format.lower() == "pdf" else "application/json"
-    file_name = os.path.basename(file_path)
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("« Anterior", key=f"{key}_prev", disabled=page == 0, on_click=_go_to, args=(page - 1,))
+    with col2:
+        st.caption(f"Página {page + 1} de {pages} ({total} trabalhos)")
+    with col3:
+        st.button("Próxima »", key=f"{key}_next", disabled=page >= pages - 1, on_click=_go_to, args=(page + 1,))
+    return page * page_size
+
+# Função para exibir os detalhes e as ações de um trabalho do histórico
+# Só é chamada para o trabalho aberto, e o PDF só é gerado quando solicitado
+def show_history_item(work):
+    if work.get("snippet"):
+        st.markdown(work["snippet"])
+    st.write(f"**Tema:** {work['tema']}")
+    st.write(f"**Nível Acadêmico:** {work['nivel_academico']}")
+    st.write(f"**Estilo de Referência:** {work['estilo_referencia']}")
+    
+    # Botões para carregar e exportar
+    file_path = os.path.join(config.HISTORY_FOLDER, work['filename'])
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Carregar Trabalho", key=f"load_{work['filename']}"):
+            work_data = utils.load_work_from_json(file_path)
+            work_data["json_filename"] = file_path
+            st.session_state["current_work"] = work_data
+            st.session_state["page"] = "view"
+            st.rerun()
     
-    href = f'<a href="data:{mime_type};base64,{b64_contents}" download="{file_name}">{link_text}</a>'
-    return href
+    with col2:
+        if st.button("Exportar para PDF", key=f"export_{work['filename']}"):
+            work_data = utils.load_work_from_json(file_path)
+            pdf_path = utils.export_to_pdf(work_data)
+            show_download_button("Baixar PDF", "pdf", pdf_path, file_name=f"{work['id'] or 'trabalho'}.pdf", key=f"download_{work['filename']}")
 
 # Função para exibir o histórico de trabalhos
 def show_history():
     st.header("Histórico de Trabalhos Gerados")
     
-    history = utils.get_work_history()
+    # Busca no título, tema, texto e referências dos trabalhos salvos
+    query = st.text_input("Buscar", placeholder="Ex: inteligência artificial educação")
+    
+    # Filtros aplicados na consulta ao índice, antes da paginação
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        nivel = st.selectbox("Nível Acadêmico", ["Todos"] + config.ACADEMIC_LEVELS, key="history_nivel")
+    with col2:
+        estilo = st.selectbox("Estilo de Referência", ["Todos"] + config.REFERENCE_STYLES, key="history_estilo")
+    with col3:
+        periodo = st.date_input("Período", value=(), format="DD/MM/YYYY", key="history_periodo")
+    filters = {
+        "nivel_academico": None if nivel == "Todos" else nivel,
+        "estilo_referencia": None if estilo == "Todos" else estilo,
+        "date_from": periodo[0].isoformat() if len(periodo) > 0 else None,
+        "date_to": periodo[-1].isoformat() if len(periodo) > 0 else None,
+    }
+    
+    # Uma nova busca ou novos filtros voltam para a primeira página
+    signature = (query, tuple(filters.values()))
+    if signature != st.session_state.get("history_signature"):
+        st.session_state["history_signature"] = signature
+        st.session_state["history_page"] = 0
+        st.session_state.pop("history_open", None)
     
-    if not history:
+    if query.strip():
+        total = utils.count_search(query, filters)
+    else:
+        total = utils.count_works(filters)
+    if not total:
         st.info("Nenhum trabalho encontrado no histórico.")
         return
     
-    for i, work in enumerate(history):
-        with st.expander(f"{work['titulo']} - {work['date_created']}"):
-            st.write(f"**Tema:** {work['tema']}")
-            st.write(f"**Nível Acadêmico:** {work['nivel_academico']}")
-            st.write(f"**Estilo de Referência:** {work['estilo_referencia']}")
+    offset = show_page_controls(total, "history_page")
+    if query.strip():
+        history = utils.search_works(query, limit=config.HISTORY_PAGE_SIZE, offset=offset, filters=filters)
+    else:
+        history = utils.get_work_history(limit=config.HISTORY_PAGE_SIZE, offset=offset, filters=filters)
+    
+    # Cada trabalho é exibido em uma linha; os detalhes e as ações aparecem apenas para o trabalho aberto
+    def _toggle(filename):
+        if st.session_state.get("history_open") == filename:
+            st.session_state.pop("history_open")
+        else:
+            st.session_state["history_open"] = filename
+    
+    for work in history:
+        is_open = st.session_state.get("history_open") == work["filename"]
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.markdown(f"**{work['titulo']}** - {work['date_created']}")
+        with col2:
+            st.button("Fechar" if is_open else "Abrir", key=f"open_{work['filename']}", on_click=_toggle, args=(work["filename"],))
+        if is_open:
+            with st.container(border=True):
+                show_history_item(work)
+
+# Função para acompanhar um trabalho gerado em segundo plano
+def show_job_status(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        del st.query_params["job"]
+        return
+    
+    if job["status"] == jobs.STATUS_DONE:
+        # Trabalho concluído: carrega o resultado salvo no histórico
+        work_data = utils.load_work_from_json(job["json_filename"])
+        work_data["json_filename"] = job["json_filename"]
+        st.session_state["current_work"] = work_data
+        st.session_state["page"] = "view"
+        del st.query_params["job"]
+        st.rerun()
+    elif job["status"] == jobs.STATUS_FAILED:
+        st.error(f"Erro ao gerar o trabalho: {job['error']}")
+        if "API key not available" in (job["error"] or ""):
+            st.warning("Verifique se você configurou a chave da API do Google Gemini no arquivo config.py.")
+        if st.button("Fechar"):
+            del st.query_params["job"]
+            st.rerun()
+    else:
+        # Trabalho na fila ou em execução: exibe o texto parcial e consulta novamente
+        if job["status"] == jobs.STATUS_QUEUED:
+            st.info(f"Trabalho sobre \"{job['tema']}\" aguardando na fila...")
+        else:
+            st.info(f"Gerando trabalho sobre \"{job['tema']}\"... Você pode sair e voltar a este endereço depois.")
+        if st.button("Cancelar"):
+            jobs.cancel_job(job_id)
+            st.rerun()
+        for secao, texto in job["progress"].items():
+            st.subheader(SECTION_LABELS.get(secao, secao))
+            st.markdown(texto)
+        time.sleep(config.JOB_POLL_INTERVAL)
+        st.rerun()
+
+# Função para iniciar a geração de um trabalho, na fila de segundo plano ou exibindo o texto gerado
+def start_generation(tema, nivel_academico, estilo_referencia, modo_desenvolvimento, warm_start=None):
+    if config.BACKGROUND_JOBS_ENABLED:
+        # Envia a geração para a fila de segundo plano
+        st.query_params["job"] = jobs.submit_job(tema, nivel_academico, estilo_referencia, modo_desenvolvimento, warm_start)
+        st.rerun()
+        return
+    
+    with st.spinner("Gerando trabalho acadêmico... Isso pode levar alguns minutos."):
+        try:
+            # Gera o trabalho acadêmico, exibindo o texto à medida que é gerado
+            if config.STREAMING_ENABLED:
+                work_data = render_streamed_work(utils.stream_academic_work(tema, nivel_academico, estilo_referencia, development_mode=modo_desenvolvimento, warm_start=warm_start))
+            else:
+                work_data = utils.generate_academic_work(tema, nivel_academico, estilo_referencia, development_mode=modo_desenvolvimento, warm_start=warm_start)
             
-            # Botões para carregar e exportar
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button(f"Carregar Trabalho", key=f"load_{i}"):
-                    file_path = os.path.join(config.HISTORY_FOLDER, work['filename'])
-                    st.session_state["current_work"] = utils.load_work_from_json(file_path)
-                    st.session_state["page"] = "view"
-                    st.rerun()
+            # Armazena o trabalho na sessão
+            st.session_state["current_work"] = work_data
+            st.session_state["page"] = "view"
             
-            with col2:
-                if st.button(f"Exportar para PDF", key=f"export_{i}"):
-                    file_path = os.path.join(config.HISTORY_FOLDER, work['filename'])
-                    work_data = utils.load_work_from_json(file_path)
-                    
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    pdf_filename = f"{config.HISTORY_FOLDER}/{timestamp}_{work['id']}.pdf"
-                    
-                    pdf_path = utils.export_to_pdf(work_data, pdf_filename)
-                    st.markdown(get_download_link(pdf_path, "Baixar PDF", "pdf"), unsafe_allow_html=True)
+            st.success("Trabalho gerado com sucesso!")
+            st.rerun()
+        except Exception as e:
+            st.error(f"Erro ao gerar o trabalho: {str(e)}")
+            if "API key not available" in str(e):
+                st.warning("Verifique se você configurou a chave da API do Google Gemini no arquivo config.py.")
+
+# Função para oferecer os trabalhos do histórico com tema quase idêntico antes de gerar um novo
+def show_similar_works(request):
+    # As escolhas são feitas nos callbacks dos botões, antes da próxima execução do script
+    def _open(filename):
+        st.session_state.pop("similar_request", None)
+        file_path = os.path.join(config.HISTORY_FOLDER, filename)
+        work_data = utils.load_work_from_json(file_path)
+        work_data["json_filename"] = file_path
+        st.session_state["current_work"] = work_data
+        st.session_state["page"] = "view"
+    
+    def _generate(filename):
+        pending = dict(st.session_state.pop("similar_request"))
+        pending.pop("similares")
+        if filename:
+            pending["warm_start"] = utils.warm_start_from_work(utils.load_work_from_json(os.path.join(config.HISTORY_FOLDER, filename)))
+        st.session_state["pending_generation"] = pending
+    
+    st.info("Já existem trabalhos com tema semelhante no histórico. Você pode abrir um deles ou usar o título e o esboço como ponto de partida.")
+    for work in request["similares"]:
+        st.markdown(f"**{work['titulo']}** - {work['tema']} ({work['nivel_academico']}, {work['estilo_referencia']}) · similaridade {work['score']:.0%}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("Abrir Trabalho", key=f"similar_open_{work['filename']}", on_click=_open, args=(work["filename"],))
+        with col2:
+            st.button("Usar Título e Esboço", key=f"similar_warm_{work['filename']}", on_click=_generate, args=(work["filename"],))
+    st.button("Gerar Novo Trabalho Mesmo Assim", key="similar_ignore", on_click=_generate, args=(None,))
 
 # Função para exibir o formulário de geração de trabalho
 def show_generation_form():
     st.header("Gerador de Trabalhos Acadêmicos")
+    
+    # O ID do trabalho em andamento fica na URL para sobreviver a recarregamentos da página
+    if "job" in st.query_params:
+        show_job_status(st.query_params["job"])
+        return
+    
+    # Geração escolhida na oferta de trabalhos similares
+    if "pending_generation" in st.session_state:
+        start_generation(**st.session_state.pop("pending_generation"))
+        return
+    
     st.write("Preencha os campos abaixo para gerar um trabalho acadêmico completo.")
     
     with st.form("generation_form"):
@@ -77,26 +289,36 @@ def show_generation_form():
         with col2:
             estilo_referencia = st.selectbox("Estilo de Referência", config.REFERENCE_STYLES)
         
+        modos = {DEVELOPMENT_MODE_LABELS.get(modo, modo): modo for modo in config.DEVELOPMENT_MODES}
+        modo_label = st.radio(
+            "Geração do Desenvolvimento",
+            list(modos),
+            index=config.DEVELOPMENT_MODES.index(config.DEVELOPMENT_MODE),
+            horizontal=True,
+        )
+        modo_desenvolvimento = modos[modo_label]
+        
         submit_button = st.form_submit_button("Gerar Trabalho")
         
         if submit_button and tema:
-            with st.spinner("Gerando trabalho acadêmico... Isso pode levar alguns minutos."):
-                try:
-                    # Gera o trabalho acadêmico
-                    work_data = utils.generate_academic_work(tema, nivel_academico, estilo_referencia)
-                    
-                    # Armazena o trabalho na sessão
-                    st.session_state["current_work"] = work_data
-                    st.session_state["page"] = "view"
-                    
-                    st.success("Trabalho gerado com sucesso!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Erro ao gerar o trabalho: {str(e)}")
-                    if "API key not available" in str(e):
-                        st.warning("Verifique se você configurou a chave da API do Google Gemini no arquivo config.py.")
+            request = {
+                "tema": tema,
+                "nivel_academico": nivel_academico,
+                "estilo_referencia": estilo_referencia,
+                "modo_desenvolvimento": modo_desenvolvimento,
+            }
+            # Antes de gerar, procura no histórico trabalhos com tema quase idêntico
+            similares = utils.find_similar_works(tema, nivel_academico) if config.SIMILARITY_ENABLED else []
+            if similares:
+                st.session_state["similar_request"] = dict(request, similares=similares)
+            else:
+                st.session_state.pop("similar_request", None)
+                start_generation(**request)
         elif submit_button:
             st.warning("Por favor, preencha o tema do trabalho.")
+    
+    if "similar_request" in st.session_state:
+        show_similar_works(st.session_state["similar_request"])
 
 # Função para exibir o trabalho gerado
 def show_work_view():
@@ -131,26 +353,14 @@ def show_work_view():
     col1, col2 = st.columns(2)
     with col1:
         if st.button("Exportar para PDF"):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_filename = f"{config.HISTORY_FOLDER}/{timestamp}_{work.get('id', 'novo')}.pdf"
-            
-            pdf_path = utils.export_to_pdf(work, pdf_filename)
-            st.markdown(get_download_link(pdf_path, "Baixar PDF", "pdf"), unsafe_allow_html=True)
+            pdf_path = utils.export_to_pdf(work)
+            show_download_button("Baixar PDF", "pdf", pdf_path, file_name=f"{work.get('id', 'trabalho')}.pdf")
     
     with col2:
         if st.button("Exportar para JSON"):
-            if "json_filename" in work:
-                json_path = work["json_filename"]
-                st.markdown(get_download_link(json_path, "Baixar JSON", "json"), unsafe_allow_html=True)
-            else:
-                # Se o trabalho não tiver um arquivo JSON associado, cria um novo
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                json_filename = f"{config.HISTORY_FOLDER}/{timestamp}_{work.get('id', 'novo')}.json"
-                
-                with open(json_filename, "w", encoding="utf-8") as f:
-                    json.dump(work, f, ensure_ascii=False, indent=4)
-                
-                st.markdown(get_download_link(json_filename, "Baixar JSON", "json"), unsafe_allow_html=True)
+            # O registro salvo pode conter apenas referências às seções; serve o trabalho completo sem gravar uma cópia
+            json_data = json.dumps({k: v for k, v in work.items() if k != "json_filename"}, ensure_ascii=False, indent=4)
+            show_download_button("Baixar JSON", "json", data=json_data, file_name=f"{work.get('id', 'novo')}.json")
     
     # Exibição das seções do trabalho
     st.header("Introdução")
@@ -161,35 +371,67 @@ def show_work_view():
             if st.button("Expandir Introdução"):
                 with st.spinner("Expandindo introdução..."):
                     model = utils.setup_gemini_api()
-                    work["introducao"] = utils.expand_section(model, work["introducao"], "Introdução", work["nivel_academico"])
+                    work = utils.save_section_edit(work, {"introducao": stream_to_placeholder(utils.expand_section(model, work["introducao"], "Introdução", work["nivel_academico"], stream=True))})
                     st.session_state["current_work"] = work
                     st.rerun()
         with col2:
             if st.button("Reescrever Introdução"):
                 with st.spinner("Reescrevendo introdução..."):
                     model = utils.setup_gemini_api()
-                    work["introducao"] = utils.rewrite_section(model, work["introducao"], "Introdução", work["nivel_academico"])
+                    work = utils.save_section_edit(work, {"introducao": stream_to_placeholder(utils.rewrite_section(model, work["introducao"], "Introdução", work["nivel_academico"], stream=True))})
                     st.session_state["current_work"] = work
                     st.rerun()
     
     st.header("Desenvolvimento")
     with st.expander("Ver Desenvolvimento", expanded=True):
         st.write(work["desenvolvimento"])
+        
+        # Com subtítulos, cada subseção é processada em uma chamada própria, em paralelo
+        subsecoes = utils.split_subsections(work["desenvolvimento"])
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Expandir Desenvolvimento"):
                 with st.spinner("Expandindo desenvolvimento..."):
                     model = utils.setup_gemini_api()
-                    work["desenvolvimento"] = utils.expand_section(model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"])
+                    if len(subsecoes) > 1:
+                        work = utils.save_section_edit(work, {"desenvolvimento": utils.process_subsections(utils.expand_section, model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"])})
+                    else:
+                        work = utils.save_section_edit(work, {"desenvolvimento": stream_to_placeholder(utils.expand_section(model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"], stream=True))})
                     st.session_state["current_work"] = work
                     st.rerun()
         with col2:
             if st.button("Reescrever Desenvolvimento"):
                 with st.spinner("Reescrevendo desenvolvimento..."):
                     model = utils.setup_gemini_api()
-                    work["desenvolvimento"] = utils.rewrite_section(model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"])
+                    if len(subsecoes) > 1:
+                        work = utils.save_section_edit(work, {"desenvolvimento": utils.process_subsections(utils.rewrite_section, model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"])})
+                    else:
+                        work = utils.save_section_edit(work, {"desenvolvimento": stream_to_placeholder(utils.rewrite_section(model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"], stream=True))})
                     st.session_state["current_work"] = work
                     st.rerun()
+        
+        # Expansão ou reescrita de uma única subseção
+        if len(subsecoes) > 1:
+            indice = st.selectbox(
+                "Subseção",
+                range(len(subsecoes)),
+                format_func=lambda i: utils.subsection_title(subsecoes[i]) or "Texto inicial",
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Expandir Subseção"):
+                    with st.spinner("Expandindo subseção..."):
+                        model = utils.setup_gemini_api()
+                        work = utils.save_section_edit(work, {"desenvolvimento": utils.process_subsections(utils.expand_section, model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"], indices=[indice])})
+                        st.session_state["current_work"] = work
+                        st.rerun()
+            with col2:
+                if st.button("Reescrever Subseção"):
+                    with st.spinner("Reescrevendo subseção..."):
+                        model = utils.setup_gemini_api()
+                        work = utils.save_section_edit(work, {"desenvolvimento": utils.process_subsections(utils.rewrite_section, model, work["desenvolvimento"], "Desenvolvimento", work["nivel_academico"], indices=[indice])})
+                        st.session_state["current_work"] = work
+                        st.rerun()
     
     st.header("Conclusão")
     with st.expander("Ver Conclusão", expanded=True):
@@ -199,23 +441,42 @@ def show_work_view():
             if st.button("Expandir Conclusão"):
                 with st.spinner("Expandindo conclusão..."):
                     model = utils.setup_gemini_api()
-                    work["conclusao"] = utils.expand_section(model, work["conclusao"], "Conclusão", work["nivel_academico"])
+                    work = utils.save_section_edit(work, {"conclusao": stream_to_placeholder(utils.expand_section(model, work["conclusao"], "Conclusão", work["nivel_academico"], stream=True))})
                     st.session_state["current_work"] = work
                     st.rerun()
         with col2:
             if st.button("Reescrever Conclusão"):
                 with st.spinner("Reescrevendo conclusão..."):
                     model = utils.setup_gemini_api()
-                    work["conclusao"] = utils.rewrite_section(model, work["conclusao"], "Conclusão", work["nivel_academico"])
+                    work = utils.save_section_edit(work, {"conclusao": stream_to_placeholder(utils.rewrite_section(model, work["conclusao"], "Conclusão", work["nivel_academico"], stream=True))})
                     st.session_state["current_work"] = work
                     st.rerun()
     
     st.header("Referências")
     with st.expander("Ver Referências", expanded=True):
         st.write(work["referencias"])
+    
+    # Revisões registradas no diário de edições do trabalho salvo
+    revisions = utils.list_revisions(work["json_filename"]) if work.get("json_filename") else []
+    if revisions:
+        with st.expander("Revisões"):
+            labels = {f"Revisão {r['revision']} - {r['date']}" + ("" if r["revision"] else " (original)"): r["revision"] for r in reversed(revisions)}
+            label = st.selectbox("Revisão", list(labels))
+            if st.button("Restaurar Revisão"):
+                old_work = utils.load_work_revision(work["json_filename"], labels[label])
+                changes = {name: old_work[name] for name in ("introducao", "desenvolvimento", "conclusao", "referencias")
+                           if name in old_work and old_work[name] != work.get(name)}
+                if changes:
+                    work = utils.save_section_edit(work, changes)
+                    st.session_state["current_work"] = work
+                st.rerun()
 
 # Função principal
 def main():
+    # Retoma os trabalhos em segundo plano interrompidos por um reinício do servidor
+    if config.BACKGROUND_JOBS_ENABLED:
+        jobs.start_workers()
+    
     # Inicializa o estado da sessão se necessário
     if "page" not in st.session_state:
         st.session_state["page"] = "generate"
@@ -243,6 +504,29 @@ def main():
         st.write("Este sistema utiliza IA para gerar trabalhos acadêmicos completos.")
         st.write("Desenvolvido com Google Gemini API.")
         
+        # Estatísticas de desempenho do processo
+        with st.expander("Estatísticas"):
+            summary = metrics.collector.summary()
+            for row in summary:
+                st.caption(f"**{row['stage']}**: {row['calls']} chamadas · média {row['avg_wall_s']} s · "
+                           f"p95 ≤ {row['p95_wall_s']} s · tokens {row['prompt_tokens']}/{row['response_tokens']} · "
+                           f"cache {row['cache_hit_rate']:.0%} · erros {row['errors']}")
+            if not summary:
+                st.caption("Nenhuma chamada registrada ainda.")
+            limits = rate_limit.get_limiter().metrics()
+            st.caption(f"Espera média pela cota: {limits['avg_queue_ms']} ms · "
+                       f"Latência média da API: {limits['avg_api_ms']} ms · "
+                       f"Novas tentativas: {limits['retries']}")
+            cache_stats = response_cache.get_cache().stats()
+            st.caption(f"Cache: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, "
+                       f"{cache_stats['entries']} entradas")
+            if config.HEDGE_ENABLED:
+                hedge_stats = hedging.get_hedger().stats()
+                st.caption(f"Chamadas duplicadas: {hedge_stats['hedges']} de {hedge_stats['calls']} · "
+                           f"responderam primeiro: {hedge_stats['hedge_wins']}")
+            st.download_button("Métricas (Prometheus)", data=metrics.collector.render(),
+                               file_name="metrics.prom", mime="text/plain")
+        
         # Verificação da API key
         if config.GEMINI_API_KEY == "SUA_CHAVE_API_AQUI":
             st.warning("⚠️ Configure sua chave API no arquivo config.py")
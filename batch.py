@@ -0,0 +1,183 @@
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import config
+import utils
+
+# Geração em lote de trabalhos acadêmicos a partir de um arquivo JSONL
+# Cada linha descreve um trabalho: {"tema": ..., "nivel_academico": ..., "estilo_referencia": ...}
+# e, opcionalmente, o modo de geração do desenvolvimento ("modo_desenvolvimento": "completo" ou "esboco")
+# O progresso é registrado em um arquivo à parte, permitindo retomar a execução após uma falha
+
+def _digest(job):
+    return hashlib.sha1(json.dumps(job, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+def job_key(job, occurrence=1):
+    """
+    Identifica um trabalho do lote: usa o campo "id" se existir, senão o hash do conteúdo
+
+    A chave não depende da posição no arquivo, então inserir ou remover linhas não altera as demais;
+    linhas repetidas são distinguidas pela ordem de ocorrência (occurrence)
+    """
+    if job.get("id"):
+        return str(job["id"])
+    digest = _digest(job)
+    return digest if occurrence == 1 else f"{digest}#{occurrence}"
+
+def read_jobs(path):
+    """
+    Lê os trabalhos do arquivo JSONL, ignorando linhas vazias
+
+    Returns:
+        Tupla (lista de tuplas (chave, trabalho), lista de tuplas (número da linha, erro))
+        com as linhas que não contêm um objeto JSON válido
+    """
+    jobs = []
+    invalid = []
+    occurrences = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                invalid.append((line_number, f"JSON inválido: {e}"))
+                continue
+            if not isinstance(job, dict):
+                invalid.append((line_number, "a linha deve conter um objeto JSON"))
+                continue
+            digest = _digest(job)
+            occurrences[digest] = occurrences.get(digest, 0) + 1
+            jobs.append((job_key(job, occurrences[digest]), job))
+    return jobs, invalid
+
+def read_completed(progress_path):
+    """
+    Lê do arquivo de progresso as chaves dos trabalhos já concluídos com sucesso
+    """
+    completed = set()
+    try:
+        with open(progress_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha truncada por uma interrupção
+                    continue
+                if entry.get("status") == "done":
+                    completed.add(entry["job"])
+    except FileNotFoundError:
+        pass
+    return completed
+
+def validate_job(job):
+    """
+    Verifica se o trabalho tem tema, nível acadêmico e estilo de referência válidos
+    """
+    if not job.get("tema"):
+        raise ValueError("Campo 'tema' ausente")
+    if not isinstance(job["tema"], str):
+        raise ValueError(f"Campo 'tema' deve ser um texto: {job['tema']!r}")
+    if job.get("nivel_academico") not in config.ACADEMIC_LEVELS:
+        raise ValueError(f"Nível acadêmico inválido: {job.get('nivel_academico')!r}")
+    if job.get("estilo_referencia") not in config.REFERENCE_STYLES:
+        raise ValueError(f"Estilo de referência inválido: {job.get('estilo_referencia')!r}")
+    if job.get("modo_desenvolvimento") and job["modo_desenvolvimento"] not in config.DEVELOPMENT_MODES:
+        raise ValueError(f"Modo de desenvolvimento inválido: {job['modo_desenvolvimento']!r}")
+
+def run_job(job, use_cache=True):
+    """
+    Gera e salva um trabalho do lote
+
+    Returns:
+        Caminho do arquivo JSON salvo
+    """
+    validate_job(job)
+    work_data = utils.generate_academic_work(
+        job["tema"], job["nivel_academico"], job["estilo_referencia"], use_cache=use_cache,
+        development_mode=job.get("modo_desenvolvimento"),
+    )
+    return work_data["json_filename"]
+
+def run_batch(jobs_path, workers, progress_path=None, use_cache=True):
+    """
+    Executa todos os trabalhos pendentes do arquivo JSONL com concorrência limitada
+
+    Args:
+        jobs_path: Caminho do arquivo JSONL com os trabalhos
+        workers: Número de trabalhos gerados simultaneamente
+        progress_path: Arquivo de progresso (padrão: <jobs_path>.progress)
+        use_cache: Se False, ignora o cache de respostas do modelo
+
+    Returns:
+        Dicionário com o resumo da execução
+    """
+    progress_path = progress_path or f"{jobs_path}.progress"
+    jobs, invalid = read_jobs(jobs_path)
+    completed = read_completed(progress_path)
+    pending = [(key, job) for key, job in jobs if key not in completed]
+
+    # Linhas malformadas são informadas e ignoradas, sem interromper o restante do lote
+    for line_number, error in invalid:
+        print(f"Linha {line_number} ignorada: {error}", file=sys.stderr)
+    print(f"{len(jobs)} trabalhos no lote, {len(jobs) - len(pending)} já concluídos, {len(pending)} pendentes")
+
+    done = 0
+    failed = 0
+    start = time.monotonic()
+
+    with open(progress_path, "a", encoding="utf-8") as progress, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, job, use_cache): key for key, job in pending}
+        for future in as_completed(futures):
+            key = futures[future]
+            entry = {"job": key, "finished_at": time.time()}
+            try:
+                entry["json_filename"] = future.result()
+                entry["status"] = "done"
+                done += 1
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                failed += 1
+                print(f"Falha no trabalho {key}: {e}", file=sys.stderr)
+
+            # Cada resultado é gravado imediatamente para que a execução possa ser retomada
+            progress.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            progress.flush()
+
+            elapsed = time.monotonic() - start
+            finished = done + failed
+            print(f"[{finished}/{len(pending)}] {done} concluídos, {failed} falhas, "
+                  f"{finished / elapsed * 60:.1f} trabalhos/min")
+
+    elapsed = time.monotonic() - start
+    summary = {
+        "total": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "done": done,
+        "failed": failed,
+        "invalid_lines": [line_number for line_number, _ in invalid],
+        "elapsed_seconds": round(elapsed, 2),
+        "works_per_minute": round(done / elapsed * 60, 2) if elapsed > 0 else 0.0,
+    }
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera trabalhos acadêmicos em lote a partir de um arquivo JSONL")
+    parser.add_argument("jobs", help="Arquivo JSONL com tema, nivel_academico e estilo_referencia por linha")
+    parser.add_argument("-w", "--workers", type=int, default=config.BATCH_WORKERS,
+                        help=f"Número de trabalhos gerados simultaneamente (padrão: {config.BATCH_WORKERS})")
+    parser.add_argument("--progress", help="Arquivo de progresso usado para retomar a execução (padrão: <jobs>.progress)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora o cache de respostas do modelo")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.jobs, args.workers, args.progress, use_cache=not args.no_cache)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if summary["failed"] or summary["invalid_lines"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import utils
+
+# Benchmark da exportação para PDF
+# Renderiza trabalhos sintéticos de 10 mil a 200 mil caracteres e mede tempo e pico de memória
+
+SIZES = [10000, 50000, 100000, 200000]
+
+WORDS = ("educação tecnologia análise pesquisa desenvolvimento inteligência artificial "
+         "aprendizagem sociedade método resultado teoria crítica – “conceito” contexto").split()
+
+def make_work(size, seed=0):
+    """
+    Monta um trabalho sintético determinístico cujo desenvolvimento tem aproximadamente `size` caracteres
+    """
+    rng = random.Random(seed)
+
+    def paragraph(n_words):
+        words = [rng.choice(WORDS) for _ in range(n_words)]
+        return (" ".join(words)).capitalize() + "."
+
+    blocks = []
+    length = 0
+    section = 1
+    while length < size:
+        blocks.append(f"{section}. Seção sobre {rng.choice(WORDS)}")
+        for _ in range(4):
+            blocks.append(paragraph(rng.randint(60, 120)))
+        length = sum(len(b) + 2 for b in blocks)
+        section += 1
+
+    return {
+        "id": f"bench-{size}",
+        "titulo": "Trabalho sintético para benchmark de exportação",
+        "tema": "Benchmark",
+        "nivel_academico": "Pós-Graduação",
+        "estilo_referencia": "ABNT",
+        "date_created": "2024-01-01 00:00:00",
+        "introducao": "\n\n".join(paragraph(100) for _ in range(4)),
+        "desenvolvimento": "\n\n".join(blocks),
+        "conclusao": "\n\n".join(paragraph(80) for _ in range(3)),
+        "referencias": "\n".join(f"AUTOR, {i}. Obra {i}. Editora, 20{i:02d}." for i in range(15)),
+    }
+
+def measure(work, output_dir, repeat):
+    """
+    Retorna o menor tempo de renderização (em segundos) e o pico de memória (em bytes)
+    """
+    times = []
+    for i in range(repeat):
+        output = os.path.join(output_dir, f"{work['id']}_{i}.pdf")
+        start = time.perf_counter()
+        utils.export_to_pdf(work, output)
+        times.append(time.perf_counter() - start)
+
+    # O pico de memória é medido em uma execução separada, pois o tracemalloc deixa a execução mais lenta
+    tracemalloc.start()
+    utils.export_to_pdf(work, os.path.join(output_dir, f"{work['id']}_mem.pdf"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da exportação de trabalhos para PDF")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Tamanhos do desenvolvimento em caracteres")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por tamanho (vale o menor tempo)")
+    parser.add_argument("--output", help="Arquivo JSON onde gravar os resultados")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size in args.sizes:
+            work = make_work(size)
+            chars = sum(len(work[field]) for field in utils.PDF_FIELDS)
+            seconds, peak = measure(work, output_dir, args.repeat)
+            results.append({
+                "size": size,
+                "chars": chars,
+                "seconds": round(seconds, 4),
+                "peak_memory_bytes": peak,
+            })
+            print(f"{size:>8} caracteres: {seconds * 1000:9.1f} ms  pico de memória {peak / 1024 / 1024:7.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "export_to_pdf", "results": results}, f, indent=4)
+    return results
+
+if __name__ == "__main__":
+    main()
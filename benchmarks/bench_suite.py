@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+import utils
+import bench_pdf
+from fake_gemini import FakeGenerativeModel
+
+# Suíte de benchmarks offline
+# Usa o modelo falso no lugar da API do Gemini e grava os resultados em JSON para comparação entre execuções
+
+HISTORY_SIZES = [10, 100, 1000, 10000]
+
+def timed(func, repeat):
+    """
+    Executa a função `repeat` vezes e retorna os tempos de cada execução em segundos
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+def summarize(name, times, **params):
+    result = {
+        "benchmark": name,
+        "params": params,
+        "runs": len(times),
+        "mean_s": round(statistics.mean(times), 6),
+        "min_s": round(min(times), 6),
+        "max_s": round(max(times), 6),
+    }
+    print(f"{name:<32} {json.dumps(params, ensure_ascii=False):<40} "
+          f"média {result['mean_s'] * 1000:10.2f} ms  mín {result['min_s'] * 1000:10.2f} ms")
+    return result
+
+def bench_generation(model, repeat):
+    """
+    Mede o pipeline completo de generate_academic_work em cada modo de geração do desenvolvimento
+    """
+    results = []
+    for mode in config.DEVELOPMENT_MODES:
+        times = timed(lambda: utils.generate_academic_work("Impacto da IA na Educação", "Graduação", "ABNT",
+                                                           development_mode=mode), repeat)
+        results.append(summarize("generate_academic_work", times, mode=mode, latency=model.latency,
+                                 output_chars=model.output_chars))
+    return results
+
+def bench_sections(model, repeat):
+    """
+    Mede expand_section e rewrite_section sobre um desenvolvimento gerado pelo modelo falso
+    """
+    section = model._text_for("desenvolvimento")
+    results = []
+    for func in (utils.expand_section, utils.rewrite_section):
+        times = timed(lambda: func(model, section, "Desenvolvimento", "Graduação"), repeat)
+        results.append(summarize(func.__name__, times, latency=model.latency, section_chars=len(section)))
+    return results
+
+def bench_save(model, repeat):
+    """
+    Mede save_work_to_json com um trabalho de tamanho realista
+    """
+    work = bench_pdf.make_work(20000)
+    times = timed(lambda: utils.save_work_to_json(dict(work)), repeat)
+    return [summarize("save_work_to_json", times, chars=len(work["desenvolvimento"]))]
+
+def _write_stored_works(count, start, section_chars):
+    # Grava os arquivos diretamente, como faria save_work_to_json, sem atualizar o índice
+    os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
+    body = ("texto " * (section_chars // 6))[:section_chars]
+    for i in range(start, start + count):
+        work = {
+            "id": f"bench-{i}",
+            "titulo": f"Trabalho {i}",
+            "tema": f"Tema {i % 97}",
+            "nivel_academico": config.ACADEMIC_LEVELS[i % len(config.ACADEMIC_LEVELS)],
+            "estilo_referencia": config.REFERENCE_STYLES[i % len(config.REFERENCE_STYLES)],
+            "date_created": (datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "introducao": body,
+            "desenvolvimento": body * 3,
+            "conclusao": body,
+            "referencias": body,
+        }
+        with open(os.path.join(config.HISTORY_FOLDER, f"bench_{i:07d}.json"), "w", encoding="utf-8") as f:
+            json.dump(work, f, ensure_ascii=False, indent=4)
+
+def bench_history(sizes, repeat, section_chars):
+    """
+    Mede get_work_history para diferentes quantidades de trabalhos salvos:
+    primeira consulta (índice reconstruído), consulta após um novo trabalho e consultas repetidas
+    """
+    results = []
+    stored = 0
+    for size in sorted(sizes):
+        _write_stored_works(size - stored, stored, section_chars)
+        stored = size
+
+        if os.path.exists(config.HISTORY_INDEX_FILE):
+            os.remove(config.HISTORY_INDEX_FILE)
+        results.append(summarize("get_work_history[cold]", timed(lambda: utils.get_work_history(limit=20), 1), works=size))
+
+        utils.save_work_to_json({"titulo": "novo", "tema": "novo"})
+        stored += 1
+        results.append(summarize("get_work_history[after_save]", timed(lambda: utils.get_work_history(limit=20), 1), works=stored))
+
+        results.append(summarize("get_work_history[page]", timed(lambda: utils.get_work_history(limit=20, offset=stored // 2), repeat), works=stored))
+        results.append(summarize("get_work_history[all]", timed(utils.get_work_history, repeat), works=stored))
+    return results
+
+def bench_export(sizes, repeat):
+    """
+    Mede export_to_pdf para trabalhos sintéticos de diferentes tamanhos
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size in sizes:
+            work = bench_pdf.make_work(size)
+            output = os.path.join(output_dir, "bench.pdf")
+            times = timed(lambda: utils.export_to_pdf(work, output), repeat)
+            results.append(summarize("export_to_pdf", times, chars=size))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline do gerador de trabalhos acadêmicos")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada por chamada ao modelo, em segundos")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Variação aleatória máxima da latência, em segundos")
+    parser.add_argument("--output-chars", type=int, default=4000, help="Tamanho de cada resposta do modelo falso")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidade de erro 429 por chamada")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições de cada medição")
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=HISTORY_SIZES,
+                        help="Quantidades de trabalhos salvos para o benchmark do histórico (ex.: 10 100 1000 100000)")
+    parser.add_argument("--history-section-chars", type=int, default=1000, help="Tamanho das seções dos trabalhos salvos")
+    parser.add_argument("--pdf-sizes", type=int, nargs="+", default=[10000, 100000], help="Tamanhos dos trabalhos exportados para PDF")
+    parser.add_argument("--only", nargs="+", choices=["generation", "sections", "save", "history", "export"],
+                        help="Executa apenas os benchmarks indicados")
+    parser.add_argument("--output", default="bench_results.json", help="Arquivo JSON com os resultados")
+    args = parser.parse_args(argv)
+
+    model = FakeGenerativeModel(latency=args.latency, latency_jitter=args.latency_jitter,
+                                output_chars=args.output_chars, error_rate=args.error_rate)
+    output_path = os.path.abspath(args.output)
+    selected = set(args.only or ["generation", "sections", "save", "history", "export"])
+
+    # Tudo é executado em uma pasta temporária, sem cache de respostas nem limite de cota
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    cwd = os.getcwd()
+    original_get_model = utils.get_model
+    config.CACHE_ENABLED = False
+    config.RATE_LIMIT_REQUESTS_PER_MINUTE = None
+    config.RATE_LIMIT_TOKENS_PER_MINUTE = None
+    config.RETRY_BASE_DELAY = 0.01
+    utils.get_model = lambda *args, **kwargs: model
+    results = []
+    try:
+        os.chdir(workdir)
+        if "generation" in selected:
+            results += bench_generation(model, args.repeat)
+        if "sections" in selected:
+            results += bench_sections(model, args.repeat)
+        if "save" in selected:
+            results += bench_save(model, args.repeat)
+        if "history" in selected:
+            results += bench_history(args.history_sizes, args.repeat, args.history_section_chars)
+        if "export" in selected:
+            results += bench_export(args.pdf_sizes, args.repeat)
+    finally:
+        utils.get_model = original_get_model
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fake_model": {
+            "latency": args.latency,
+            "latency_jitter": args.latency_jitter,
+            "output_chars": args.output_chars,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(f"Resultados gravados em {output_path}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import time
+import random
+import hashlib
+import asyncio
+import threading
+from types import SimpleNamespace
+from google.api_core import exceptions as google_exceptions
+
+# Substituto local de genai.GenerativeModel para medições sem chave de API
+# As respostas são determinísticas (dependem apenas do prompt e da semente), com latência,
+# tamanho de saída e injeção de erros configuráveis
+
+WORDS = ("análise educação tecnologia sociedade pesquisa método teoria contexto aprendizagem "
+         "desenvolvimento resultado perspectiva conceito processo estudo prática crítica").split()
+
+AUTHORS = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Costa", "Almeida", "Ferreira"]
+
+def _candidates(finish_reason):
+    return [SimpleNamespace(finish_reason=SimpleNamespace(name=finish_reason))]
+
+class FakeResponse:
+    """
+    Resposta completa no formato usado pelo SDK (atributos text, candidates e usage_metadata)
+    """
+
+    def __init__(self, text, prompt_tokens, finish_reason="STOP", thinking_tokens=0):
+        self._text = text
+        self.candidates = _candidates(finish_reason)
+        candidates_tokens = len(text) // 4 + 1 if text else 0
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=candidates_tokens,
+            thoughts_token_count=thinking_tokens,
+            total_token_count=prompt_tokens + candidates_tokens + thinking_tokens,
+        )
+
+    @property
+    def text(self):
+        # Como no SDK, uma resposta sem partes de texto não tem o atributo text
+        if not self._text:
+            raise ValueError("The `response.text` quick accessor requires the response to contain a valid `Part`")
+        return self._text
+
+class FakeStreamResponse:
+    """
+    Resposta em streaming: iterável de trechos, com usage_metadata disponível ao final
+    """
+
+    def __init__(self, chunks, prompt_tokens, chunk_delay, finish_reason="STOP", thinking_tokens=0, on_chunk=None):
+        self._chunks = chunks
+        self._on_chunk = on_chunk
+        self._chunk_delay = chunk_delay
+        self.usage_metadata = None
+        self.candidates = None
+        self._prompt_tokens = prompt_tokens
+        self._finish_reason = finish_reason
+        self._thinking_tokens = thinking_tokens
+
+    def __iter__(self):
+        for index, chunk in enumerate(self._chunks):
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            if self._on_chunk:
+                self._on_chunk()
+            # O motivo de término chega no último trecho
+            last = index == len(self._chunks) - 1
+            yield SimpleNamespace(text=chunk, candidates=_candidates(self._finish_reason) if last else [])
+        final = FakeResponse("".join(self._chunks), self._prompt_tokens, self._finish_reason, self._thinking_tokens)
+        self.usage_metadata = final.usage_metadata
+        self.candidates = final.candidates
+
+class FakeGenerativeModel:
+    """
+    Modelo falso compatível com a parte de genai.GenerativeModel usada pelo projeto
+    """
+
+    def __init__(self, model_name="fake-gemini", generation_config=None, latency=0.0, latency_jitter=0.0,
+                 output_chars=2000, chunk_chars=200, error_rate=0.0, error_factory=None, seed=0, thinking_tokens=0):
+        """
+        Args:
+            model_name: Nome do modelo informado em model_name
+            generation_config: Configuração de geração (apenas registrada)
+            latency: Tempo de resposta em segundos por chamada
+            latency_jitter: Variação aleatória máxima somada à latência, em segundos
+            output_chars: Tamanho aproximado de cada resposta em caracteres
+            chunk_chars: Tamanho dos trechos no modo streaming
+            error_rate: Probabilidade (0 a 1) de uma chamada falhar
+            error_factory: Função que cria o erro injetado (padrão: ResourceExhausted / 429)
+            seed: Semente que torna latências, textos e erros reprodutíveis
+            thinking_tokens: Tokens de raciocínio por chamada, descontados do max_output_tokens antes do texto
+                (como nos modelos 2.5)
+        """
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self._generation_config = dict(generation_config or {})
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.output_chars = output_chars
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self.error_factory = error_factory or (lambda: google_exceptions.ResourceExhausted("Fake quota exceeded"))
+        self.seed = seed
+        self.thinking_tokens = thinking_tokens
+        self.calls = 0
+        self.chunks_served = 0  # trechos entregues no modo streaming
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_call(self):
+        # Sorteia latência e erro de forma reprodutível para a sequência de chamadas
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(0, self.latency_jitter)
+            failed = self._rng.random() < self.error_rate
+        return delay, failed
+
+    def _text_for(self, prompt):
+        """
+        Gera um texto determinístico para o prompt: parágrafos com subtítulos e citações (Autor, ano)
+        """
+        digest = hashlib.sha256(f"{self.seed}\0{prompt}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+        blocks = []
+        length = 0
+        section = 1
+        while length < self.output_chars:
+            if len(blocks) % 4 == 0:
+                blocks.append(f"{section}. {rng.choice(WORDS).capitalize()} e {rng.choice(WORDS)}")
+                section += 1
+            words = [rng.choice(WORDS) for _ in range(rng.randint(40, 80))]
+            citation = f"({rng.choice(AUTHORS)}, {rng.randint(1990, 2024)})"
+            blocks.append(" ".join(words).capitalize() + f" {citation}.")
+            length += len(blocks[-1]) + 2
+        return "\n\n".join(blocks)
+
+    def _chunk_served(self):
+        with self._lock:
+            self.chunks_served += 1
+
+    def _prompt_tokens(self, prompt):
+        return len(prompt) // 4 + 1
+
+    def _output(self, contents, generation_config):
+        """
+        Retorna (texto, motivo de término, tokens de raciocínio), cortando o texto no max_output_tokens
+        """
+        text = self._text_for(contents)
+        limit = dict(self._generation_config, **(generation_config or {})).get("max_output_tokens")
+        thinking = self.thinking_tokens if limit is None else min(self.thinking_tokens, limit)
+        if limit is not None and thinking + len(text) // 4 + 1 > limit:
+            return text[:max(0, limit - thinking) * 4], "MAX_TOKENS", thinking
+        return text, "STOP", thinking
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        delay, failed = self._next_call()
+        if failed:
+            time.sleep(delay / 2)
+            raise self.error_factory()
+        text, finish_reason, thinking = self._output(contents, generation_config)
+        if stream:
+            chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+            # A latência é dividida entre o primeiro trecho e os demais
+            time.sleep(delay / 2)
+            return FakeStreamResponse(chunks, self._prompt_tokens(contents), delay / 2 / max(len(chunks), 1),
+                                      finish_reason, thinking, self._chunk_served)
+        time.sleep(delay)
+        return FakeResponse(text, self._prompt_tokens(contents), finish_reason, thinking)
+
+    async def generate_content_async(self, contents, stream=False, generation_config=None, **kwargs):
+        delay, failed = self._next_call()
+        await asyncio.sleep(delay)
+        if failed:
+            raise self.error_factory()
+        text, finish_reason, thinking = self._output(contents, generation_config)
+        return FakeResponse(text, self._prompt_tokens(contents), finish_reason, thinking)
+
+    def count_tokens(self, contents, **kwargs):
+        return SimpleNamespace(total_tokens=self._prompt_tokens(contents))
@@ -10,14 +10,171 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "AIzaSyCWWOb9ux3aSwodsBibz4vEYpFPCI
 # Modelo da API Gemini a ser utilizado
 GEMINI_MODEL = "gemini-2.5-flash"
 
+# Modelo e configuração de geração por etapa, no lugar do modelo padrão (ex.: um modelo mais rápido
+# para as etapas curtas); chaves: "model" e "generation_config". Etapas ausentes usam o modelo padrão
+# Exemplo: {"titulo": {"model": "gemini-2.5-flash-lite"}, "referencias": {"model": "gemini-2.5-flash-lite"}}
+STAGE_MODELS = {}
+
+# Transporte usado pelo cliente da API ("grpc" ou "rest")
+# O cliente e seus canais são criados uma vez e reutilizados por todo o processo
+GEMINI_TRANSPORT = "grpc"
+
+# Configuração de geração aplicada ao modelo padrão (ex.: {"temperature": TEMPERATURE_DEFAULT})
+GEMINI_GENERATION_CONFIG = {}
+
 # Configurações de temperatura para geração de conteúdo
 # Valores mais baixos = respostas mais determinísticas
 # Valores mais altos = respostas mais criativas
 TEMPERATURE_DEFAULT = 0.7
 TEMPERATURE_CREATIVE = 0.9
 
+# Exibe o texto na interface à medida que é gerado pelo modelo (streaming)
+STREAMING_ENABLED = True
+
+# Limites de uso da API, compartilhados por todas as chamadas do processo
+RATE_LIMIT_REQUESTS_PER_MINUTE = 60  # None desativa o limite
+RATE_LIMIT_TOKENS_PER_MINUTE = 1000000  # None desativa o limite
+
+# Novas tentativas para erros transitórios da API (429, 500, 503, timeouts)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0  # segundos; dobra a cada tentativa, com jitter
+RETRY_MAX_DELAY = 60.0  # segundos
+
+# Requisições duplicadas (hedging): se uma chamada não responde até o p95 observado da sua etapa,
+# uma chamada idêntica é disparada e vale a resposta que chegar primeiro
+HEDGE_ENABLED = False
+HEDGE_MAX_EXTRA_FRACTION = 0.05  # duplicatas permitidas, em fração do total de chamadas (limita o custo extra)
+HEDGE_MIN_SAMPLES = 20  # latências observadas na etapa antes de começar a duplicar
+HEDGE_WINDOW = 200  # latências recentes usadas no cálculo do p95
+HEDGE_MIN_DELAY = 1.0  # espera mínima, em segundos, antes de duplicar
+HEDGE_MAX_WORKERS = 64  # chamadas simultâneas no pool das requisições duplicadas
+
+# Configurações de execução das etapas de geração
+# Etapas independentes (conclusão e referências) são executadas em paralelo
+STAGE_MAX_WORKERS = 2
+STAGE_TIMEOUT = 180  # tempo limite padrão por etapa, em segundos (None desativa)
+STAGE_TIMEOUTS = {
+    "desenvolvimento": 300,
+}
+
+# Modos de geração do desenvolvimento
+# "completo": todas as seções em uma única chamada ao modelo
+# "esboco": uma chamada rápida gera os subtítulos e cada seção é redigida em paralelo
+DEVELOPMENT_MODES = ["completo", "esboco"]
+DEVELOPMENT_MODE = "completo"  # modo padrão
+OUTLINE_MAX_SECTIONS = 8  # número máximo de seções aceitas do esboço
+OUTLINE_MAX_WORKERS = 6  # seções redigidas simultaneamente
+
+# Expansão e reescrita por subseções: seções com subtítulos são divididas e processadas em paralelo
+SUBSECTION_MAX_WORKERS = 4
+
+# Resumo local do desenvolvimento usado como contexto da conclusão e das referências
+SUMMARY_SENTENCES_PER_SUBSECTION = 2  # frases extraídas de cada subseção
+SUMMARY_MAX_SENTENCE_CHARS = 300  # frases mais longas são encurtadas (None mantém inteiras)
+
+# Orçamento de tokens por etapa (token_budget.py)
+# "context": tokens máximos do contexto variável incluído no prompt (introdução, resumo do desenvolvimento)
+# "output": max_output_tokens da resposta; "output_per_input": limite mínimo proporcional ao texto de entrada
+# Nos modelos 2.5, os tokens de raciocínio também contam no max_output_tokens; None desativa o limite
+TOKEN_BUDGET_ENABLED = True
+TOKEN_BUDGETS = {
+    "titulo": {"output": 1024},
+    "introducao": {"output": 4096},
+    "desenvolvimento": {"context": 1500, "output": 12288},
+    "esboco": {"context": 1500, "output": 2048},
+    "subsecao": {"context": 1500, "output": 4096},
+    "conclusao": {"context": 2000, "output": 4096},
+    "referencias": {"context": 2000, "output": 6144},
+    "expandir": {"output": 6144, "output_per_input": 3.0},
+    "reescrever": {"output": 4096, "output_per_input": 2.0},
+}
+TOKEN_BUDGET_MAX_OUTPUT = 32768  # teto do limite proporcional à entrada e das novas tentativas
+# Tokens somados ao max_output_tokens de cada etapa para o raciocínio dos modelos 2.5 (0 desativa)
+TOKEN_BUDGET_THINKING_RESERVE = 2048
+# Respostas interrompidas pelo limite (finish_reason MAX_TOKENS) são repetidas com o limite multiplicado
+# pelo fator, até o teto acima; esgotadas as tentativas, a etapa falha em vez de usar o texto truncado
+TOKEN_BUDGET_TRUNCATION_RETRIES = 1
+TOKEN_BUDGET_TRUNCATION_FACTOR = 2.0
+# Ajuste dos orçamentos pelo nível acadêmico (textos mais longos nos níveis mais avançados)
+TOKEN_BUDGET_LEVEL_FACTORS = {
+    "Ensino Médio": 0.75,
+    "Graduação": 1.0,
+    "Pós-Graduação": 1.25,
+}
+# Contagem dos tokens do prompt: "local" (estimativa por caracteres) ou "api" (count_tokens do modelo)
+TOKEN_COUNT_METHOD = "local"
+TOKEN_COUNT_CACHE_SIZE = 10000  # contagens da API guardadas em memória, pelo hash do texto
+
+# Cache persistente das respostas do modelo
+# Prompts idênticos (mesmo modelo e temperatura) reutilizam a resposta armazenada
+CACHE_ENABLED = True
+CACHE_FOLDER = "cache"
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # tamanho máximo do cache em bytes
+CACHE_TTL = 30 * 24 * 60 * 60  # tempo de vida das entradas em segundos (None = sem expiração)
+
+# Geração em lote (batch.py): número padrão de trabalhos gerados simultaneamente
+BATCH_WORKERS = 4
+
+# Fila de geração em segundo plano (jobs.py)
+# A geração roda fora do script Streamlit; a interface apenas consulta o andamento
+BACKGROUND_JOBS_ENABLED = True
+JOBS_DB_FILE = "jobs.sqlite3"
+JOB_WORKERS = 8  # trabalhos gerados simultaneamente pelo servidor
+JOB_PROGRESS_INTERVAL = 1.0  # intervalo, em segundos, para gravar o texto parcial
+JOB_POLL_INTERVAL = 2.0  # intervalo, em segundos, entre consultas da interface
+JOB_HEARTBEAT_INTERVAL = 10.0  # intervalo, em segundos, para o processo renovar a posse dos trabalhos em execução
+JOB_LEASE_SECONDS = 60.0  # sem renovação por esse tempo, o trabalho é considerado abandonado e volta para a fila
+
+# Serviço HTTP/JSON (server.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+
+# Instrumentação das etapas (metrics.py)
+METRICS_JSONL_FILE = None  # arquivo com um evento JSON por linha, ex.: "metrics.jsonl" (None desativa)
+METRICS_JSONL_MAX_BYTES = 50 * 1024 * 1024  # tamanho a partir do qual o arquivo é rotacionado (None = sem limite)
+METRICS_JSONL_BACKUPS = 1  # arquivos rotacionados mantidos (metrics.jsonl.1, ...)
+METRICS_LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]  # segundos
+
 # Configurações para o histórico de trabalhos
 HISTORY_FOLDER = "works"
+HISTORY_INDEX_FILE = "history_index.sqlite3"  # índice de metadados (fora da pasta, para não alterá-la)
+HISTORY_PAGE_SIZE = 20  # trabalhos exibidos por página no histórico e na busca
+
+# Reaproveitamento de trabalhos com tema quase idêntico (similarity.py)
+# Antes de gerar, a interface oferece os trabalhos do histórico cujo tema tem similaridade (cosseno TF-IDF)
+# acima do limite, para abri-los ou usar o título e o esboço como ponto de partida
+SIMILARITY_ENABLED = True
+SIMILARITY_THRESHOLD = 0.6
+SIMILARITY_TOP_K = 3
+# Abreviações expandidas antes da comparação (sem acentos, em minúsculas)
+SIMILARITY_ABBREVIATIONS = {
+    "ia": "inteligencia artificial",
+    "ti": "tecnologia informacao",
+    "tic": "tecnologias informacao comunicacao",
+    "tics": "tecnologias informacao comunicacao",
+    "ead": "educacao distancia",
+    "sus": "sistema unico saude",
+    "ods": "objetivos desenvolvimento sustentavel",
+    "iot": "internet coisas",
+    "lgpd": "lei geral protecao dados",
+    "tea": "transtorno espectro autista",
+    "tdah": "transtorno deficit atencao hiperatividade",
+    "eua": "estados unidos",
+}
+
+# Armazenamento dos trabalhos salvos
+# "blobs": registro pequeno por trabalho e seções comprimidas, armazenadas uma única vez pelo conteúdo
+# "json": o trabalho completo em um único arquivo JSON formatado
+# Trabalhos gravados por qualquer um dos backends continuam sendo lidos normalmente
+STORAGE_BACKEND = "blobs"
+BLOB_FOLDER = os.path.join(HISTORY_FOLDER, "blobs")
+BLOB_COMPRESSION_LEVEL = 6  # nível de compressão zlib (1 = mais rápido, 9 = menor)
+
+# Diário de revisões das seções editadas (expandir/reescrever)
+# As edições são acrescentadas ao diário; o registro completo do trabalho só é reescrito a cada N revisões
+JOURNAL_FOLDER = os.path.join(HISTORY_FOLDER, "journal")
+JOURNAL_GROUP_COMMIT_INTERVAL = 0.005  # segundos de espera para agrupar gravações em um único fsync
+JOURNAL_CHECKPOINT_EVERY = 20  # revisões entre duas reescritas do registro do trabalho
 
 # Configurações para exportação de PDF
 PDF_MARGINS = (15, 15, 15)  # margens em milímetros (esquerda, topo, direita)
@@ -26,6 +183,12 @@ PDF_FONT_SIZE_TITLE = 16
 PDF_FONT_SIZE_HEADING = 14
 PDF_FONT_SIZE_SUBHEADING = 12
 PDF_FONT_SIZE_TEXT = 11
+PDF_LINE_SPACING = 1.5  # altura da linha do texto, em múltiplos do tamanho da fonte
+
+# Cache de PDFs exportados, indexado pelo conteúdo do trabalho e pela configuração acima
+PDF_CACHE_FOLDER = os.path.join(HISTORY_FOLDER, "pdf_cache")
+PDF_CACHE_MAX_FILES = 500
+PDF_CACHE_MAX_BYTES = 500 * 1024 * 1024
 
 # Estilos de referência suportados
 REFERENCE_STYLES = ["APA", "ABNT"]
@@ -0,0 +1,230 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import config
+
+# Requisições duplicadas (hedging) contra respostas lentas da API
+# Se uma chamada não responde até o p95 observado da sua etapa, uma chamada idêntica é disparada e
+# vale a resposta que chegar primeiro. As chamadas duplicadas são limitadas a uma fração das chamadas
+# (config.HEDGE_MAX_EXTRA_FRACTION), o que limita o custo extra.
+
+def _merge_stats(event, stats):
+    """
+    Copia para o evento de métricas as estatísticas da tentativa que respondeu; a espera pela cota
+    se soma à de chamadas anteriores do mesmo evento
+    """
+    if event is None:
+        return
+    for name, value in stats.items():
+        if name == "queue_seconds":
+            event[name] = event.get(name, 0.0) + value
+        else:
+            event[name] = value
+
+class Hedger:
+    """
+    Executa chamadas com uma duplicata opcional após o p95 de latência da etapa
+    """
+
+    def __init__(self, max_extra_fraction, min_samples, window, min_delay, max_workers):
+        """
+        Args:
+            max_extra_fraction: Fração máxima de chamadas duplicadas em relação às chamadas realizadas
+            min_samples: Número mínimo de latências observadas na etapa antes de duplicar chamadas
+            window: Número de latências recentes usadas no cálculo do p95 de cada etapa
+            min_delay: Espera mínima, em segundos, antes de duplicar uma chamada
+            max_workers: Número máximo de chamadas simultâneas executadas pelo pool
+        """
+        self.max_extra_fraction = max_extra_fraction
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._executor = None
+        self._stats = {"calls": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            self._latencies.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def delay(self, stage):
+        """
+        Retorna o p95 das latências recentes da etapa, ou None se ainda não houver amostras suficientes
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(stage, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(samples[min(len(samples) - 1, int(len(samples) * 0.95))], self.min_delay)
+
+    def _reserve_hedge(self):
+        # A duplicata só é permitida enquanto o custo extra estiver abaixo do limite
+        with self._lock:
+            if self._stats["hedges"] + 1 > self._stats["calls"] * self.max_extra_fraction:
+                return False
+            self._stats["hedges"] += 1
+            return True
+
+    def _start(self):
+        with self._lock:
+            self._stats["calls"] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+            return self._executor
+
+    def _attempt(self, stage, func, stats):
+        # Cada tentativa preenche o próprio dicionário; apenas a latência da chamada ao modelo
+        # (api_seconds, sem a espera pela cota) entra nas amostras do p95
+        start = time.monotonic()
+        result = func(stats)
+        self._record(stage, stats.get("api_seconds", time.monotonic() - start))
+        return result
+
+    def _remaining(self, stats, delay):
+        """
+        Tempo restante até a duplicata: o atraso é contado a partir do início da chamada ao modelo,
+        e não enquanto a tentativa aguarda a cota; None se a chamada ainda não começou
+        """
+        started = stats.get("api_started_at")
+        if started is None:
+            return None
+        return started + delay - time.time()
+
+    def _won(self, attempt, hedge, event):
+        if attempt is hedge:
+            with self._lock:
+                self._stats["hedge_wins"] += 1
+            if event is not None:
+                event["hedge_won"] = True
+
+    def call(self, stage, func, event=None):
+        """
+        Executa func(stats), disparando uma duplicata se a chamada ao modelo passar do p95 da etapa
+
+        Args:
+            stage: Nome da etapa, usado para a latência observada
+            func: Função que realiza a chamada (incluindo cota, novas tentativas e o ajuste da cota com o uso real);
+                recebe o dicionário de estatísticas da tentativa (ver rate_limit.call_with_retry)
+            event: Dicionário opcional do evento de métricas, que recebe "hedged", "hedge_won" e as estatísticas
+                da tentativa que respondeu primeiro
+
+        Returns:
+            Resultado da primeira chamada concluída com sucesso
+        """
+        executor = self._start()
+        delay = self.delay(stage)
+        primary_stats = {}
+        if delay is None:
+            # Sem latências suficientes para o p95: chamada única, na própria thread
+            result = self._attempt(stage, func, primary_stats)
+            _merge_stats(event, primary_stats)
+            return result
+
+        primary = executor.submit(self._attempt, stage, func, primary_stats)
+        while True:
+            remaining = self._remaining(primary_stats, delay)
+            done, _ = wait([primary], timeout=delay if remaining is None else max(remaining, 0))
+            remaining = self._remaining(primary_stats, delay)
+            if done or (remaining is not None and remaining <= 0):
+                break
+        if done or not self._reserve_hedge():
+            result = primary.result()
+            _merge_stats(event, primary_stats)
+            return result
+
+        hedge_stats = {}
+        hedge = executor.submit(self._attempt, stage, func, hedge_stats)
+        if event is not None:
+            event["hedged"] = True
+        attempts = {primary: primary_stats, hedge: hedge_stats}
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A chamada mais lenta continua em segundo plano e ajusta a própria cota,
+                    # mas seu resultado é descartado
+                    self._won(future, hedge, event)
+                    _merge_stats(event, attempts[future])
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def call_async(self, stage, func, event=None):
+        """
+        Versão assíncrona de call; func(stats) retorna a corrotina da chamada
+        """
+        self._start()
+        delay = self.delay(stage)
+
+        async def _attempt(stats):
+            start = time.monotonic()
+            result = await func(stats)
+            self._record(stage, stats.get("api_seconds", time.monotonic() - start))
+            return result
+
+        primary_stats = {}
+        if delay is None:
+            result = await _attempt(primary_stats)
+            _merge_stats(event, primary_stats)
+            return result
+
+        primary = asyncio.ensure_future(_attempt(primary_stats))
+        while True:
+            remaining = self._remaining(primary_stats, delay)
+            done, _ = await asyncio.wait([primary], timeout=delay if remaining is None else max(remaining, 0))
+            remaining = self._remaining(primary_stats, delay)
+            if done or (remaining is not None and remaining <= 0):
+                break
+        if done or not self._reserve_hedge():
+            result = await primary
+            _merge_stats(event, primary_stats)
+            return result
+
+        hedge_stats = {}
+        hedge = asyncio.ensure_future(_attempt(hedge_stats))
+        if event is not None:
+            event["hedged"] = True
+        attempts = {primary: primary_stats, hedge: hedge_stats}
+        pending = set(attempts)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._won(task, hedge, event)
+                        _merge_stats(event, attempts[task])
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # No laço de eventos, a chamada mais lenta pode ser cancelada
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        """
+        Retorna os contadores de chamadas, duplicatas disparadas e duplicatas que responderam primeiro
+        """
+        with self._lock:
+            return dict(self._stats)
+
+_hedger = None
+_hedger_lock = threading.Lock()
+
+def get_hedger():
+    """
+    Retorna o executor de duplicatas compartilhado pelo processo, configurado a partir do config.py
+    """
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger(config.HEDGE_MAX_EXTRA_FRACTION, config.HEDGE_MIN_SAMPLES, config.HEDGE_WINDOW,
+                             config.HEDGE_MIN_DELAY, config.HEDGE_MAX_WORKERS)
+        return _hedger
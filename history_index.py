@@ -0,0 +1,314 @@
+import os
+import sqlite3
+from contextlib import closing
+import config
+import journal
+
+# Índice de metadados do histórico de trabalhos
+# Guarda em SQLite apenas os campos exibidos no histórico, evitando carregar cada JSON a cada consulta,
+# e um índice de texto completo (FTS5) sobre título, tema, seções e referências para a busca
+
+METADATA_FIELDS = ["id", "titulo", "tema", "nivel_academico", "estilo_referencia", "date_created"]
+
+# Versão do índice de busca; ao mudar, o índice é reconstruído a partir dos trabalhos salvos
+SEARCH_INDEX_VERSION = "1"
+
+# Pesos das colunas do índice de busca na ordenação por relevância (titulo, tema, texto, referencias)
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0, 0.5)
+
+# Versão do esquema, gravada em PRAGMA user_version; o script abaixo só é executado em bancos mais antigos
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+        CREATE TABLE IF NOT EXISTS works (
+            filename TEXT PRIMARY KEY,
+            id TEXT,
+            titulo TEXT,
+            tema TEXT,
+            nivel_academico TEXT,
+            estilo_referencia TEXT,
+            date_created TEXT
+        );
+        CREATE INDEX IF NOT EXISTS works_date_created ON works (date_created DESC);
+        CREATE INDEX IF NOT EXISTS works_nivel_date ON works (nivel_academico, date_created DESC);
+        CREATE INDEX IF NOT EXISTS works_estilo_date ON works (estilo_referencia, date_created DESC);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS works_search USING fts5(
+            titulo, tema, texto, referencias,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+"""
+
+def _connect():
+    """
+    Abre uma conexão com o índice, criando as tabelas apenas se o banco ainda não tiver o esquema atual
+    """
+    os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
+    conn = sqlite3.connect(config.HISTORY_INDEX_FILE, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        conn.executescript(SCHEMA + f"PRAGMA user_version = {SCHEMA_VERSION};")
+    return conn
+
+def folder_version():
+    """
+    Retorna a versão atual da pasta de histórico (data de modificação em nanossegundos)
+    """
+    return str(os.stat(config.HISTORY_FOLDER).st_mtime_ns)
+
+def _upsert(conn, filename, metadata):
+    # O rowid do trabalho é preservado nas atualizações, pois é a chave do índice de busca
+    conn.execute(
+        "INSERT INTO works (filename, id, titulo, tema, nivel_academico, estilo_referencia, date_created) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (filename) DO UPDATE SET id = excluded.id, titulo = excluded.titulo, tema = excluded.tema, "
+        "nivel_academico = excluded.nivel_academico, estilo_referencia = excluded.estilo_referencia, "
+        "date_created = excluded.date_created",
+        [filename] + [metadata.get(field, "") for field in METADATA_FIELDS],
+    )
+
+def _index_text(conn, filename, work_data):
+    """
+    Atualiza o texto do trabalho no índice de busca
+    """
+    rowid = conn.execute("SELECT rowid FROM works WHERE filename = ?", (filename,)).fetchone()[0]
+    texto = "\n\n".join(work_data.get(name) or "" for name in ("introducao", "desenvolvimento", "conclusao"))
+    conn.execute("DELETE FROM works_search WHERE rowid = ?", (rowid,))
+    conn.execute(
+        "INSERT INTO works_search (rowid, titulo, tema, texto, referencias) VALUES (?, ?, ?, ?, ?)",
+        (rowid, work_data.get("titulo") or "", work_data.get("tema") or "", texto, work_data.get("referencias") or ""),
+    )
+
+def _add(conn, filename, work_data):
+    _upsert(conn, filename, {field: work_data.get(field, "") for field in METADATA_FIELDS})
+    _index_text(conn, filename, work_data)
+
+def _remove(conn, filenames):
+    for filename in filenames:
+        row = conn.execute("SELECT rowid FROM works WHERE filename = ?", (filename,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM works_search WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM works WHERE rowid = ?", (row[0],))
+
+def _set_synced(conn, mtime):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('folder_mtime', ?)", (mtime,))
+
+def _is_stale(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'folder_mtime'").fetchone()
+    return row is None or row["value"] != folder_version()
+
+def _reconcile(conn):
+    """
+    Sincroniza o índice com a pasta de histórico, lendo apenas os arquivos novos
+    """
+    mtime = folder_version()
+    on_disk = {name for name in os.listdir(config.HISTORY_FOLDER) if name.endswith(".json")}
+    indexed = {row["filename"] for row in conn.execute("SELECT filename FROM works")}
+
+    _remove(conn, indexed - on_disk)
+
+    for filename in on_disk - indexed:
+        try:
+            _add(conn, filename, journal.load_work(os.path.join(config.HISTORY_FOLDER, filename)))
+        except Exception as e:
+            print(f"Erro ao carregar arquivo {filename}: {e}")
+
+    _set_synced(conn, mtime)
+
+def _ensure_search_index(conn):
+    """
+    Preenche o índice de busca a partir dos trabalhos já indexados, se ele foi criado ou mudou de versão
+    """
+    row = conn.execute("SELECT value FROM meta WHERE key = 'search_version'").fetchone()
+    if row is not None and row["value"] == SEARCH_INDEX_VERSION:
+        return
+    conn.execute("DELETE FROM works_search")
+    for (filename,) in conn.execute("SELECT filename FROM works").fetchall():
+        try:
+            _index_text(conn, filename, journal.load_work(os.path.join(config.HISTORY_FOLDER, filename)))
+        except Exception as e:
+            print(f"Erro ao carregar arquivo {filename}: {e}")
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_version', ?)", (SEARCH_INDEX_VERSION,))
+
+def _sync(conn):
+    with conn:
+        if _is_stale(conn):
+            _reconcile(conn)
+        _ensure_search_index(conn)
+
+def sync_index():
+    """
+    Atualiza o índice caso a pasta de histórico tenha sido alterada desde a última sincronização
+    """
+    with closing(_connect()) as conn:
+        _sync(conn)
+
+def rebuild_index():
+    """
+    Reconstrói o índice do zero a partir dos arquivos da pasta de histórico
+    """
+    with closing(_connect()) as conn:
+        with conn:
+            conn.execute("DELETE FROM works")
+            conn.execute("DELETE FROM works_search")
+            _reconcile(conn)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_version', ?)", (SEARCH_INDEX_VERSION,))
+
+def add_work(filename, work_data, previous_version=None):
+    """
+    Registra no índice um trabalho recém-salvo
+
+    Args:
+        filename: Nome do arquivo JSON dentro da pasta de histórico
+        work_data: Dicionário contendo os dados do trabalho
+        previous_version: Versão da pasta (folder_version) obtida antes de gravar o arquivo
+    """
+    with closing(_connect()) as conn:
+        with conn:
+            _add(conn, filename, work_data)
+            # Se o índice estava sincronizado antes da gravação, a única alteração na pasta foi este arquivo
+            row = conn.execute("SELECT value FROM meta WHERE key = 'folder_mtime'").fetchone()
+            if previous_version is not None and row is not None and row["value"] == previous_version:
+                _set_synced(conn, folder_version())
+
+def _filter_clause(filters):
+    """
+    Monta as condições SQL dos filtros do histórico
+
+    Args:
+        filters: Dicionário opcional com nivel_academico, estilo_referencia, date_from e date_to
+            (datas no formato AAAA-MM-DD, inclusivas)
+
+    Returns:
+        Tupla (condições a acrescentar com AND, parâmetros)
+    """
+    conditions = []
+    params = []
+    filters = filters or {}
+    for field in ("nivel_academico", "estilo_referencia"):
+        if filters.get(field):
+            conditions.append(f"works.{field} = ?")
+            params.append(filters[field])
+    if filters.get("date_from"):
+        conditions.append("works.date_created >= ?")
+        params.append(str(filters["date_from"]))
+    if filters.get("date_to"):
+        conditions.append("works.date_created <= ?")
+        params.append(f"{filters['date_to']} 23:59:59")
+    return "".join(f" AND {condition}" for condition in conditions), params
+
+def query_works(limit=None, offset=0, filters=None):
+    """
+    Consulta os metadados dos trabalhos, do mais recente para o mais antigo
+
+    Args:
+        limit: Número máximo de trabalhos retornados (None = todos)
+        offset: Quantidade de trabalhos a pular (para paginação)
+        filters: Filtros opcionais por nível, estilo e período (ver _filter_clause)
+
+    Returns:
+        Lista de dicionários contendo os metadados dos trabalhos
+    """
+    clause, params = _filter_clause(filters)
+    with closing(_connect()) as conn:
+        _sync(conn)
+        rows = conn.execute(
+            f"SELECT * FROM works WHERE 1 = 1{clause} ORDER BY date_created DESC LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset],
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def count_works(filters=None):
+    """
+    Retorna o número total de trabalhos no histórico que atendem aos filtros
+    """
+    clause, params = _filter_clause(filters)
+    with closing(_connect()) as conn:
+        _sync(conn)
+        return conn.execute(f"SELECT COUNT(*) FROM works WHERE 1 = 1{clause}", params).fetchone()[0]
+
+def works_since(after_rowid=0):
+    """
+    Retorna os metadados dos trabalhos indexados depois de after_rowid, incluindo o "rowid" de cada um
+
+    Usado para manter atualizados, de forma incremental, índices derivados (ex.: similarity.py)
+    """
+    with closing(_connect()) as conn:
+        _sync(conn)
+        rows = conn.execute("SELECT rowid, * FROM works WHERE rowid > ? ORDER BY rowid", (after_rowid,)).fetchall()
+    return [dict(row) for row in rows]
+
+def update_text(filename, work_data):
+    """
+    Atualiza no índice de busca o texto de um trabalho editado
+
+    Args:
+        filename: Nome do arquivo JSON dentro da pasta de histórico
+        work_data: Dicionário contendo os dados atuais do trabalho
+    """
+    with closing(_connect()) as conn:
+        with conn:
+            if conn.execute("SELECT 1 FROM works WHERE filename = ?", (filename,)).fetchone():
+                _index_text(conn, filename, work_data)
+
+def _match_expression(query):
+    """
+    Converte o texto digitado pelo usuário em uma expressão FTS5: todos os termos devem aparecer,
+    e o último é tratado como prefixo (busca enquanto se digita)
+    """
+    terms = [term.replace('"', '') for term in query.split()]
+    terms = [term for term in terms if term]
+    if not terms:
+        return None
+    expression = " ".join(f'"{term}"' for term in terms)
+    return expression + "*"
+
+def search_works(query, limit=20, offset=0, filters=None):
+    """
+    Busca trabalhos pelo título, tema, seções e referências, ordenados por relevância
+
+    Args:
+        query: Texto da busca
+        limit: Número máximo de trabalhos retornados
+        offset: Quantidade de resultados a pular (para paginação)
+        filters: Filtros opcionais por nível, estilo e período (ver _filter_clause)
+
+    Returns:
+        Lista de dicionários com os metadados dos trabalhos e um trecho do texto ("snippet")
+        com os termos encontrados destacados em negrito
+    """
+    expression = _match_expression(query)
+    if expression is None:
+        return []
+    clause, params = _filter_clause(filters)
+    with closing(_connect()) as conn:
+        _sync(conn)
+        rows = conn.execute(
+            "SELECT works.*, snippet(works_search, 2, '**', '**', '...', 24) AS snippet "
+            "FROM works_search JOIN works ON works.rowid = works_search.rowid "
+            f"WHERE works_search MATCH ?{clause} ORDER BY bm25(works_search, {', '.join(map(str, SEARCH_WEIGHTS))}) "
+            "LIMIT ? OFFSET ?",
+            [expression] + params + [limit, offset],
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def count_search(query, filters=None):
+    """
+    Retorna o número de trabalhos encontrados pela busca que atendem aos filtros
+    """
+    expression = _match_expression(query)
+    if expression is None:
+        return 0
+    clause, params = _filter_clause(filters)
+    with closing(_connect()) as conn:
+        _sync(conn)
+        if not clause:
+            return conn.execute("SELECT COUNT(*) FROM works_search WHERE works_search MATCH ?", (expression,)).fetchone()[0]
+        return conn.execute(
+            "SELECT COUNT(*) FROM works_search JOIN works ON works.rowid = works_search.rowid "
+            f"WHERE works_search MATCH ?{clause}",
+            [expression] + params,
+        ).fetchone()[0]
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+import config
+import utils
+
+# Fila de geração em segundo plano
+# Os trabalhos são executados por um pool de threads do processo, fora da execução do script Streamlit,
+# e o estado de cada um fica registrado em uma tabela SQLite (na fila, em execução, concluído, falhou)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Dono dos trabalhos executados por este processo; o sufixo distingue um PID reutilizado
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Sinal de cancelamento de cada trabalho em execução neste processo
+_cancel_events = {}
+_cancel_lock = threading.Lock()
+
+def _connect():
+    """
+    Abre uma conexão com a tabela de trabalhos, criando-a se necessário
+    """
+    conn = sqlite3.connect(config.JOBS_DB_FILE, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            tema TEXT,
+            nivel_academico TEXT,
+            estilo_referencia TEXT,
+            created_at REAL,
+            started_at REAL,
+            finished_at REAL,
+            progress TEXT,
+            json_filename TEXT,
+            error TEXT,
+            development_mode TEXT,
+            warm_start TEXT,
+            owner TEXT,
+            heartbeat_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at DESC);
+    """)
+    # Bancos criados antes da escolha do modo de desenvolvimento
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+    if "development_mode" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN development_mode TEXT")
+    if "warm_start" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN warm_start TEXT")
+    if "owner" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+    return conn
+
+def _update(job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with closing(_connect()) as conn:
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", list(fields.values()) + [job_id])
+
+def _is_orphaned(row, now):
+    """
+    Indica se o trabalho em execução pertence a outro processo que parou de renovar a posse
+    """
+    if row["owner"] == _OWNER:
+        return False
+    return row["heartbeat_at"] is None or row["heartbeat_at"] < now - config.JOB_LEASE_SECONDS
+
+def _requeue_orphans(job_id=None):
+    """
+    Devolve para a fila os trabalhos em execução cujo processo dono deixou de renovar a posse
+    (ex.: interrompido por um reinício); os trabalhos de processos ativos não são alterados
+
+    Returns:
+        Número de trabalhos devolvidos para a fila
+    """
+    query = ("UPDATE jobs SET status = ?, progress = NULL, owner = NULL WHERE status = ? "
+             "AND (owner IS NULL OR owner != ?) AND (heartbeat_at IS NULL OR heartbeat_at < ?)")
+    params = [STATUS_QUEUED, STATUS_RUNNING, _OWNER, time.time() - config.JOB_LEASE_SECONDS]
+    if job_id is not None:
+        query += " AND id = ?"
+        params.append(job_id)
+    with closing(_connect()) as conn:
+        with conn:
+            return conn.execute(query, params).rowcount
+
+def _heartbeat(executor):
+    """
+    Renova periodicamente a posse dos trabalhos em execução neste processo, inclusive durante
+    etapas longas sem nenhum trecho novo
+    """
+    while _executor is executor:
+        time.sleep(config.JOB_HEARTBEAT_INTERVAL)
+        with _cancel_lock:
+            job_ids = list(_cancel_events)
+        if not job_ids:
+            continue
+        placeholders = ", ".join("?" for _ in job_ids)
+        with closing(_connect()) as conn:
+            with conn:
+                conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND id IN ({placeholders})",
+                             [time.time(), _OWNER] + job_ids)
+
+def _get_executor():
+    """
+    Retorna o pool de execução do processo; na primeira chamada, retoma os trabalhos
+    abandonados por um processo interrompido
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.JOB_WORKERS, thread_name_prefix="job")
+            threading.Thread(target=_heartbeat, args=(_executor,), name="job-heartbeat", daemon=True).start()
+            _requeue_orphans()
+            with closing(_connect()) as conn:
+                pending = [row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (STATUS_QUEUED,))]
+            for job_id in pending:
+                _executor.submit(_run_job, job_id)
+        return _executor
+
+def start_workers():
+    """
+    Inicia o pool de execução do processo, retomando os trabalhos que ficaram na fila ou que um processo
+    interrompido deixou em execução; chamadas seguintes não têm efeito
+    """
+    _get_executor()
+
+def _run_job(job_id):
+    """
+    Executa um trabalho da fila, registrando o texto parcial de cada seção durante a geração
+    """
+    # O sinal de cancelamento é registrado antes de o trabalho passar a constar como em execução
+    cancel_event = threading.Event()
+    with _cancel_lock:
+        _cancel_events[job_id] = cancel_event
+    # Marca o trabalho como em execução apenas se ainda estiver na fila
+    with closing(_connect()) as conn:
+        with conn:
+            now = time.time()
+            claimed = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, now, _OWNER, now, job_id, STATUS_QUEUED),
+            ).rowcount
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if not claimed:
+        with _cancel_lock:
+            _cancel_events.pop(job_id, None)
+        return
+
+    sections = {}
+    last_update = time.monotonic()
+    try:
+        # Os tempos limite por etapa e o cancelamento valem também para a geração em streaming
+        events = utils.stream_academic_work(job["tema"], job["nivel_academico"], job["estilo_referencia"],
+                                            development_mode=job["development_mode"],
+                                            warm_start=json.loads(job["warm_start"]) if job["warm_start"] else None,
+                                            cancel_event=cancel_event)
+        for secao, trecho in events:
+            if secao is None:
+                _update(job_id, status=STATUS_DONE, finished_at=time.time(), progress=None,
+                        json_filename=trecho["json_filename"])
+                return
+            sections[secao] = sections.get(secao, "") + trecho
+            # O progresso é gravado em intervalos para não escrever no banco a cada trecho
+            if time.monotonic() - last_update >= config.JOB_PROGRESS_INTERVAL:
+                _update(job_id, progress=json.dumps(sections, ensure_ascii=False))
+                last_update = time.monotonic()
+    except Exception as e:
+        _update(job_id, status=STATUS_FAILED, finished_at=time.time(), error=str(e))
+    finally:
+        with _cancel_lock:
+            _cancel_events.pop(job_id, None)
+
+def submit_job(tema, nivel_academico, estilo_referencia, development_mode=None, warm_start=None):
+    """
+    Coloca a geração de um trabalho acadêmico na fila
+
+    Args:
+        tema: Tema do trabalho acadêmico
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        estilo_referencia: Estilo de referência (APA ou ABNT)
+        development_mode: Modo de geração do desenvolvimento (padrão: config.DEVELOPMENT_MODE)
+        warm_start: Título e esboço reaproveitados de um trabalho similar (ver utils.warm_start_from_work)
+
+    Returns:
+        String contendo o ID do trabalho na fila
+    """
+    executor = _get_executor()
+    job_id = str(uuid.uuid4())
+    with closing(_connect()) as conn:
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, tema, nivel_academico, estilo_referencia, development_mode, warm_start, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, tema, nivel_academico, estilo_referencia, development_mode,
+                 json.dumps(warm_start, ensure_ascii=False) if warm_start else None, time.time()),
+            )
+    executor.submit(_run_job, job_id)
+    return job_id
+
+def cancel_job(job_id):
+    """
+    Cancela um trabalho na fila ou em execução neste processo; o trabalho termina com o estado "failed"
+
+    Returns:
+        True se o trabalho foi cancelado, False se já havia terminado ou não existe
+    """
+    with closing(_connect()) as conn:
+        with conn:
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ? AND status = ?",
+                (STATUS_FAILED, time.time(), "Geração cancelada", job_id, STATUS_QUEUED),
+            ).rowcount
+    with _cancel_lock:
+        cancel_event = _cancel_events.get(job_id)
+    if cancel_event is not None:
+        cancel_event.set()
+        return True
+    return bool(cancelled)
+
+def _job_to_dict(row):
+    job = dict(row)
+    job["progress"] = json.loads(job["progress"]) if job["progress"] else {}
+    return job
+
+def get_job(job_id):
+    """
+    Consulta o estado de um trabalho da fila
+
+    Returns:
+        Dicionário com os dados do trabalho (incluindo o texto parcial em "progress"), ou None se não existir
+    """
+    # Quem volta para acompanhar um trabalho após um reinício encontra o pool já retomando a fila
+    executor = _get_executor()
+    with closing(_connect()) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    # O processo dono pode ter parado depois que este pool foi criado
+    if row is not None and row["status"] == STATUS_RUNNING and _is_orphaned(row, time.time()):
+        if _requeue_orphans(job_id):
+            executor.submit(_run_job, job_id)
+        with closing(_connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_to_dict(row) if row else None
+
+def list_jobs(limit=20):
+    """
+    Lista os trabalhos mais recentes da fila
+
+    Returns:
+        Lista de dicionários, do mais recente para o mais antigo
+    """
+    with closing(_connect()) as conn:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    return [_job_to_dict(row) for row in rows]
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+import config
+import storage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Diário de revisões das seções dos trabalhos salvos
+# Cada edição (expandir, reescrever) é acrescentada como uma linha JSON ao diário do trabalho, com o hash
+# do novo texto no armazenamento de blobs. As gravações simultâneas são agrupadas em um único fsync, e o
+# registro do trabalho é reescrito atomicamente apenas a cada config.JOURNAL_CHECKPOINT_EVERY revisões.
+# A revisão 0 guarda as seções originais, permitindo reconstruir o trabalho em qualquer revisão.
+# A numeração é lida do próprio diário com o arquivo travado, valendo também entre processos
+# (ex.: a interface e um processo de geração em lote editando o mesmo trabalho).
+
+class GroupCommitWriter:
+    """
+    Grava linhas ao final de arquivos em uma thread própria, agrupando as gravações que chegam
+    em um intervalo curto em um único fsync por arquivo
+    """
+
+    def __init__(self, interval):
+        """
+        Args:
+            interval: Tempo em segundos que a thread aguarda para agrupar gravações antes do fsync
+        """
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._pending = []
+        self._submitted = 0
+        self._durable = 0
+        self._errors = []
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+            self._thread.start()
+
+    def append(self, path, line, wait=True):
+        """
+        Acrescenta a linha ao arquivo; com wait=True, retorna apenas depois que ela estiver gravada em disco
+        """
+        with self._cond:
+            self._start()
+            self._pending.append((path, line))
+            self._submitted += 1
+            ticket = self._submitted
+            self._cond.notify_all()
+            if not wait:
+                return
+            while self._durable < ticket:
+                self._cond.wait()
+            for first, last, error in self._errors:
+                if first <= ticket <= last:
+                    raise error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Aguarda um pouco para que outras gravações entrem no mesmo lote
+            if self.interval:
+                time.sleep(self.interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                first, last = self._durable + 1, self._submitted
+
+            error = None
+            lines_by_path = {}
+            for path, line in batch:
+                lines_by_path.setdefault(path, []).append(line)
+            for path, lines in lines_by_path.items():
+                try:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("".join(lines))
+                        f.flush()
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    error = e
+
+            with self._cond:
+                if error is not None:
+                    self._errors = self._errors[-100:] + [(first, last, error)]
+                self._durable = last
+                self._cond.notify_all()
+
+_writer = GroupCommitWriter(config.JOURNAL_GROUP_COMMIT_INTERVAL)
+
+# Trecho final do diário lido para obter a última revisão
+_TAIL_BYTES = 64 * 1024
+
+def journal_path(record_path):
+    """
+    Retorna o caminho do diário associado ao registro de um trabalho
+    """
+    name = os.path.splitext(os.path.basename(record_path))[0]
+    return os.path.join(config.JOURNAL_FOLDER, f"{name}.jsonl")
+
+def read_entries(record_path):
+    """
+    Lê as revisões registradas no diário do trabalho, em ordem
+
+    Returns:
+        Lista de dicionários {"rev", "timestamp", "sections": {seção: hash}}
+    """
+    entries = []
+    try:
+        with open(journal_path(record_path), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Última linha truncada por uma interrupção
+                    continue
+    except FileNotFoundError:
+        pass
+    # Edições simultâneas podem chegar ao arquivo fora da ordem de numeração
+    entries.sort(key=lambda entry: entry["rev"])
+    return entries
+
+def _blobs():
+    return storage.get_backend(storage.BlobStorage.name)
+
+def replay(work_data, entries, revision=None, after=0):
+    """
+    Aplica ao trabalho as revisões do diário posteriores a `after` e até `revision` (padrão: a última)
+
+    Returns:
+        Novo dicionário do trabalho, com "revision" indicando a revisão aplicada
+    """
+    work_data = dict(work_data)
+    blobs = _blobs()
+    for entry in entries:
+        if entry["rev"] <= after:
+            continue
+        if revision is not None and entry["rev"] > revision:
+            break
+        for name, digest in entry["sections"].items():
+            work_data[name] = blobs.get(digest)
+        work_data["revision"] = entry["rev"]
+    return work_data
+
+def load_work(record_path):
+    """
+    Lê um trabalho salvo e aplica as revisões do diário posteriores à última reescrita do registro
+    """
+    work_data = storage.load_work(record_path)
+    entries = read_entries(record_path)
+    if entries:
+        work_data = replay(work_data, entries, after=work_data.get("revision", 0))
+    return work_data
+
+@contextmanager
+def _locked(path):
+    """
+    Trava o arquivo do diário com uma trava exclusiva do sistema operacional, entre threads e processos
+    """
+    with open(path, "ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _last_revision(path):
+    """
+    Retorna o maior número de revisão registrado no final do diário, ou None se ele estiver vazio
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - _TAIL_BYTES))
+        lines = f.read().split(b"\n")
+    if size > _TAIL_BYTES:
+        # A primeira linha do trecho pode estar incompleta
+        lines = lines[1:]
+    revisions = []
+    for line in lines:
+        try:
+            revisions.append(json.loads(line)["rev"])
+        except (ValueError, KeyError, TypeError):
+            # Linha vazia ou truncada por uma interrupção
+            continue
+    return max(revisions) if revisions else None
+
+def append_revision(record_path, work_data, changes):
+    """
+    Registra no diário uma nova revisão das seções do trabalho
+
+    Args:
+        record_path: Caminho do registro do trabalho no histórico
+        work_data: Dicionário do trabalho antes da alteração (usado como revisão 0 na primeira edição)
+        changes: Dicionário {seção: novo texto}
+
+    Returns:
+        Número da revisão registrada
+    """
+    os.makedirs(config.JOURNAL_FOLDER, exist_ok=True)
+    path = journal_path(record_path)
+    blobs = _blobs()
+    sections = {name: blobs.put(text) for name, text in changes.items()}
+    # A trava é mantida até a linha estar gravada, para que a próxima edição leia a revisão atribuída
+    with _locked(path):
+        last = _last_revision(path)
+        rev = 1 if last is None else last + 1
+        now = time.time()
+        lines = []
+        if last is None:
+            original = {name: blobs.put(work_data[name]) for name in storage.SECTION_FIELDS if isinstance(work_data.get(name), str)}
+            lines.append(json.dumps({"rev": 0, "timestamp": now, "sections": original}) + "\n")
+        lines.append(json.dumps({"rev": rev, "timestamp": now, "sections": sections}) + "\n")
+        _writer.append(path, "".join(lines))
+    return rev
+
+def checkpoint(record_path, work_data):
+    """
+    Reescreve atomicamente o registro do trabalho com o estado atual, incluindo a revisão aplicada
+    """
+    record = {name: value for name, value in work_data.items() if name != "json_filename"}
+    storage.save_work(record_path, record)
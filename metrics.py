@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import asyncio
+import bisect
+import functools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+import config
+
+# Instrumentação das etapas de geração
+# Cada chamada instrumentada produz um evento (etapa, tempos, tokens, cache, erro) que é entregue
+# aos ganchos registrados: por padrão, histogramas em memória no formato Prometheus e,
+# se configurado, um arquivo JSONL
+
+_hooks = []
+_hooks_lock = threading.Lock()
+
+def add_hook(hook):
+    """
+    Registra uma função que recebe cada evento (dicionário) registrado
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+def remove_hook(hook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+def record(event):
+    """
+    Entrega um evento a todos os ganchos; falhas de um gancho não interrompem a geração
+    """
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception as e:
+            print(f"Erro ao registrar métrica: {e}")
+
+def _new_event(stage, model_name):
+    return {
+        "timestamp": time.time(),
+        "stage": stage,
+        "model": model_name,
+        "wall_seconds": 0.0,
+        "queue_seconds": 0.0,
+        "prompt_tokens": None,
+        "response_tokens": None,
+        "predicted_prompt_tokens": None,
+        "max_output_tokens": None,
+        "cache_hit": False,
+        "hedged": False,
+        "hedge_won": False,
+        "truncated": False,
+        "error": None,
+    }
+
+@contextmanager
+def track(stage, model_name=None):
+    """
+    Mede uma etapa e registra o evento ao final, inclusive em caso de erro
+
+    O bloco recebe o dicionário do evento e pode completá-lo com queue_seconds, prompt_tokens,
+    response_tokens, cache_hit, first_chunk_seconds etc.
+    """
+    event = _new_event(stage, model_name)
+    start = time.monotonic()
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        event["wall_seconds"] = time.monotonic() - start
+        record(event)
+
+@asynccontextmanager
+async def track_async(stage, model_name=None):
+    """
+    Versão de track para corrotinas: o evento é entregue aos ganchos (ex.: arquivo JSONL) em uma thread,
+    sem bloquear o laço de eventos
+    """
+    event = _new_event(stage, model_name)
+    start = time.monotonic()
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        event["wall_seconds"] = time.monotonic() - start
+        await asyncio.to_thread(record, event)
+
+def timed(stage):
+    """
+    Decorador que registra cada chamada da função como um evento da etapa indicada
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def usage_tokens(response):
+    """
+    Retorna (tokens do prompt, tokens da resposta) informados no usage_metadata da resposta
+    """
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+class JsonlExporter:
+    """
+    Gancho que grava cada evento como uma linha JSON, com rotação do arquivo ao atingir o tamanho máximo
+    """
+
+    def __init__(self, path, max_bytes=None, backups=1):
+        """
+        Args:
+            path: Arquivo JSONL de destino
+            max_bytes: Tamanho a partir do qual o arquivo é rotacionado (None = sem limite)
+            backups: Número de arquivos antigos mantidos (path.1, path.2...)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _rotate(self):
+        # path.N-1 -> path.N, ..., path -> path.1; o mais antigo é descartado
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else f"{self.path}.{index - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        if not self.backups and os.path.exists(self.path):
+            os.remove(self.path)
+        self._size = 0
+
+    def __call__(self, event):
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._size is None:
+                self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if self.max_bytes is not None and self._size + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(line)
+            self._size += len(line)
+
+class PrometheusCollector:
+    """
+    Gancho que agrega os eventos em histogramas e contadores por etapa, exportáveis no formato texto do Prometheus
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def _new_stage(self):
+        return {
+            "count": 0,
+            "wall": [0] * (len(self.buckets) + 1),
+            "wall_sum": 0.0,
+            "queue": [0] * (len(self.buckets) + 1),
+            "queue_sum": 0.0,
+            "prompt_tokens": 0,
+            "response_tokens": 0,
+            "predicted_prompt_tokens": 0,
+            "measured_prompt_tokens": 0,
+            "output_budget_tokens": 0,
+            "budgeted_response_tokens": 0,
+            "cache_hits": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "truncations": 0,
+            "errors": 0,
+        }
+
+    def __call__(self, event):
+        with self._lock:
+            stats = self._stages.setdefault(event["stage"], self._new_stage())
+            stats["count"] += 1
+            stats["wall"][bisect.bisect_left(self.buckets, event["wall_seconds"])] += 1
+            stats["wall_sum"] += event["wall_seconds"]
+            stats["queue"][bisect.bisect_left(self.buckets, event["queue_seconds"])] += 1
+            stats["queue_sum"] += event["queue_seconds"]
+            stats["prompt_tokens"] += event["prompt_tokens"] or 0
+            stats["response_tokens"] += event["response_tokens"] or 0
+            # Previsão e orçamento comparados apenas nas chamadas em que a API informou o uso real
+            if event.get("predicted_prompt_tokens") and event["prompt_tokens"]:
+                stats["predicted_prompt_tokens"] += event["predicted_prompt_tokens"]
+                stats["measured_prompt_tokens"] += event["prompt_tokens"]
+            if event.get("max_output_tokens") and event["response_tokens"] is not None:
+                stats["output_budget_tokens"] += event["max_output_tokens"]
+                stats["budgeted_response_tokens"] += event["response_tokens"]
+            stats["cache_hits"] += 1 if event["cache_hit"] else 0
+            stats["hedges"] += 1 if event.get("hedged") else 0
+            stats["hedge_wins"] += 1 if event.get("hedge_won") else 0
+            stats["truncations"] += 1 if event.get("truncated") else 0
+            stats["errors"] += 1 if event["error"] else 0
+
+    def _quantile(self, counts, total, q):
+        # Estimativa pelo limite superior do bucket que contém o quantil
+        target = q * total
+        cumulative = 0
+        for bound, count in zip(self.buckets + [float("inf")], counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        """
+        Resumo por etapa: chamadas, tempo médio e p95, espera média, tokens, acertos de cache e erros
+        """
+        with self._lock:
+            stages = {stage: dict(stats) for stage, stats in self._stages.items()}
+        rows = []
+        for stage, stats in sorted(stages.items()):
+            count = stats["count"]
+            rows.append({
+                "stage": stage,
+                "calls": count,
+                "avg_wall_s": round(stats["wall_sum"] / count, 3),
+                "p95_wall_s": self._quantile(stats["wall"], count, 0.95),
+                "avg_queue_s": round(stats["queue_sum"] / count, 3),
+                "prompt_tokens": stats["prompt_tokens"],
+                "response_tokens": stats["response_tokens"],
+                "predicted_prompt_tokens": stats["predicted_prompt_tokens"],
+                "prompt_prediction_ratio": round(stats["predicted_prompt_tokens"] / stats["measured_prompt_tokens"], 3)
+                if stats["measured_prompt_tokens"] else None,
+                "output_budget_use": round(stats["budgeted_response_tokens"] / stats["output_budget_tokens"], 3)
+                if stats["output_budget_tokens"] else None,
+                "cache_hit_rate": round(stats["cache_hits"] / count, 3),
+                "errors": stats["errors"],
+            })
+        return rows
+
+    def _histogram(self, lines, name, stage, counts, total_sum):
+        cumulative = 0
+        for bound, count in zip(self.buckets + [float("inf")], counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total_sum}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+    def render(self):
+        """
+        Retorna as métricas no formato texto de exposição do Prometheus
+        """
+        with self._lock:
+            stages = {stage: dict(stats) for stage, stats in self._stages.items()}
+        lines = [
+            "# HELP academic_stage_duration_seconds Tempo total de cada etapa, incluindo espera e novas tentativas",
+            "# TYPE academic_stage_duration_seconds histogram",
+        ]
+        for stage, stats in sorted(stages.items()):
+            self._histogram(lines, "academic_stage_duration_seconds", stage, stats["wall"], stats["wall_sum"])
+        lines += [
+            "# HELP academic_stage_queue_seconds Tempo de espera pela cota da API em cada etapa",
+            "# TYPE academic_stage_queue_seconds histogram",
+        ]
+        for stage, stats in sorted(stages.items()):
+            self._histogram(lines, "academic_stage_queue_seconds", stage, stats["queue"], stats["queue_sum"])
+        lines += [
+            "# HELP academic_stage_tokens_total Tokens consumidos por etapa",
+            "# TYPE academic_stage_tokens_total counter",
+        ]
+        for stage, stats in sorted(stages.items()):
+            lines.append(f'academic_stage_tokens_total{{stage="{stage}",kind="prompt"}} {stats["prompt_tokens"]}')
+            lines.append(f'academic_stage_tokens_total{{stage="{stage}",kind="response"}} {stats["response_tokens"]}')
+            lines.append(f'academic_stage_tokens_total{{stage="{stage}",kind="predicted_prompt"}} {stats["predicted_prompt_tokens"]}')
+            lines.append(f'academic_stage_tokens_total{{stage="{stage}",kind="measured_prompt"}} {stats["measured_prompt_tokens"]}')
+            lines.append(f'academic_stage_tokens_total{{stage="{stage}",kind="output_budget"}} {stats["output_budget_tokens"]}')
+        for name, key, help_text in [
+            ("academic_stage_cache_hits_total", "cache_hits", "Respostas servidas pelo cache por etapa"),
+            ("academic_stage_hedges_total", "hedges", "Chamadas duplicadas disparadas por etapa"),
+            ("academic_stage_hedge_wins_total", "hedge_wins", "Chamadas duplicadas que responderam primeiro por etapa"),
+            ("academic_stage_truncations_total", "truncations", "Respostas interrompidas pelo limite de tokens por etapa"),
+            ("academic_stage_errors_total", "errors", "Erros por etapa"),
+        ]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for stage, stats in sorted(stages.items()):
+                lines.append(f'{name}{{stage="{stage}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+# Coletor padrão do processo
+collector = PrometheusCollector(config.METRICS_LATENCY_BUCKETS)
+add_hook(collector)
+if config.METRICS_JSONL_FILE:
+    add_hook(JsonlExporter(config.METRICS_JSONL_FILE, config.METRICS_JSONL_MAX_BYTES, config.METRICS_JSONL_BACKUPS))
@@ -0,0 +1,289 @@
+import re
+import time
+import asyncio
+import random
+import threading
+from google.api_core import exceptions as google_exceptions
+import config
+
+# Controle de cota e novas tentativas para as chamadas à API do Gemini
+# Um limitador compartilhado (requisições/min e tokens/min) regula todas as chamadas do processo,
+# e erros transitórios são repetidos com backoff exponencial e jitter
+
+# Erros da API que indicam sobrecarga ou falha temporária
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+class TokenBucket:
+    """
+    Balde de fichas com reposição contínua; permite saldo negativo para que cada chamada
+    reserve sua vez e aguarde o tempo correspondente, sem espera ativa
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """
+        Reserva a quantidade de fichas e retorna quantos segundos aguardar até que estejam disponíveis
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def adjust(self, amount):
+        """
+        Corrige o saldo após a chamada (positivo consome, negativo devolve fichas), sem aguardar
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+class RateLimiter:
+    """
+    Limitador de requisições e tokens por minuto, com métricas de espera e latência
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "queue_seconds": 0.0,
+            "api_seconds": 0.0,
+        }
+
+    def acquire(self, estimated_tokens=0):
+        """
+        Aguarda até que haja cota para uma requisição com o número estimado de tokens
+
+        Returns:
+            Tempo de espera em segundos
+        """
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and estimated_tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, estimated_tokens=0):
+        """
+        Versão assíncrona de acquire: aguarda a cota sem bloquear o laço de eventos
+
+        Returns:
+            Tempo de espera em segundos
+        """
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and estimated_tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def refund_tokens(self, estimated_tokens):
+        """
+        Devolve os tokens reservados por uma tentativa que falhou com erro transitório; a requisição
+        continua contando na cota, mas os tokens não foram consumidos
+        """
+        if self.tokens is not None and estimated_tokens:
+            self.tokens.adjust(-estimated_tokens)
+
+    def settle_tokens(self, actual_tokens, estimated_tokens):
+        """
+        Ajusta a cota de tokens com o uso real informado pela API
+        """
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def record(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                self._metrics[name] += value
+
+    def metrics(self):
+        """
+        Retorna os contadores acumulados e as médias de espera na fila e de latência da API
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        attempts = metrics["attempts"] or 1
+        metrics["avg_queue_ms"] = round(metrics["queue_seconds"] / attempts * 1000, 1)
+        metrics["avg_api_ms"] = round(metrics["api_seconds"] / attempts * 1000, 1)
+        return metrics
+
+def estimate_tokens(text):
+    """
+    Estimativa local do número de tokens de um texto (aproximadamente 4 caracteres por token)
+    """
+    return len(text) // 4 + 1
+
+def retry_after(error):
+    """
+    Extrai do erro o tempo de espera sugerido pela API, se houver
+    """
+    # gRPC: detalhe google.rpc.RetryInfo
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    # REST: cabeçalho Retry-After
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("Retry-After"):
+        try:
+            return float(headers["Retry-After"])
+        except ValueError:
+            pass
+    # Mensagem de erro, ex.: "Please retry in 41.2s"
+    match = re.search(r"retry in ([\d.]+)s", str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+def backoff_delay(attempt, hint=None):
+    """
+    Calcula a espera antes da próxima tentativa: backoff exponencial com jitter, respeitando a sugestão da API
+    """
+    delay = min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * (2 ** attempt))
+    delay = random.uniform(0, delay)
+    if hint is not None:
+        delay = max(delay, hint)
+    return delay
+
+def call_with_retry(func, estimated_tokens=0, stats=None):
+    """
+    Executa uma chamada à API respeitando a cota compartilhada e repetindo erros transitórios
+
+    Args:
+        func: Função sem argumentos que realiza a chamada
+        estimated_tokens: Número estimado de tokens consumidos pela chamada
+        stats: Dicionário opcional que recebe o tempo total de espera pela cota (queue_seconds),
+            o número de novas tentativas (retries) e o início (api_started_at, horário do relógio)
+            e a duração (api_seconds) da última chamada à API, sem a espera
+
+    Returns:
+        Resultado da chamada
+    """
+    limiter = get_limiter()
+    attempt = 0
+    while True:
+        waited = limiter.acquire(estimated_tokens)
+        if stats is not None:
+            stats["queue_seconds"] = stats.get("queue_seconds", 0.0) + waited
+            stats["retries"] = attempt
+            stats["api_started_at"] = time.time()
+        start = time.monotonic()
+        try:
+            result = func()
+        except RETRYABLE_ERRORS as e:
+            limiter.record(attempts=1, queue_seconds=waited, api_seconds=time.monotonic() - start)
+            # Cada tentativa reserva os tokens de novo: os da tentativa que falhou são devolvidos
+            limiter.refund_tokens(estimated_tokens)
+            attempt += 1
+            if attempt >= config.RETRY_MAX_ATTEMPTS:
+                limiter.record(failures=1)
+                raise
+            limiter.record(retries=1)
+            if stats is not None:
+                # Durante o backoff não há chamada em andamento
+                stats.pop("api_started_at", None)
+            time.sleep(backoff_delay(attempt - 1, retry_after(e)))
+            continue
+        except Exception:
+            limiter.record(attempts=1, failures=1, queue_seconds=waited, api_seconds=time.monotonic() - start)
+            raise
+        api_seconds = time.monotonic() - start
+        if stats is not None:
+            stats["api_seconds"] = api_seconds
+        limiter.record(calls=1, attempts=1, queue_seconds=waited, api_seconds=api_seconds)
+        return result
+
+async def call_with_retry_async(func, estimated_tokens=0, stats=None):
+    """
+    Versão assíncrona de call_with_retry, com a mesma cota compartilhada
+
+    Args:
+        func: Função sem argumentos que retorna a corrotina da chamada
+        estimated_tokens: Número estimado de tokens consumidos pela chamada
+        stats: Dicionário opcional que recebe o tempo total de espera pela cota (queue_seconds),
+            o número de novas tentativas (retries) e o início (api_started_at, horário do relógio)
+            e a duração (api_seconds) da última chamada à API, sem a espera
+
+    Returns:
+        Resultado da chamada
+    """
+    limiter = get_limiter()
+    attempt = 0
+    while True:
+        waited = await limiter.acquire_async(estimated_tokens)
+        if stats is not None:
+            stats["queue_seconds"] = stats.get("queue_seconds", 0.0) + waited
+            stats["retries"] = attempt
+            stats["api_started_at"] = time.time()
+        start = time.monotonic()
+        try:
+            result = await func()
+        except RETRYABLE_ERRORS as e:
+            limiter.record(attempts=1, queue_seconds=waited, api_seconds=time.monotonic() - start)
+            # Cada tentativa reserva os tokens de novo: os da tentativa que falhou são devolvidos
+            limiter.refund_tokens(estimated_tokens)
+            attempt += 1
+            if attempt >= config.RETRY_MAX_ATTEMPTS:
+                limiter.record(failures=1)
+                raise
+            limiter.record(retries=1)
+            if stats is not None:
+                # Durante o backoff não há chamada em andamento
+                stats.pop("api_started_at", None)
+            await asyncio.sleep(backoff_delay(attempt - 1, retry_after(e)))
+            continue
+        except Exception:
+            limiter.record(attempts=1, failures=1, queue_seconds=waited, api_seconds=time.monotonic() - start)
+            raise
+        api_seconds = time.monotonic() - start
+        if stats is not None:
+            stats["api_seconds"] = api_seconds
+        limiter.record(calls=1, attempts=1, queue_seconds=waited, api_seconds=api_seconds)
+        return result
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """
+    Retorna o limitador compartilhado pelo processo, configurado a partir do config.py
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(config.RATE_LIMIT_REQUESTS_PER_MINUTE, config.RATE_LIMIT_TOKENS_PER_MINUTE)
+        return _limiter
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import config
+
+# Cache persistente das respostas do modelo, endereçado pelo conteúdo do prompt
+class ResponseCache:
+    """
+    Cache em disco das respostas do modelo, com chave (modelo, temperatura, hash do prompt)
+    e remoção LRU limitada por tamanho total e tempo de vida das entradas
+    """
+
+    def __init__(self, folder, max_bytes=None, ttl=None):
+        """
+        Args:
+            folder: Pasta onde as respostas são armazenadas
+            max_bytes: Tamanho máximo total do cache em bytes (None = ilimitado)
+            ttl: Tempo de vida de cada entrada em segundos (None = sem expiração)
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Índice em memória na ordem LRU (menos recente primeiro): chave -> (tamanho, criação)
+        self._index = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def make_key(model_name, temperature, prompt, max_output_tokens=None):
+        """
+        Calcula a chave de cache para um prompt enviado a um modelo com determinada temperatura
+        e, se houver, limite de tokens da resposta
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{model_name}\0{temperature}\0".encode("utf-8"))
+        digest.update(prompt.encode("utf-8"))
+        if max_output_tokens is not None:
+            digest.update(f"\0{max_output_tokens}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        # O índice é montado uma única vez por processo a partir dos arquivos existentes
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.folder):
+            for root, _, files in os.walk(self.folder):
+                for name in files:
+                    if not name.endswith(".json"):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    entries.append((st.st_atime, name[:-5], st.st_size, st.st_mtime))
+        entries.sort()
+        self._index = OrderedDict((key, (size, created)) for _, key, size, created in entries)
+        self._total_bytes = sum(size for _, _, size, _ in entries)
+
+    def _lookup(self, key):
+        entry = self._index.get(key)
+        if entry is None:
+            # A entrada pode ter sido gravada por outro processo
+            try:
+                st = os.stat(self._path(key))
+            except OSError:
+                return None
+            entry = (st.st_size, st.st_mtime)
+            self._index[key] = entry
+            self._total_bytes += st.st_size
+        return entry
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry[1] > self.ttl
+
+    def _remove(self, key):
+        size, _ = self._index.pop(key, (0, 0))
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            for key, entry in list(self._index.items()):
+                if self._expired(entry, now):
+                    self._remove(key)
+        if self.max_bytes is not None:
+            while self._index and self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._index)))
+
+    def get(self, key):
+        """
+        Retorna o texto armazenado para a chave, ou None se não estiver no cache
+        """
+        with self._lock:
+            self._load_index()
+            now = time.time()
+            entry = self._lookup(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = json.load(f)["text"]
+                # Registra o acesso no atime, preservando a data de criação no mtime
+                os.utime(path, (now, entry[1]))
+            except (OSError, ValueError, KeyError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        """
+        Armazena o texto para a chave, removendo as entradas menos usadas se necessário
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._load_index()
+            now = time.time()
+            size, _ = self._index.pop(key, (0, 0))
+            self._total_bytes -= size
+            size = os.path.getsize(path)
+            self._index[key] = (size, now)
+            self._total_bytes += size
+            self._evict(now)
+
+    def clear(self):
+        """
+        Remove todas as entradas do cache
+        """
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def stats(self):
+        """
+        Retorna os contadores de acertos e falhas e o tamanho atual do cache
+        """
+        with self._lock:
+            self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Retorna a instância de cache compartilhada pelo processo, configurada a partir do config.py
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(config.CACHE_FOLDER, config.CACHE_MAX_BYTES, config.CACHE_TTL)
+        return _cache
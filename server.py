@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from google.api_core import exceptions as google_exceptions
+import config
+import utils
+import metrics
+import hedging
+from batch import validate_job
+
+# Serviço HTTP/JSON para gerar, editar e exportar trabalhos a partir de outros sistemas
+# Requisições idênticas em andamento são agrupadas: quem chega enquanto a mesma geração já está
+# em execução aguarda o resultado dela, em vez de iniciar outra chamada ao modelo
+#
+# Rotas:
+#   POST /trabalhos    {"tema", "nivel_academico", "estilo_referencia", "modo_desenvolvimento"?}
+#   POST /expandir     {"texto", "secao", "nivel_academico"}
+#   POST /reescrever   {"texto", "secao", "nivel_academico"}
+#   POST /pdf          {"trabalho": {...}} ou {"json_filename": "..."}; responde com o PDF
+#   GET  /metrics      métricas das etapas no formato do Prometheus
+#   GET  /status       contadores do agrupamento de requisições e das chamadas duplicadas
+#
+# Corpos inválidos recebem 400 e trabalhos inexistentes, 404; falhas da API do modelo (erros da API,
+# respostas sem texto, tempo limite das etapas) recebem 502 e os demais erros, 500
+
+class RequestError(Exception):
+    """
+    Erro da requisição, respondido com o status indicado (400 para corpos inválidos, 404 para trabalhos inexistentes)
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# Falhas do modelo e da API, respondidas com 502
+UPSTREAM_ERRORS = (google_exceptions.GoogleAPIError, utils.ModelResponseError, TimeoutError)
+
+def _text_field(payload, name, required=True):
+    """
+    Lê um campo de texto do corpo da requisição, verificando o tipo
+
+    Returns:
+        O texto, ou None se o campo opcional estiver ausente
+    """
+    value = payload.get(name)
+    if value is None or value == "":
+        if required:
+            raise RequestError(f"Campo '{name}' ausente")
+        return None
+    if not isinstance(value, str):
+        raise RequestError(f"Campo '{name}' deve ser um texto")
+    return value
+
+class Coalescer:
+    """
+    Agrupa chamadas idênticas simultâneas: a primeira executa a função e as demais
+    recebem o mesmo resultado (ou a mesma exceção)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def run(self, key, func):
+        """
+        Executa func() para a chave, ou aguarda a execução já em andamento com a mesma chave
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            # O resultado fica com quem já aguardava; chamadas posteriores executam novamente
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, inflight=len(self._inflight))
+
+coalescer = Coalescer()
+
+def request_key(kind, payload):
+    """
+    Chave de agrupamento de uma requisição: o tipo e o hash do corpo com as chaves ordenadas
+    """
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return f"{kind}:{hashlib.sha256(data).hexdigest()}"
+
+def generate_work(payload):
+    """
+    Gera um trabalho completo, compartilhando a geração com requisições idênticas em andamento
+    """
+    job = {
+        "tema": _text_field(payload, "tema").strip(),
+        "nivel_academico": _text_field(payload, "nivel_academico"),
+        "estilo_referencia": _text_field(payload, "estilo_referencia"),
+        "modo_desenvolvimento": _text_field(payload, "modo_desenvolvimento", required=False) or config.DEVELOPMENT_MODE,
+    }
+    try:
+        validate_job(job)
+    except ValueError as e:
+        raise RequestError(str(e)) from e
+    return coalescer.run(request_key("trabalho", job), lambda: utils.generate_academic_work(
+        job["tema"], job["nivel_academico"], job["estilo_referencia"], development_mode=job["modo_desenvolvimento"],
+    ))
+
+def edit_section(operation, payload):
+    """
+    Expande ou reescreve o texto de uma seção
+
+    Args:
+        operation: "expandir" ou "reescrever"
+        payload: Dicionário com "texto", "secao" e "nivel_academico"
+
+    Returns:
+        Dicionário {"texto": novo texto}
+    """
+    args = (_text_field(payload, "texto"), _text_field(payload, "secao"), _text_field(payload, "nivel_academico"))
+    if args[2] not in config.ACADEMIC_LEVELS:
+        raise RequestError(f"Nível acadêmico inválido: {args[2]!r}")
+    func = utils.expand_section if operation == "expandir" else utils.rewrite_section
+    text = coalescer.run(request_key(operation, args), lambda: func(utils.setup_gemini_api(), *args))
+    return {"texto": text}
+
+def export_pdf(payload):
+    """
+    Exporta para PDF um trabalho enviado no corpo ou salvo no histórico
+
+    Returns:
+        Caminho do arquivo PDF gerado
+    """
+    if payload.get("trabalho"):
+        work_data = payload["trabalho"]
+        if not isinstance(work_data, dict):
+            raise RequestError("Campo 'trabalho' deve ser um objeto JSON")
+        for field in utils.PDF_FIELDS:
+            if not isinstance(work_data.get(field, ""), str):
+                raise RequestError(f"Campo 'trabalho.{field}' deve ser um texto")
+    elif payload.get("json_filename"):
+        # Apenas arquivos da pasta de histórico podem ser lidos
+        json_filename = _text_field(payload, "json_filename")
+        filename = os.path.join(config.HISTORY_FOLDER, os.path.basename(json_filename))
+        if not os.path.isfile(filename):
+            raise RequestError(f"Trabalho não encontrado: {json_filename!r}", status=404)
+        work_data = utils.load_work_from_json(filename)
+    else:
+        raise RequestError("Informe 'trabalho' ou 'json_filename'")
+    return coalescer.run(request_key("pdf", work_data), lambda: utils.export_to_pdf(work_data))
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    Atende as rotas do serviço; cada requisição é tratada em uma thread própria
+    """
+
+    server_version = "TrabalhosAcademicos/1.0"
+
+    def _send(self, status, body, content_type="application/json; charset=utf-8"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise RequestError(f"Corpo da requisição inválido: {e}") from e
+        if not isinstance(payload, dict):
+            raise RequestError("O corpo da requisição deve ser um objeto JSON")
+        return payload
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, metrics.collector.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/status":
+            self._send(200, dict(coalescer.stats(), hedging=hedging.get_hedger().stats()))
+        else:
+            self._send(404, {"erro": f"Rota não encontrada: {self.path}"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+            if self.path == "/trabalhos":
+                self._send(200, generate_work(payload))
+            elif self.path in ("/expandir", "/reescrever"):
+                self._send(200, edit_section(self.path.lstrip("/"), payload))
+            elif self.path == "/pdf":
+                with open(export_pdf(payload), "rb") as f:
+                    self._send(200, f.read(), "application/pdf")
+            else:
+                self._send(404, {"erro": f"Rota não encontrada: {self.path}"})
+        except RequestError as e:
+            self._send(e.status, {"erro": str(e)})
+        except UPSTREAM_ERRORS as e:
+            print(f"Falha do modelo ao atender {self.path}: {e}", file=sys.stderr)
+            self._send(502, {"erro": str(e)})
+        except Exception as e:
+            print(f"Erro ao atender {self.path}: {e}", file=sys.stderr)
+            self._send(500, {"erro": str(e)})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON para gerar, editar e exportar trabalhos acadêmicos")
+    parser.add_argument("--host", default=config.SERVER_HOST, help=f"Endereço de escuta (padrão: {config.SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT, help=f"Porta de escuta (padrão: {config.SERVER_PORT})")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    print(f"Servindo em http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
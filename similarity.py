@@ -0,0 +1,140 @@
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter
+import config
+import history_index
+from summarizer import STOPWORDS
+
+# Índice local de similaridade entre temas, para reaproveitar trabalhos já gerados sobre temas quase idênticos
+# Cada trabalho do histórico é representado por um vetor TF-IDF dos termos do tema, construído da mesma forma que
+# o vetor da consulta (o novo trabalho ainda não tem título), de modo que um tema repetido tem similaridade 1;
+# a consulta percorre apenas as listas invertidas dos termos do novo tema e retorna os mais próximos pelo cosseno.
+# O índice fica em memória e é atualizado de forma incremental a partir do índice do histórico (history_index.py).
+
+_WORD = re.compile(r"\w+")
+
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+def _stem(word):
+    # Redução simples de plurais ("impactos" -> "impacto", "redes" -> "rede")
+    if len(word) > 4 and word.endswith("s"):
+        return word[:-1]
+    return word
+
+def terms(text):
+    """
+    Extrai os termos de um tema: minúsculas, sem acentos, sem palavras vazias e com as abreviações expandidas
+    """
+    words = []
+    for word in _WORD.findall(text.lower()):
+        words.extend(config.SIMILARITY_ABBREVIATIONS.get(_strip_accents(word), word).split())
+    return [_stem(_strip_accents(word)) for word in words if word not in STOPWORDS and len(word) > 1 and not word.isdigit()]
+
+def features(tema):
+    """
+    Retorna o dicionário {termo: frequência} dos termos do tema, usado tanto nos trabalhos indexados quanto na consulta
+    """
+    return dict(Counter(terms(tema)))
+
+class ThemeIndex:
+    """
+    Índice invertido de termos dos temas, com consulta dos k trabalhos mais similares
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._docs = {}
+        self._postings = {}
+        self._norms = {}
+        self._norms_size = 0
+        self._last_rowid = 0
+
+    def add(self, rowid, work):
+        """
+        Adiciona ao índice um trabalho com os metadados do histórico (tema, titulo, nivel_academico...)
+        """
+        doc_features = features(work.get("tema") or "")
+        self._docs[rowid] = (doc_features, work)
+        for term, weight in doc_features.items():
+            self._postings.setdefault(term, {})[rowid] = weight
+        self._last_rowid = max(self._last_rowid, rowid)
+
+    def refresh(self):
+        """
+        Acrescenta os trabalhos salvos desde a última atualização; se algum foi removido, reconstrói o índice
+        """
+        new_rows = history_index.works_since(self._last_rowid)
+        if history_index.count_works() < len(self._docs) + len(new_rows):
+            self._reset()
+            new_rows = history_index.works_since(0)
+        for row in new_rows:
+            self.add(row.pop("rowid"), row)
+
+    def _idf(self, term):
+        return math.log((1 + len(self._docs)) / (1 + len(self._postings.get(term, ())))) + 1
+
+    def _norm(self, rowid):
+        # As normas usam o IDF do momento em que foram calculadas e são refeitas quando o índice cresce 10%
+        if len(self._docs) > self._norms_size * 1.1:
+            self._norms = {}
+            self._norms_size = len(self._docs)
+        if rowid not in self._norms:
+            doc_features = self._docs[rowid][0]
+            self._norms[rowid] = math.sqrt(sum((weight * self._idf(term)) ** 2 for term, weight in doc_features.items()))
+        return self._norms[rowid]
+
+    def search(self, tema, limit=5, threshold=0.0, nivel_academico=None):
+        """
+        Busca os trabalhos com tema mais similar
+
+        Args:
+            tema: Tema do novo trabalho
+            limit: Número máximo de resultados
+            threshold: Similaridade mínima (cosseno, de 0 a 1)
+            nivel_academico: Se informado, considera apenas trabalhos do mesmo nível
+
+        Returns:
+            Lista de dicionários com os metadados do trabalho e a similaridade em "score", da maior para a menor
+        """
+        with self._lock:
+            self.refresh()
+            query = {term: weight * self._idf(term) for term, weight in features(tema).items()}
+            query_norm = math.sqrt(sum(weight ** 2 for weight in query.values()))
+            if not query_norm:
+                return []
+
+            dots = Counter()
+            for term, query_weight in query.items():
+                factor = query_weight * self._idf(term)
+                for rowid, weight in self._postings.get(term, {}).items():
+                    dots[rowid] += factor * weight
+
+            results = []
+            for rowid, dot in dots.items():
+                work = self._docs[rowid][1]
+                if nivel_academico and work.get("nivel_academico") != nivel_academico:
+                    continue
+                score = dot / (query_norm * self._norm(rowid))
+                if score >= threshold:
+                    results.append(dict(work, score=round(score, 3)))
+        results.sort(key=lambda work: work["score"], reverse=True)
+        return results[:limit]
+
+_index = ThemeIndex()
+
+def find_similar(tema, nivel_academico=None, limit=None, threshold=None):
+    """
+    Retorna os trabalhos salvos com tema quase idêntico ao informado (padrões: config.SIMILARITY_TOP_K e
+    config.SIMILARITY_THRESHOLD)
+    """
+    if limit is None:
+        limit = config.SIMILARITY_TOP_K
+    if threshold is None:
+        threshold = config.SIMILARITY_THRESHOLD
+    return _index.search(tema, limit, threshold, nivel_academico)
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import argparse
+import zlib
+import hashlib
+import threading
+import config
+
+# Armazenamento dos trabalhos salvos no histórico
+# Cada trabalho tem um registro JSON na pasta de histórico; no backend "blobs", o registro guarda apenas
+# os metadados e o hash de cada seção, e o texto fica comprimido em arquivos endereçados pelo conteúdo
+# (seções idênticas são armazenadas uma única vez)
+
+# Seções de texto armazenadas fora do registro no backend "blobs"
+SECTION_FIELDS = ["introducao", "desenvolvimento", "conclusao", "referencias"]
+
+def _write_atomic(path, data):
+    """
+    Grava os bytes em um arquivo temporário e o renomeia para o destino, sem deixar arquivos truncados
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class JsonStorage:
+    """
+    Backend original: o trabalho completo em um único arquivo JSON formatado
+    """
+
+    name = "json"
+
+    def save(self, filepath, work_data):
+        _write_atomic(filepath, json.dumps(work_data, ensure_ascii=False, indent=4).encode("utf-8"))
+
+    def load(self, record):
+        return record
+
+class BlobStorage:
+    """
+    Backend com as seções comprimidas (zlib) e endereçadas pelo hash SHA-256 do texto
+    """
+
+    name = "blobs"
+
+    def __init__(self, folder, level=6):
+        """
+        Args:
+            folder: Pasta onde os blobs das seções são armazenados
+            level: Nível de compressão do zlib (1 a 9)
+        """
+        self.folder = folder
+        self.level = level
+
+    def _path(self, digest):
+        return os.path.join(self.folder, digest[:2], f"{digest}.z")
+
+    def put(self, text):
+        """
+        Armazena o texto, se ainda não existir, e retorna o seu hash
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, zlib.compress(data, self.level))
+        return digest
+
+    def get(self, digest):
+        """
+        Retorna o texto armazenado com o hash indicado
+        """
+        with open(self._path(digest), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+
+    def save(self, filepath, work_data):
+        record = {name: value for name, value in work_data.items() if name not in SECTION_FIELDS}
+        record["storage"] = self.name
+        record["sections"] = {
+            name: self.put(work_data[name]) for name in SECTION_FIELDS if isinstance(work_data.get(name), str)
+        }
+        _write_atomic(filepath, json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def load(self, record):
+        work_data = {name: value for name, value in record.items() if name not in ("storage", "sections")}
+        for name, digest in record.get("sections", {}).items():
+            work_data[name] = self.get(digest)
+        return work_data
+
+    def referenced_blobs(self, history_folder, journal_folder):
+        """
+        Retorna os hashes das seções usadas pelos registros da pasta de histórico e pelos diários de revisões
+
+        Args:
+            history_folder: Pasta com os registros dos trabalhos salvos
+            journal_folder: Pasta com os diários de revisões (*.jsonl)
+        """
+        digests = set()
+        if os.path.isdir(journal_folder):
+            for filename in os.listdir(journal_folder):
+                if not filename.endswith(".jsonl"):
+                    continue
+                with open(os.path.join(journal_folder, filename), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            digests.update(json.loads(line)["sections"].values())
+                        except (ValueError, KeyError):
+                            continue
+        for filename in os.listdir(history_folder) if os.path.isdir(history_folder) else []:
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(history_folder, filename), "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if record.get("storage") == self.name:
+                digests.update(record.get("sections", {}).values())
+        return digests
+
+    def collect_garbage(self, history_folder, journal_folder):
+        """
+        Remove os blobs que não são mais usados por nenhum trabalho nem por nenhuma revisão do diário
+        Deve rodar como manutenção (python storage.py --gc), sem gerações em andamento: um blob recém-gravado
+        ainda sem registro seria removido
+
+        Returns:
+            Número de blobs removidos
+        """
+        referenced = self.referenced_blobs(history_folder, journal_folder)
+        removed = 0
+        if not os.path.isdir(self.folder):
+            return removed
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if name.endswith(".z") and name[:-2] not in referenced:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(name=None):
+    """
+    Retorna o backend de armazenamento indicado (padrão: config.STORAGE_BACKEND)
+    """
+    name = name or config.STORAGE_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            if name == JsonStorage.name:
+                _backends[name] = JsonStorage()
+            elif name == BlobStorage.name:
+                _backends[name] = BlobStorage(config.BLOB_FOLDER, config.BLOB_COMPRESSION_LEVEL)
+            else:
+                raise ValueError(f"Backend de armazenamento desconhecido: {name!r}")
+        return _backends[name]
+
+def save_work(filepath, work_data):
+    """
+    Grava o trabalho com o backend configurado
+    """
+    get_backend().save(filepath, work_data)
+
+def load_work(filepath):
+    """
+    Lê um trabalho salvo por qualquer backend, identificado pelo próprio registro
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        record = json.load(f)
+    return get_backend(record.get("storage", JsonStorage.name)).load(record)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção do armazenamento dos trabalhos salvos")
+    parser.add_argument("--gc", action="store_true",
+                        help=f"Remove de {config.BLOB_FOLDER} os blobs que nenhum trabalho ou revisão usa mais")
+    args = parser.parse_args(argv)
+
+    if not args.gc:
+        parser.print_help()
+        return 1
+    removed = get_backend(BlobStorage.name).collect_garbage(config.HISTORY_FOLDER, config.JOURNAL_FOLDER)
+    print(json.dumps({"removed_blobs": removed}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
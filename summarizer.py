@@ -0,0 +1,159 @@
+import re
+import math
+from collections import Counter
+
+# Resumo extrativo local do desenvolvimento, sem chamadas à API
+# Extrai todas as citações (autor, ano) e as frases mais representativas de cada subseção,
+# formando um contexto compacto para as etapas de conclusão e referências
+
+# Palavras muito frequentes em português, ignoradas na pontuação das frases
+STOPWORDS = set("""
+a à às ao aos as o os um uma uns umas de da das do dos dum duma em na nas no nos num numa por pela pelas pelo pelos
+para pra com sem sob sobre entre até após ante contra desde e ou mas nem que se como quando onde porque pois porém
+também já ainda mais menos muito muita muitos muitas pouco tão tanto bem assim então logo isso isto aquilo esse essa
+esses essas este esta estes estas aquele aquela aqueles aquelas ele ela eles elas seu sua seus suas nosso nossa
+lhe lhes eu tu nós vós você vocês me te se si é são ser sido sendo foi foram era eram será serão seja sejam está
+estão estar esteve há ter tem têm tinha tido pode podem poder deve devem cada qual quais outro outra outros outras
+mesmo mesma todo toda todos todas não sim apenas segundo conforme et al p pp ano anos
+""".split())
+
+# Citação narrativa: "Silva (2020)", "Silva e Souza (2019, p. 12)", "Silva et al. (2018)"
+_NARRATIVE_CITATION = re.compile(
+    r"(?P<autor>[A-ZÀ-Ý][\wÀ-ÿ'-]+(?:\s+(?:et al\.|e|&)(?:\s+[A-ZÀ-Ý][\wÀ-ÿ'-]+)?)?)\s*"
+    r"\((?P<ano>\d{4}[a-z]?)(?:,[^)]*)?\)"
+)
+# Citação entre parênteses: "(SILVA, 2020)", "(Silva; Souza, 2019, p. 3)", "(Silva, 2020; Costa, 2018)"
+_PARENTHETICAL = re.compile(r"\(([^()]*\d{4}[^()]*)\)")
+# Cada parte separada por ";" começa pelo autor, com inicial maiúscula ("(entre 2010 e 2020)" não é citação);
+# partes sem ano ("Silva" em "(Silva; Souza, 2019)") recebem o ano da parte seguinte que o tem
+_PARENTHETICAL_PART = re.compile(r"^\s*(?P<autor>[A-ZÀ-Ý][^,\d]*?),?\s+(?P<ano>\d{4}[a-z]?)\b")
+_PARENTHETICAL_AUTHOR = re.compile(r"^\s*(?P<autor>[A-ZÀ-Ý][^,\d]*?)\s*,?\s*$")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-ZÀ-Ý\"'(])")
+_WORD = re.compile(r"[\wÀ-ÿ]+")
+
+def extract_citations(text):
+    """
+    Extrai as citações autor-data do texto, nos formatos ABNT e APA (narrativas e entre parênteses)
+
+    Args:
+        text: Texto a ser analisado
+
+    Returns:
+        Lista de tuplas (autor, ano) sem repetições, na ordem em que aparecem no texto
+    """
+    found = []
+    for match in _NARRATIVE_CITATION.finditer(text):
+        found.append((match.start(), match.group("autor"), match.group("ano")))
+    for match in _PARENTHETICAL.finditer(text):
+        pending = []
+        for part in match.group(1).split(";"):
+            part_match = _PARENTHETICAL_PART.match(part)
+            if part_match:
+                for autor in pending + [part_match.group("autor")]:
+                    found.append((match.start(), autor, part_match.group("ano")))
+                pending = []
+                continue
+            author_match = _PARENTHETICAL_AUTHOR.match(part)
+            pending = pending + [author_match.group("autor")] if author_match else []
+
+    citations = []
+    seen = set()
+    for _, autor, ano in sorted(found, key=lambda item: item[0]):
+        autor = " ".join(autor.split())
+        key = (autor.lower(), ano)
+        if key not in seen:
+            seen.add(key)
+            citations.append((autor, ano))
+    return citations
+
+def split_sentences(text):
+    """
+    Divide o texto em frases, ignorando parágrafos vazios
+    """
+    sentences = []
+    for paragrafo in text.split("\n"):
+        paragrafo = paragrafo.strip()
+        if paragrafo:
+            sentences.extend(s.strip() for s in _SENTENCE_END.split(paragrafo) if s.strip())
+    return sentences
+
+def _content_words(sentence):
+    return [w for w in _WORD.findall(sentence.lower()) if len(w) > 2 and w not in STOPWORDS and not w.isdigit()]
+
+def top_sentences(text, count):
+    """
+    Seleciona as frases mais representativas do texto pela frequência das palavras de conteúdo
+
+    Args:
+        text: Texto a ser resumido
+        count: Número máximo de frases
+
+    Returns:
+        Lista com as frases escolhidas, na ordem original do texto
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= count:
+        return sentences
+
+    frequencies = Counter(w for sentence in sentences for w in _content_words(sentence))
+    if not frequencies:
+        return sentences[:count]
+    top = max(frequencies.values())
+
+    scores = []
+    for i, sentence in enumerate(sentences):
+        words = _content_words(sentence)
+        if not words:
+            scores.append((0.0, i))
+            continue
+        # Soma das frequências normalizada pela raiz do tamanho, para não favorecer só frases longas
+        score = sum(frequencies[w] / top for w in words) / math.sqrt(len(words))
+        scores.append((score, i))
+
+    chosen = sorted(i for _, i in sorted(scores, key=lambda item: (-item[0], item[1]))[:count])
+    return [sentences[i] for i in chosen]
+
+def format_citations(citations):
+    """
+    Formata as citações extraídas como "Autor (ano)", separadas por ponto e vírgula
+    """
+    return "; ".join(f"{autor} ({ano})" for autor, ano in citations)
+
+def shorten(sentence, max_chars):
+    """
+    Encurta a frase no último espaço antes do limite de caracteres
+    """
+    if not max_chars or len(sentence) <= max_chars:
+        return sentence
+    return sentence[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + "..."
+
+def digest(subsections, sentences_per_subsection=2, include_citations=True, max_sentence_chars=None):
+    """
+    Monta o resumo compacto de uma seção dividida em subseções
+
+    Args:
+        subsections: Lista de tuplas (subtítulo ou None, texto da subseção)
+        sentences_per_subsection: Número de frases extraídas de cada subseção
+        include_citations: Se True, inclui a lista completa de citações ao final
+        max_sentence_chars: Tamanho máximo de cada frase extraída (None mantém as frases inteiras)
+
+    Returns:
+        String com os subtítulos, as frases principais de cada subseção e as citações encontradas
+    """
+    lines = []
+    for titulo, texto in subsections:
+        corpo = texto.strip()
+        if titulo and corpo.startswith(titulo):
+            corpo = corpo[len(titulo):].strip()
+        frases = " ".join(shorten(frase, max_sentence_chars) for frase in top_sentences(corpo, sentences_per_subsection))
+        if titulo:
+            lines.append(f"- {titulo}: {frases}" if frases else f"- {titulo}")
+        elif frases:
+            lines.append(f"- {frases}")
+
+    if include_citations:
+        citations = extract_citations("\n\n".join(texto for _, texto in subsections))
+        lines.append("")
+        lines.append(f"Citações: {format_citations(citations)}" if citations else "Citações: nenhuma")
+    return "\n".join(lines).strip()
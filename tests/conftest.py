@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import config
+import utils
+import jobs
+import storage
+import hedging
+import rate_limit
+import similarity
+import response_cache
+from fake_gemini import FakeGenerativeModel
+
+# Cada teste roda em uma pasta temporária (os caminhos do config.py são relativos), sem cota da API
+# e com o modelo falso no lugar do Gemini, como na suíte de benchmarks
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "RATE_LIMIT_REQUESTS_PER_MINUTE", None)
+    monkeypatch.setattr(config, "RATE_LIMIT_TOKENS_PER_MINUTE", None)
+    monkeypatch.setattr(config, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(config, "METRICS_JSONL_FILE", None)
+    # Instâncias compartilhadas pelo processo, criadas a partir do config.py
+    monkeypatch.setattr(rate_limit, "_limiter", None)
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.setattr(hedging, "_hedger", None)
+    monkeypatch.setattr(storage, "_backends", {})
+    monkeypatch.setattr(similarity, "_index", similarity.ThemeIndex())
+    monkeypatch.setattr(jobs, "_executor", None)
+    yield tmp_path
+    if jobs._executor is not None:
+        jobs._executor.shutdown(wait=True, cancel_futures=True)
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeGenerativeModel(output_chars=600)
+    monkeypatch.setattr(utils, "get_model", lambda *args, **kwargs: model)
+    return model
+
+@pytest.fixture
+def save_work():
+    """
+    Grava no histórico um trabalho de exemplo e o retorna com o json_filename; os campos informados
+    substituem os valores padrão
+    """
+    def save(tema, nivel_academico="Graduação", **fields):
+        work = {
+            "tema": tema,
+            "nivel_academico": nivel_academico,
+            "estilo_referencia": "ABNT",
+            "titulo": f"Estudo sobre {tema}",
+            "introducao": "Introdução.",
+            "desenvolvimento": "1. Contexto\n\nTexto do desenvolvimento.",
+            "conclusao": "Conclusão.",
+            "referencias": "SILVA, J. Obra. 2020.",
+        }
+        work.update(fields)
+        work["json_filename"] = utils.save_work_to_json(dict(work))
+        return work
+    return save
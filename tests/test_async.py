@@ -0,0 +1,53 @@
+import time
+import asyncio
+
+import config
+import metrics
+import utils
+
+class _SlowHook:
+    # Gancho de métricas lento, como a gravação em disco do arquivo JSONL
+    def __call__(self, event):
+        time.sleep(0.05)
+
+async def _max_loop_gap(coro):
+    gaps = []
+    
+    async def _ticker():
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+    
+    ticker = asyncio.ensure_future(_ticker())
+    try:
+        result = await coro
+    finally:
+        ticker.cancel()
+    return result, max(gaps)
+
+def test_generate_academic_work_async(fake_model):
+    work = asyncio.run(utils.generate_academic_work_async("Energia solar no Brasil", "Graduação", "ABNT", use_cache=False))
+    assert fake_model.calls == 5
+    assert utils.load_work_from_json(work["json_filename"])["titulo"] == work["titulo"]
+
+def test_async_path_does_not_block_the_event_loop(fake_model, monkeypatch):
+    monkeypatch.setattr(config, "TOKEN_COUNT_METHOD", "api")
+    monkeypatch.setattr(config, "CACHE_ENABLED", True)
+    original_count = fake_model.count_tokens
+    
+    def slow_count(contents, **kwargs):
+        time.sleep(0.1)
+        return original_count(contents, **kwargs)
+    
+    monkeypatch.setattr(fake_model, "count_tokens", slow_count)
+    hook = _SlowHook()
+    metrics.add_hook(hook)
+    try:
+        text, gap = asyncio.run(_max_loop_gap(utils.expand_section_async(fake_model, "Texto da seção.", "Conclusão", "Graduação")))
+    finally:
+        metrics.remove_hook(hook)
+    assert text
+    assert gap < 0.05
@@ -0,0 +1,39 @@
+import json
+
+import batch
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def _job(tema):
+    return json.dumps({"tema": tema, "nivel_academico": "Graduação", "estilo_referencia": "APA"}, ensure_ascii=False)
+
+def test_keys_survive_inserted_lines(tmp_path):
+    path = tmp_path / "lote.jsonl"
+    _write(path, [_job("Energia solar"), _job("Mobilidade urbana")])
+    before = {key for key, _ in batch.read_jobs(path)[0]}
+    _write(path, [_job("Reciclagem"), _job("Energia solar"), _job("Mobilidade urbana")])
+    after = {key for key, _ in batch.read_jobs(path)[0]}
+    assert before < after
+
+def test_repeated_lines_get_distinct_keys(tmp_path):
+    path = tmp_path / "lote.jsonl"
+    _write(path, [_job("Energia solar"), _job("Energia solar")])
+    keys = [key for key, _ in batch.read_jobs(path)[0]]
+    assert len(set(keys)) == 2
+
+def test_malformed_lines_are_skipped(tmp_path, fake_model):
+    path = tmp_path / "lote.jsonl"
+    _write(path, [_job("Energia solar"), "{nao e json", "[1, 2]", _job("Mobilidade urbana")])
+    summary = batch.run_batch(str(path), workers=2, use_cache=False)
+    assert summary["done"] == 2
+    assert summary["invalid_lines"] == [2, 3]
+
+def test_resume_skips_completed_jobs(tmp_path, fake_model):
+    path = tmp_path / "lote.jsonl"
+    _write(path, [_job("Energia solar")])
+    assert batch.run_batch(str(path), workers=1, use_cache=False)["done"] == 1
+    _write(path, [_job("Reciclagem"), _job("Energia solar")])
+    summary = batch.run_batch(str(path), workers=1, use_cache=False)
+    assert summary["skipped"] == 1
+    assert summary["done"] == 1
@@ -0,0 +1,89 @@
+import time
+import threading
+
+import config
+import hedging
+import rate_limit
+import utils
+
+def _hedger(**kwargs):
+    settings = dict(max_extra_fraction=1.0, min_samples=1, window=10, min_delay=0.05, max_workers=4)
+    settings.update(kwargs)
+    return hedging.Hedger(**settings)
+
+def _slow_first(seconds):
+    # A primeira tentativa demora; a duplicata responde logo
+    calls = []
+    lock = threading.Lock()
+
+    def func(stats):
+        with lock:
+            calls.append(stats)
+            first = len(calls) == 1
+        return rate_limit.call_with_retry(lambda: time.sleep(seconds if first else 0.01) or ("lenta" if first else "rápida"),
+                                          stats=stats)
+    return func, calls
+
+def test_each_attempt_fills_its_own_stats():
+    hedger = _hedger()
+    hedger._record("etapa", 0.05)
+    func, calls = _slow_first(0.5)
+    event = {"queue_seconds": 0.0}
+    assert hedger.call("etapa", func, event) == "rápida"
+    assert event["hedged"] and event["hedge_won"]
+    # O evento recebe as estatísticas da duplicata, e não as da tentativa descartada
+    assert len(calls) == 2 and calls[0] is not calls[1]
+    assert event["api_seconds"] < 0.2
+
+def test_latency_samples_exclude_queue_time():
+    hedger = _hedger(min_samples=100)
+
+    def func(stats):
+        # Espera pela cota antes da chamada ao modelo
+        time.sleep(0.2)
+        return rate_limit.call_with_retry(lambda: time.sleep(0.01), stats=stats)
+
+    hedger.call("etapa", func, {})
+    assert max(hedger._latencies["etapa"]) < 0.1
+
+def test_hedge_delay_starts_with_the_model_call():
+    hedger = _hedger()
+    hedger._record("etapa", 0.1)
+
+    def func(stats):
+        time.sleep(0.3)
+        return rate_limit.call_with_retry(lambda: time.sleep(0.01), stats=stats)
+
+    event = {}
+    hedger.call("etapa", func, event)
+    # A espera pela cota não conta como lentidão do modelo
+    assert not event.get("hedged")
+
+def test_losing_attempt_settles_its_tokens(fake_model, monkeypatch):
+    monkeypatch.setattr(config, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(config, "HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(config, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(config, "HEDGE_MAX_EXTRA_FRACTION", 1.0)
+    settled = []
+    monkeypatch.setattr(rate_limit.RateLimiter, "settle_tokens", lambda self, actual, estimated: settled.append(actual))
+    hedging.get_hedger()._record("titulo", 0.05)
+
+    original = fake_model.generate_content
+    first = threading.Event()
+    def generate_content(*args, **kwargs):
+        # Apenas a primeira chamada é lenta
+        if not first.is_set():
+            first.set()
+            time.sleep(0.4)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(fake_model, "generate_content", generate_content)
+
+    utils._generate_text(fake_model, "prompt", use_cache=False, stage="titulo")
+    assert len(settled) == 1
+    time.sleep(0.6)
+    assert len(settled) == 2 and None not in settled
+
+def test_stream_is_hedged_on_first_chunk(fake_model, monkeypatch):
+    monkeypatch.setattr(config, "HEDGE_ENABLED", True)
+    assert "".join(utils._stream_text(fake_model, "prompt", use_cache=False, stage="titulo"))
+    assert "titulo:stream" in hedging.get_hedger()._latencies
@@ -0,0 +1,28 @@
+import os
+import sqlite3
+
+import config
+import history_index
+
+def test_schema_is_created_once(save_work, monkeypatch):
+    save_work("Energia solar")
+    with sqlite3.connect(config.HISTORY_INDEX_FILE) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == history_index.SCHEMA_VERSION
+    # Com o banco já inicializado, o script do esquema não é mais executado
+    monkeypatch.setattr(history_index, "SCHEMA", "esquema inválido;")
+    assert history_index.count_works() == 1
+    assert len(history_index.query_works()) == 1
+
+def test_query_filters_and_search(save_work):
+    save_work("Energia solar", "Graduação")
+    save_work("Educação a distância", "Ensino Médio")
+    assert history_index.count_works({"nivel_academico": "Ensino Médio"}) == 1
+    assert [work["tema"] for work in history_index.query_works(limit=1, offset=0)]
+    assert history_index.search_works("solar")[0]["tema"] == "Energia solar"
+    assert history_index.count_search("solar") == 1
+
+def test_deleted_index_is_rebuilt(save_work):
+    save_work("Energia solar")
+    assert history_index.count_works() == 1
+    os.remove(config.HISTORY_INDEX_FILE)
+    assert history_index.count_works() == 1
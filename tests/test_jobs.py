@@ -0,0 +1,71 @@
+import time
+import json
+from contextlib import closing
+
+import config
+import jobs
+
+def _wait_for(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get_job(job_id)
+        if job["status"] in (jobs.STATUS_DONE, jobs.STATUS_FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"trabalho {job_id} não terminou")
+
+def _insert(job_id, status, progress=None, owner=None, heartbeat_at=None):
+    # Linha deixada por um processo anterior, interrompido durante a geração (ou ainda ativo, com heartbeat_at recente)
+    with closing(jobs._connect()) as conn:
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, tema, nivel_academico, estilo_referencia, created_at, started_at, progress, "
+                "owner, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, status, "Energia solar", "Graduação", "ABNT", time.time(), time.time(),
+                 json.dumps(progress) if progress else None, owner, heartbeat_at),
+            )
+
+def test_submitted_job_finishes(fake_model):
+    job = _wait_for(jobs.submit_job("Energia solar", "Graduação", "ABNT"))
+    assert job["status"] == jobs.STATUS_DONE
+    assert job["json_filename"]
+
+def test_stale_running_job_resumes_when_polled(fake_model):
+    _insert("interrompido", jobs.STATUS_RUNNING, {"titulo": "Título parcial"})
+    _insert("na-fila", jobs.STATUS_QUEUED)
+    # Nenhum trabalho novo é enviado: a consulta de status basta para retomar a fila
+    assert _wait_for("interrompido")["status"] == jobs.STATUS_DONE
+    assert _wait_for("na-fila")["status"] == jobs.STATUS_DONE
+
+def test_start_workers_resumes_interrupted_jobs(fake_model):
+    _insert("interrompido", jobs.STATUS_RUNNING)
+    jobs.start_workers()
+    deadline = time.monotonic() + 10
+    while jobs.list_jobs()[0]["status"] != jobs.STATUS_DONE:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+def test_job_of_live_process_is_not_requeued(fake_model, monkeypatch):
+    _insert("outro-processo", jobs.STATUS_RUNNING, {"titulo": "Título parcial"},
+            owner="outro-host:1234:abcd", heartbeat_at=time.time())
+    _insert("abandonado", jobs.STATUS_RUNNING, owner="outro-host:999:dcba", heartbeat_at=time.time() - 3600)
+    jobs.start_workers()
+    assert _wait_for("abandonado")["status"] == jobs.STATUS_DONE
+    job = jobs.get_job("outro-processo")
+    assert job["status"] == jobs.STATUS_RUNNING
+    assert job["progress"] == {"titulo": "Título parcial"}
+
+    # O dono para de renovar a posse depois que este processo já iniciou o pool
+    monkeypatch.setattr(config, "JOB_LEASE_SECONDS", 0)
+    assert _wait_for("outro-processo")["status"] == jobs.STATUS_DONE
+
+def test_cancel_running_job(fake_model):
+    fake_model.latency = 0.5
+    job_id = jobs.submit_job("Energia solar", "Graduação", "ABNT")
+    while jobs.get_job(job_id)["status"] != jobs.STATUS_RUNNING:
+        time.sleep(0.01)
+    assert jobs.cancel_job(job_id)
+    job = _wait_for(job_id, timeout=2)
+    assert job["status"] == jobs.STATUS_FAILED
+    assert job["error"] == "Geração cancelada"
+    assert fake_model.calls < 5
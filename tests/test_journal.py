@@ -0,0 +1,56 @@
+import os
+import multiprocessing
+
+import pytest
+
+import config
+import journal
+import storage
+import utils
+
+@pytest.fixture
+def work(save_work):
+    return save_work(
+        "Energia solar",
+        titulo="Energia solar no Brasil",
+        introducao="Introdução original.",
+        desenvolvimento="Desenvolvimento original.",
+        conclusao="Conclusão original.",
+    )
+
+def _edit_many(record_path, label, count):
+    work = journal.load_work(record_path)
+    for i in range(count):
+        journal.append_revision(record_path, work, {"conclusao": f"Conclusão {label} {i}."})
+
+def test_revisions_are_numbered_in_order(work):
+    first = utils.save_section_edit(work, {"conclusao": "Primeira edição."})
+    second = utils.save_section_edit(first, {"conclusao": "Segunda edição."})
+    assert (first["revision"], second["revision"]) == (1, 2)
+    assert utils.load_work_revision(work["json_filename"], 0)["conclusao"] == "Conclusão original."
+    assert utils.load_work_from_json(work["json_filename"])["conclusao"] == "Segunda edição."
+
+def test_concurrent_processes_get_distinct_revisions(work):
+    record_path = work["json_filename"]
+    # Processos independentes, como a interface e um processo de trabalhos editando o mesmo trabalho
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_edit_many, args=(record_path, label, 10)) for label in "ab"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    revisions = [entry["rev"] for entry in journal.read_entries(record_path)]
+    assert revisions == list(range(21))
+
+def test_garbage_collection_keeps_blobs_of_records_and_revisions(work):
+    utils.save_section_edit(work, {"conclusao": "Primeira edição."})
+    blobs = storage.get_backend("blobs")
+    orphan = blobs.put("Texto de um trabalho apagado.")
+
+    assert storage.main(["--gc"]) == 0
+    assert not os.path.exists(blobs._path(orphan))
+    # A conclusão original só é usada pela revisão 0 do diário
+    assert utils.load_work_revision(work["json_filename"], 0)["conclusao"] == "Conclusão original."
+    assert utils.load_work_from_json(work["json_filename"])["conclusao"] == "Primeira edição."
+    assert blobs.collect_garbage(config.HISTORY_FOLDER, config.JOURNAL_FOLDER) == 0
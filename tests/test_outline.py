@@ -0,0 +1,54 @@
+import time
+import threading
+
+import config
+import utils
+
+OUTLINE = ["Contexto histórico", "Fundamentos teóricos", "Aplicações práticas", "Desafios atuais"]
+
+def _outlined_stream(model):
+    return utils.generate_development_outlined(model, "Energia solar", "Graduação", "Título", "Introdução.", "ABNT",
+                                               stream=True, use_cache=False, outline=OUTLINE)
+
+def test_outlined_stream_keeps_outline_order(fake_model):
+    text = "".join(_outlined_stream(fake_model))
+    positions = [text.index(title) for title in OUTLINE]
+    assert positions == sorted(positions)
+    assert fake_model.calls == len(OUTLINE)
+
+def test_closing_outlined_stream_stops_section_streams(fake_model):
+    fake_model.output_chars = 4000
+    fake_model.chunk_chars = 50
+    fake_model.latency = 1.0
+    stream = _outlined_stream(fake_model)
+    next(stream)
+    next(stream)
+    stream.close()
+    served = fake_model.chunks_served
+    time.sleep(0.5)
+    # Cada seção em andamento entrega no máximo o trecho que já estava a caminho
+    assert fake_model.chunks_served - served <= config.OUTLINE_MAX_WORKERS
+    assert served < len(OUTLINE) * 4000 // 50
+
+def test_stop_event_interrupts_outlined_stream_waiting_for_first_section():
+    served = []
+    release = threading.Event()
+
+    def slow_section():
+        release.wait(2)
+        yield "primeira"
+
+    def fast_section():
+        for i in range(1000):
+            time.sleep(0.005)
+            served.append(i)
+            yield str(i)
+
+    stop = threading.Event()
+    threading.Timer(0.1, stop.set).start()
+    # A primeira seção ainda não respondeu: o sinal basta para encerrar as demais
+    assert list(utils._ordered_streams([slow_section(), fast_section()], 2, stop)) == []
+    count = len(served)
+    time.sleep(0.2)
+    assert len(served) - count <= 1
+    release.set()
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import config
+import rate_limit
+
+def _failing(times, result="ok"):
+    state = {"calls": 0}
+
+    def func():
+        state["calls"] += 1
+        if state["calls"] <= times:
+            raise google_exceptions.ResourceExhausted("cota excedida")
+        return result
+    return func, state
+
+@pytest.fixture
+def token_limit(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_TOKENS_PER_MINUTE", 10000)
+    return rate_limit.get_limiter().tokens
+
+def test_failed_attempts_refund_their_tokens(token_limit):
+    func, state = _failing(3)
+    assert rate_limit.call_with_retry(func, 1000) == "ok"
+    assert state["calls"] == 4
+    # Apenas a tentativa bem-sucedida consome a estimativa
+    assert 8990 <= token_limit.tokens <= 9100
+
+def test_failed_attempts_refund_their_tokens_async(token_limit):
+    func, state = _failing(3)
+
+    async def call():
+        return func()
+
+    assert asyncio.run(rate_limit.call_with_retry_async(call, 1000)) == "ok"
+    assert 8990 <= token_limit.tokens <= 9100
+
+def test_exhausted_retries_leave_the_bucket_intact(token_limit, monkeypatch):
+    monkeypatch.setattr(config, "RETRY_MAX_ATTEMPTS", 3)
+    func, _ = _failing(10)
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        rate_limit.call_with_retry(func, 1000)
+    assert token_limit.tokens >= 9990
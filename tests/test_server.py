@@ -0,0 +1,72 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import utils
+import server
+
+@pytest.fixture
+def base_url():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.RequestHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def _post(base_url, path, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(base_url + path, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+WORK = {"tema": "Energia solar", "nivel_academico": "Graduação", "estilo_referencia": "ABNT"}
+
+def test_generate_work(base_url, fake_model):
+    status, body = _post(base_url, "/trabalhos", WORK)
+    assert status == 200
+    assert body["titulo"]
+
+@pytest.mark.parametrize("body", [
+    b"{invalido",
+    b"[]",
+    dict(WORK, tema=123),
+    dict(WORK, tema="   "),
+    dict(WORK, nivel_academico="Doutorado"),
+    dict(WORK, modo_desenvolvimento=["esboco"]),
+])
+def test_invalid_body_is_bad_request(base_url, fake_model, body):
+    status, body = _post(base_url, "/trabalhos", body)
+    assert status == 400
+    assert fake_model.calls == 0
+
+def test_invalid_edit_and_pdf_bodies(base_url, fake_model):
+    assert _post(base_url, "/expandir", {"texto": ["a"], "secao": "Introdução", "nivel_academico": "Graduação"})[0] == 400
+    assert _post(base_url, "/pdf", {"trabalho": "texto"})[0] == 400
+    assert _post(base_url, "/pdf", {"trabalho": {"titulo": 1}})[0] == 400
+    assert _post(base_url, "/pdf", {"json_filename": "inexistente.json"})[0] == 404
+
+def test_upstream_failures_are_bad_gateway(base_url, fake_model):
+    # Resposta sem texto (ex.: bloqueada): response.text levantaria ValueError
+    fake_model.output_chars = 0
+    assert _post(base_url, "/trabalhos", WORK)[0] == 502
+
+    fake_model.output_chars = 600
+    fake_model.error_rate = 1.0
+    fake_model.error_factory = lambda: google_exceptions.InvalidArgument("Requisição recusada")
+    assert _post(base_url, "/trabalhos", dict(WORK, tema="Outro tema"))[0] == 502
+
+def test_internal_errors_are_server_errors(base_url, monkeypatch):
+    def missing_key(*args, **kwargs):
+        raise ValueError("API key not available")
+    monkeypatch.setattr(utils, "get_model", missing_key)
+    status, body = _post(base_url, "/trabalhos", WORK)
+    assert status == 500
+    assert "API key" in body["erro"]
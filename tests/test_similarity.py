@@ -0,0 +1,14 @@
+import similarity
+
+def test_exact_repeat_scores_one(save_work):
+    # Os termos do título não entram no vetor do trabalho, já que a consulta só tem o tema
+    save_work("Energia solar no Brasil", titulo="Geração fotovoltaica distribuída: desafios regulatórios")
+    save_work("Educação a distância", titulo="Ensino remoto na pandemia")
+    results = similarity.find_similar("Energia solar no Brasil", threshold=0.0)
+    assert results[0]["tema"] == "Energia solar no Brasil"
+    assert results[0]["score"] == 1.0
+
+def test_abbreviations_and_level_filter(save_work):
+    save_work("Impactos da IA na educação", titulo="Título")
+    assert similarity.find_similar("impacto da inteligência artificial na educação")[0]["score"] == 1.0
+    assert similarity.find_similar("Impactos da IA na educação", nivel_academico="Pós-Graduação") == []
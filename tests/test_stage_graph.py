@@ -0,0 +1,122 @@
+import time
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+import utils
+
+def _sleep_then(value, seconds):
+    def stage(*args):
+        time.sleep(seconds)
+        return value
+    return stage
+
+def test_independent_stages_run_concurrently():
+    stages = {
+        "a": (_sleep_then("A", 0.3), ("x",)),
+        "b": (_sleep_then("B", 0.3), ("x",)),
+        "c": (lambda a, b: a + b, ("a", "b")),
+    }
+    start = time.monotonic()
+    results = utils.run_stage_graph(stages, {"x": 1}, max_workers=2)
+    assert time.monotonic() - start < 0.55
+    assert results == {"x": 1, "a": "A", "b": "B", "c": "AB"}
+
+def test_dependencies_receive_values_in_declared_order():
+    stages = {
+        "soma": (lambda a, b: f"{a}-{b}", ("b", "a")),
+    }
+    assert utils.run_stage_graph(stages, {"a": 1, "b": 2})["soma"] == "2-1"
+
+def test_unsatisfied_dependency_raises():
+    with pytest.raises(ValueError):
+        utils.run_stage_graph({"a": (lambda y: y, ("y",))}, {"x": 1})
+
+def test_stage_error_propagates():
+    def fail(x):
+        raise RuntimeError("falhou")
+    with pytest.raises(RuntimeError, match="falhou"):
+        utils.run_stage_graph({"a": (fail, ("x",))}, {"x": 1})
+
+def test_stage_timeout():
+    started = []
+    stages = {
+        "lenta": (_sleep_then("L", 2), ("x",)),
+        "depois": (lambda lenta: started.append(lenta), ("lenta",)),
+    }
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match="lenta"):
+        utils.run_stage_graph(stages, {"x": 1}, timeouts={"lenta": 0.2})
+    assert time.monotonic() - start < 1
+    assert not started
+
+def test_cancel_event_stops_pending_stages():
+    cancel_event = threading.Event()
+    started = []
+    stages = {
+        "a": (_sleep_then("A", 1), ("x",)),
+        "b": (lambda a: started.append(a), ("a",)),
+    }
+    threading.Timer(0.1, cancel_event.set).start()
+    start = time.monotonic()
+    with pytest.raises(CancelledError):
+        utils.run_stage_graph(stages, {"x": 1}, cancel_event=cancel_event)
+    assert time.monotonic() - start < 0.9
+    assert not started
+
+def test_generate_academic_work_with_fake_model(fake_model):
+    fake_model.latency = 0.2
+    start = time.monotonic()
+    work = utils.generate_academic_work("Energia solar no Brasil", "Graduação", "ABNT", use_cache=False)
+    elapsed = time.monotonic() - start
+    # Conclusão e referências rodam em paralelo: 4 rodadas de latência para 5 chamadas
+    assert fake_model.calls == 5
+    assert elapsed < 5 * 0.2
+    for name in ("titulo", "introducao", "desenvolvimento", "conclusao", "referencias"):
+        assert work[name]
+    assert utils.load_work_from_json(work["json_filename"])["conclusao"] == work["conclusao"]
+
+def test_generate_academic_work_stage_timeout(fake_model, monkeypatch):
+    fake_model.latency = 1
+    monkeypatch.setattr(utils.config, "STAGE_TIMEOUT", 0.2)
+    monkeypatch.setattr(utils.config, "STAGE_TIMEOUTS", {})
+    with pytest.raises(TimeoutError, match="titulo"):
+        utils.generate_academic_work("Energia solar no Brasil", "Graduação", "ABNT", use_cache=False)
+
+def test_stream_academic_work_stage_timeout(fake_model, monkeypatch):
+    fake_model.latency = 1
+    monkeypatch.setattr(utils.config, "STAGE_TIMEOUTS", {})
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match="introducao"):
+        for _ in utils.stream_academic_work("Energia solar no Brasil", "Graduação", "ABNT", use_cache=False,
+                                            warm_start={"titulo": "Título"}, timeouts={"introducao": 0.2}):
+            pass
+    assert time.monotonic() - start < 0.9
+
+def test_stream_academic_work_cancel_event(fake_model):
+    fake_model.latency = 0.3
+    cancel_event = threading.Event()
+    sections = []
+    threading.Timer(0.1, cancel_event.set).start()
+    with pytest.raises(CancelledError):
+        for secao, _ in utils.stream_academic_work("Energia solar no Brasil", "Graduação", "ABNT", use_cache=False,
+                                                   cancel_event=cancel_event):
+            sections.append(secao)
+    assert "desenvolvimento" not in sections
+
+@pytest.mark.parametrize("development_mode", ["completo", "esboco"])
+def test_stream_cancel_stops_model_streams(fake_model, development_mode):
+    fake_model.output_chars = 4000
+    fake_model.chunk_chars = 50
+    fake_model.latency = 1.0
+    cancel_event = threading.Event()
+    with pytest.raises(CancelledError):
+        for secao, _ in utils.stream_academic_work("Energia solar no Brasil", "Graduação", "ABNT", use_cache=False,
+                                                   development_mode=development_mode, cancel_event=cancel_event):
+            if secao == "desenvolvimento":
+                cancel_event.set()
+    served = fake_model.chunks_served
+    time.sleep(0.5)
+    # As chamadas em andamento (uma por seção no modo esboço) param no trecho que já estava a caminho
+    assert fake_model.chunks_served - served <= utils.config.OUTLINE_MAX_WORKERS
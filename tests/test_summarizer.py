@@ -0,0 +1,20 @@
+from summarizer import extract_citations
+
+def test_authors_sharing_a_year():
+    assert extract_citations("Como apontado (SILVA; SOUZA, 2019).") == [("SILVA", "2019"), ("SOUZA", "2019")]
+    assert extract_citations("Segundo a literatura (Silva; Souza, 2019, p. 3).") == [("Silva", "2019"), ("Souza", "2019")]
+
+def test_multiple_parenthetical_citations():
+    assert extract_citations("Há consenso (Silva, 2020; Costa, 2018).") == [("Silva", "2020"), ("Costa", "2018")]
+    assert extract_citations("Veja (ALMEIDA; PEREIRA, 2015; COSTA, 2018)") == [
+        ("ALMEIDA", "2015"), ("PEREIRA", "2015"), ("COSTA", "2018"),
+    ]
+
+def test_parenthetical_without_author_is_not_a_citation():
+    assert extract_citations("O período analisado (entre 2010 e 2020) foi marcado por crises.") == []
+    assert extract_citations("Os dados (coletados em 2021) mostram avanços.") == []
+
+def test_narrative_citations():
+    assert extract_citations("Silva e Souza (2019, p. 12) e Costa et al. (2018) discutem o tema.") == [
+        ("Silva e Souza", "2019"), ("Costa et al.", "2018"),
+    ]
@@ -0,0 +1,59 @@
+import pytest
+
+import config
+import metrics
+import utils
+import token_budget
+from token_budget import Budget
+
+@pytest.fixture
+def events():
+    captured = []
+    metrics.add_hook(captured.append)
+    yield captured
+    metrics.remove_hook(captured.append)
+
+def test_plan_reserves_thinking_tokens(monkeypatch):
+    monkeypatch.setattr(config, "TOKEN_BUDGET_THINKING_RESERVE", 2048)
+    assert token_budget.plan("titulo", "Graduação").output_tokens == config.TOKEN_BUDGETS["titulo"]["output"] + 2048
+
+def test_truncated_response_is_retried_with_larger_budget(fake_model, events):
+    # O raciocínio consome parte do limite e o texto não cabe no restante
+    fake_model.thinking_tokens = 100
+    text = utils._generate_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 250))
+    assert fake_model.calls == 2
+    assert text == fake_model._text_for("prompt").strip()
+    assert events[-1]["truncated"] and events[-1]["max_output_tokens"] == 500
+
+    # O texto completo fica no cache sob o limite original
+    assert utils._generate_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 250)) == text
+    assert fake_model.calls == 2
+
+def test_truncated_response_is_not_cached(fake_model, monkeypatch):
+    monkeypatch.setattr(config, "TOKEN_BUDGET_TRUNCATION_RETRIES", 0)
+    fake_model.thinking_tokens = 100
+    with pytest.raises(utils.ModelResponseError, match="MAX_TOKENS"):
+        utils._generate_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 250))
+    with pytest.raises(utils.ModelResponseError):
+        utils._generate_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 250))
+    assert fake_model.calls == 2
+
+def test_thinking_exhausts_budget_without_text(fake_model):
+    # Sem nenhuma parte de texto, response.text levantaria ValueError
+    fake_model.thinking_tokens = 10000
+    with pytest.raises(utils.ModelResponseError, match="MAX_TOKENS"):
+        utils._generate_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 250))
+    assert fake_model.calls == 2
+
+def test_empty_response_raises_clear_error(fake_model):
+    fake_model.output_chars = 0
+    with pytest.raises(utils.ModelResponseError, match="STOP"):
+        utils._generate_text(fake_model, "prompt", stage="titulo")
+
+def test_truncated_stream_raises_and_is_not_cached(fake_model):
+    fake_model.thinking_tokens = 100
+    with pytest.raises(utils.ModelResponseError, match="MAX_TOKENS"):
+        "".join(utils._stream_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 250)))
+    assert "".join(utils._stream_text(fake_model, "prompt", stage="titulo", budget=Budget(None, 1000))) \
+        == fake_model._text_for("prompt").strip()
+    assert fake_model.calls == 2
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+import config
+import rate_limit
+import metrics
+
+# Planejamento do uso de tokens por etapa da geração
+# Cada etapa tem um orçamento (config.TOKEN_BUDGETS) para o contexto variável incluído no prompt
+# (introdução, resumo do desenvolvimento, texto da seção) e para a resposta (max_output_tokens),
+# ajustado pelo nível acadêmico. Os tokens são contados localmente ou pela API (count_tokens),
+# com cache pelo hash do texto, e a previsão é registrada junto com o uso real nas métricas.
+
+Budget = namedtuple("Budget", ["context_tokens", "output_tokens"])
+
+_counts = OrderedDict()
+_counts_lock = threading.Lock()
+
+def _scale(tokens, factor):
+    return None if tokens is None else max(1, int(tokens * factor))
+
+def plan(stage, nivel_academico=None, input_tokens=0):
+    """
+    Calcula o orçamento de tokens de uma etapa
+
+    Args:
+        stage: Nome da etapa (chave de config.TOKEN_BUDGETS)
+        nivel_academico: Nível acadêmico, que ajusta o orçamento por config.TOKEN_BUDGET_LEVEL_FACTORS
+        input_tokens: Tokens do texto de entrada, nas etapas cuja resposta cresce com ele (expandir, reescrever)
+
+    Returns:
+        Budget(context_tokens, output_tokens); None indica ausência de limite
+    """
+    budget = config.TOKEN_BUDGETS.get(stage) if config.TOKEN_BUDGET_ENABLED else None
+    if not budget:
+        return Budget(None, None)
+    factor = config.TOKEN_BUDGET_LEVEL_FACTORS.get(nivel_academico, 1.0)
+    output_tokens = _scale(budget.get("output"), factor)
+    if output_tokens is not None and budget.get("output_per_input"):
+        # A resposta reescreve ou amplia a entrada: o limite acompanha o tamanho dela
+        output_tokens = max(output_tokens, int(input_tokens * budget["output_per_input"]))
+        if config.TOKEN_BUDGET_MAX_OUTPUT:
+            output_tokens = min(output_tokens, config.TOKEN_BUDGET_MAX_OUTPUT)
+    if output_tokens is not None:
+        # Nos modelos 2.5, o raciocínio consome o mesmo limite antes do texto da resposta
+        output_tokens += config.TOKEN_BUDGET_THINKING_RESERVE or 0
+    return Budget(_scale(budget.get("context"), factor), output_tokens)
+
+def count_tokens(model, text):
+    """
+    Conta os tokens do texto, localmente ou com a API (config.TOKEN_COUNT_METHOD), com cache pelo hash do texto
+    """
+    if not text:
+        return 0
+    if config.TOKEN_COUNT_METHOD != "api" or not hasattr(model, "count_tokens"):
+        return rate_limit.estimate_tokens(text)
+
+    model_name = getattr(model, "model_name", config.GEMINI_MODEL)
+    key = hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+    with _counts_lock:
+        if key in _counts:
+            _counts.move_to_end(key)
+            return _counts[key]
+    try:
+        # A chamada à API é registrada como uma etapa própria, com o erro no evento em caso de falha
+        with metrics.track("contagem_tokens", model_name):
+            tokens = model.count_tokens(text).total_tokens
+    except Exception:
+        # A contagem é apenas uma previsão: em caso de falha, usa a estimativa local
+        return rate_limit.estimate_tokens(text)
+    with _counts_lock:
+        _counts[key] = tokens
+        while len(_counts) > config.TOKEN_COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return tokens
+
+async def count_tokens_async(model, text):
+    """
+    Versão assíncrona de count_tokens: a contagem pela API é feita em uma thread, sem bloquear o laço de eventos
+    """
+    if not text:
+        return 0
+    if config.TOKEN_COUNT_METHOD != "api" or not hasattr(model, "count_tokens"):
+        return rate_limit.estimate_tokens(text)
+    return await asyncio.to_thread(count_tokens, model, text)
+
+def fit_text(model, text, max_tokens):
+    """
+    Reduz o texto para caber no orçamento de tokens, cortando nos limites de parágrafo, linha ou frase
+
+    Returns:
+        O texto original, se couber, ou o seu início com até max_tokens tokens
+    """
+    if max_tokens is None or not text:
+        return text
+    tokens = count_tokens(model, text)
+    if tokens <= max_tokens:
+        return text
+
+    stripped = text.strip()
+    separator = next((sep for sep in ("\n\n", "\n") if sep in stripped), ". ")
+    pieces = stripped.split(separator)
+    # Estimativa proporcional seguida de ajuste, para fazer poucas contagens
+    keep = max(1, int(len(pieces) * max_tokens / tokens))
+    while keep > 1 and count_tokens(model, separator.join(pieces[:keep])) > max_tokens:
+        keep -= 1
+    fitted = separator.join(pieces[:keep])
+    if count_tokens(model, fitted) > max_tokens:
+        # Um único parágrafo maior que o orçamento: corta pela proporção de caracteres
+        fitted = fitted[:max(1, len(fitted) * max_tokens // count_tokens(model, fitted))]
+    return fitted
+
+def generation_config(budget):
+    """
+    Retorna a configuração de geração da chamada (max_output_tokens), ou None se não houver limite
+    """
+    if budget.output_tokens is None:
+        return None
+    return {"max_output_tokens": budget.output_tokens}
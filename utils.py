@@ -1,10 +1,43 @@
 import os
+import re
 import json
 import uuid
 import datetime
+import time
+import asyncio
+import functools
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, wait, FIRST_COMPLETED
 import google.generativeai as genai
 from fpdf import FPDF
 import config
+import response_cache
+import history_index
+import storage
+import journal
+import rate_limit
+import metrics
+import hedging
+import summarizer
+import token_budget
+import similarity
+
+# Substituições de caracteres tipográficos por equivalentes em latin-1, pré-compiladas em uma tabela
+_LATIN1_TRANSLATION = str.maketrans({
+    '\u2013': '-',  # en dash
+    '\u2014': '-',  # em dash
+    '\u2015': '-',  # horizontal bar
+    '\u2012': '-',  # figure dash
+    '\u2018': "'",  # left single quote
+    '\u2019': "'",  # right single quote
+    '\u201c': '"',  # left double quote
+    '\u201d': '"',  # right double quote
+    '\u2026': '...', # ellipsis
+    '\u00a0': ' ',   # non-breaking space
+    '\u200b': '',    # zero-width space
+})
 
 # Função utilitária para sanitizar texto quando uma fonte Unicode não estiver disponível
 def _sanitize_for_latin1(s):
@@ -12,21 +45,7 @@ def _sanitize_for_latin1(s):
         return ''
     if not isinstance(s, str):
         s = str(s)
-    replacements = {
-        '\u2013': '-',  # en dash
-        '\u2014': '-',  # em dash
-        '\u2015': '-',  # horizontal bar
-        '\u2012': '-',  # figure dash
-        '\u2018': "'",  # left single quote
-        '\u2019': "'",  # right single quote
-        '\u201c': '"',  # left double quote
-        '\u201d': '"',  # right double quote
-        '\u2026': '...', # ellipsis
-        '\u00a0': ' ',   # non-breaking space
-        '\u200b': '',    # zero-width space
-    }
-    for k, v in replacements.items():
-        s = s.replace(k, v)
+    s = s.translate(_LATIN1_TRANSLATION)
     try:
         s.encode('latin-1')
         return s
@@ -34,49 +53,362 @@ def _sanitize_for_latin1(s):
         return s.encode('latin-1', 'ignore').decode('latin-1')
 
 # Configuração da API do Google Gemini
-def setup_gemini_api():
+# Os modelos são compartilhados por todo o processo (sessões e reruns do Streamlit),
+# reaproveitando o cliente e os canais de conexão criados pela biblioteca
+_models = {}
+_models_lock = threading.Lock()
+_api_configured = False
+
+def _configure_api():
     """
-    Configura a API do Google Gemini com a chave fornecida no arquivo config.py
+    Configura a API do Google Gemini uma única vez por processo
     """
+    global _api_configured
+    if _api_configured:
+        return
     if not config.GEMINI_API_KEY or config.GEMINI_API_KEY == "SUA_CHAVE_API_AQUI":
         raise ValueError("API key not available")
-    genai.configure(api_key=config.GEMINI_API_KEY)
-    return genai.GenerativeModel(config.GEMINI_MODEL)
+    genai.configure(api_key=config.GEMINI_API_KEY, transport=config.GEMINI_TRANSPORT)
+    _api_configured = True
 
-# Funções para geração de conteúdo acadêmico
-def generate_title(model, tema, nivel_academico):
+def get_model(model_name=None, generation_config=None):
     """
-    Gera um título sugestivo para o trabalho acadêmico
+    Retorna um modelo Gemini compartilhado, criado na primeira solicitação
     
     Args:
-        model: Modelo Gemini configurado
-        tema: Tema do trabalho acadêmico
-        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        model_name: Nome do modelo (padrão: config.GEMINI_MODEL)
+        generation_config: Dicionário com a configuração de geração (padrão: config.GEMINI_GENERATION_CONFIG)
         
     Returns:
-        String contendo o título gerado
+        Instância de genai.GenerativeModel reutilizada para o mesmo nome e configuração
+    """
+    model_name = model_name or config.GEMINI_MODEL
+    if generation_config is None:
+        generation_config = config.GEMINI_GENERATION_CONFIG
+    key = (model_name, tuple(sorted(generation_config.items())))
+    
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            _configure_api()
+            model = genai.GenerativeModel(model_name, generation_config=dict(generation_config) or None)
+            _models[key] = model
+        return model
+
+def reset_models():
+    """
+    Descarta os modelos em cache, forçando uma nova configuração da API na próxima solicitação
+    """
+    global _api_configured
+    with _models_lock:
+        _models.clear()
+        _api_configured = False
+
+def _default_key():
+    return (config.GEMINI_MODEL, tuple(sorted(config.GEMINI_GENERATION_CONFIG.items())))
+
+def get_stage_model(stage):
+    """
+    Retorna o modelo configurado para a etapa em config.STAGE_MODELS, ou o modelo padrão
+    """
+    settings = config.STAGE_MODELS.get(stage) or {}
+    return get_model(settings.get("model"), settings.get("generation_config"))
+
+def _stage_model(model, stage):
+    """
+    Troca o modelo padrão do processo pelo modelo da etapa; modelos escolhidos pelo chamador são mantidos
+    """
+    if not config.STAGE_MODELS.get(stage):
+        return model
+    with _models_lock:
+        is_default = model is _models.get(_default_key())
+    return get_stage_model(stage) if is_default else model
+
+def setup_gemini_api():
+    """
+    Configura a API do Google Gemini com a chave fornecida no arquivo config.py
+    
+    Returns:
+        Modelo padrão compartilhado pelo processo (ver get_model)
+    """
+    return get_model()
+
+# Chamadas ao modelo
+def _cache_key(model, prompt, max_output_tokens=None):
+    """
+    Calcula a chave de cache do prompt a partir do nome e da temperatura configurada do modelo
+    e do limite de tokens da resposta
+    """
+    model_name = getattr(model, "model_name", config.GEMINI_MODEL)
+    generation_config = getattr(model, "_generation_config", None) or {}
+    return response_cache.ResponseCache.make_key(model_name, generation_config.get("temperature"), prompt, max_output_tokens)
+
+def _total_tokens(response):
+    """
+    Retorna o total de tokens (prompt + resposta) informado pela API, se disponível
+    """
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+class ModelResponseError(RuntimeError):
+    """
+    Resposta do modelo sem texto utilizável (bloqueada, vazia ou interrompida pelo limite de tokens)
+    """
+
+def _finish_reason(response):
+    """
+    Retorna o motivo de término do primeiro candidato da resposta (ex.: "STOP", "MAX_TOKENS"), se informado
+    """
+    candidates = getattr(response, "candidates", None)
+    if not candidates:
+        return None
+    reason = getattr(candidates[0], "finish_reason", None)
+    return getattr(reason, "name", reason)
+
+def _response_text(response):
+    """
+    Extrai o texto de uma resposta completa
+
+    Returns:
+        Tupla (texto, truncado); truncado indica término por MAX_TOKENS, caso em que o texto pode estar
+        incompleto ou vazio (o raciocínio dos modelos 2.5 consumiu o limite)
+    """
+    reason = _finish_reason(response)
+    truncated = reason == "MAX_TOKENS"
+    try:
+        text = response.text
+    except ValueError as e:
+        # Sem partes de texto: resposta bloqueada ou limite esgotado antes do texto
+        if truncated:
+            return "", True
+        raise ModelResponseError(f"O modelo não retornou texto (motivo de término: {reason or 'desconhecido'}): {e}") from e
+    return text.strip(), truncated
+
+class _TextCall:
+    """
+    Etapas comuns às chamadas de texto ao modelo (modelo da etapa, orçamento, cache, cota e métricas),
+    compartilhadas por _generate_text, _stream_text e _generate_text_async
+    """
+    
+    def __init__(self, model, prompt, use_cache, stage, budget):
+        self.model = _stage_model(model, stage)
+        self.prompt = prompt
+        self.stage = stage
+        self.budget = budget or token_budget.Budget(None, None)
+        self.use_cache = use_cache and config.CACHE_ENABLED
+        self.key = None
+        self.event = None
+        self.estimated_tokens = 0
+        self.truncation_retries = 0
+    
+    def track(self):
+        return metrics.track(self.stage, getattr(self.model, "model_name", None))
+    
+    def track_async(self):
+        return metrics.track_async(self.stage, getattr(self.model, "model_name", None))
+    
+    def lookup(self, event):
+        """
+        Associa o evento de métricas à chamada e retorna a resposta em cache, se houver
+        """
+        self.event = event
+        event["max_output_tokens"] = self.budget.output_tokens
+        if not self.use_cache:
+            return None
+        self.key = _cache_key(self.model, self.prompt, self.budget.output_tokens)
+        cached = response_cache.get_cache().get(self.key)
+        if cached is not None:
+            event["cache_hit"] = True
+        return cached
+    
+    def set_prompt_tokens(self, tokens):
+        # A previsão reserva a cota de tokens e é comparada com o uso real nas métricas
+        self.estimated_tokens = self.event["predicted_prompt_tokens"] = tokens
+    
+    def generation_config(self):
+        return token_budget.generation_config(self.budget)
+    
+    def settle(self, response):
+        """
+        Ajusta a cota com o uso real da resposta; chamado por cada tentativa, inclusive a duplicata
+        descartada pelo hedging
+        """
+        rate_limit.get_limiter().settle_tokens(_total_tokens(response), self.estimated_tokens)
+    
+    def retry_truncated(self):
+        """
+        Trata uma resposta interrompida por MAX_TOKENS, aumentando o limite da resposta
+
+        Returns:
+            True se a chamada deve ser repetida com o novo limite; False se as tentativas ou o teto
+            (config.TOKEN_BUDGET_MAX_OUTPUT) se esgotaram
+        """
+        self.event["truncated"] = True
+        current = self.budget.output_tokens
+        if current is None or self.truncation_retries >= config.TOKEN_BUDGET_TRUNCATION_RETRIES:
+            return False
+        expanded = int(current * config.TOKEN_BUDGET_TRUNCATION_FACTOR)
+        if config.TOKEN_BUDGET_MAX_OUTPUT:
+            expanded = min(expanded, max(current, config.TOKEN_BUDGET_MAX_OUTPUT))
+        if expanded <= current:
+            return False
+        self.truncation_retries += 1
+        self.budget = self.budget._replace(output_tokens=expanded)
+        self.event["max_output_tokens"] = expanded
+        return True
+    
+    def finish(self, response, text, truncated=False):
+        """
+        Registra os tokens no evento e armazena o texto no cache
+
+        Respostas interrompidas pelo limite de tokens não são armazenadas nem devolvidas: a etapa falha
+        com ModelResponseError
+        """
+        self.event["prompt_tokens"], self.event["response_tokens"] = metrics.usage_tokens(response)
+        if truncated:
+            raise ModelResponseError(
+                f"A resposta da etapa '{self.stage}' foi interrompida pelo limite de "
+                f"{self.budget.output_tokens} tokens (MAX_TOKENS)"
+            )
+        # A chave é a do limite original, consultada pelas próximas chamadas idênticas
+        if self.use_cache:
+            response_cache.get_cache().put(self.key, text)
+        return text
+
+def _generate_text(model, prompt, use_cache=True, stage=None, budget=None):
+    """
+    Envia o prompt ao modelo e retorna o texto completo da resposta, consultando o cache antes
+    """
+    call = _TextCall(model, prompt, use_cache, stage, budget)
+    with call.track() as event:
+        cached = call.lookup(event)
+        if cached is not None:
+            return cached
+        
+        # Respeita a cota compartilhada e repete erros transitórios (429, 503...) com backoff
+        call.set_prompt_tokens(token_budget.count_tokens(call.model, prompt))
+        def request(stats):
+            response = rate_limit.call_with_retry(lambda: call.model.generate_content(prompt, generation_config=call.generation_config()), call.estimated_tokens, stats)
+            call.settle(response)
+            return response
+        
+        while True:
+            # Com hedging, uma chamada que passa do p95 da etapa é duplicada e vale a primeira resposta
+            response = hedging.get_hedger().call(stage, request, event) if config.HEDGE_ENABLED else request(event)
+            text, truncated = _response_text(response)
+            if not truncated or not call.retry_truncated():
+                return call.finish(response, text, truncated)
+
+def _stream_text(model, prompt, use_cache=True, stage=None, budget=None):
+    """
+    Envia o prompt ao modelo em modo streaming, produzindo os trechos do texto à medida que chegam
+    """
+    call = _TextCall(model, prompt, use_cache, stage, budget)
+    with call.track() as event:
+        cached = call.lookup(event)
+        if cached is not None:
+            yield cached
+            return
+        
+        # A nova tentativa só é possível antes do primeiro trecho, que a biblioteca obtém já na chamada
+        start = time.monotonic()
+        call.set_prompt_tokens(token_budget.count_tokens(call.model, prompt))
+        request = lambda stats: rate_limit.call_with_retry(lambda: call.model.generate_content(prompt, stream=True, generation_config=call.generation_config()), call.estimated_tokens, stats)
+        # Com hedging, a duplicata cobre a espera pelo primeiro trecho, com latências observadas à parte
+        response = hedging.get_hedger().call(f"{stage}:stream", request, event) if config.HEDGE_ENABLED else request(event)
+        
+        parts = []
+        reason = None
+        for chunk in response:
+            reason = _finish_reason(chunk) or reason
+            try:
+                text = chunk.text
+            except ValueError:
+                # Trechos sem conteúdo textual (ex.: apenas o motivo de término)
+                continue
+            if text:
+                if not parts:
+                    event["first_chunk_seconds"] = time.monotonic() - start
+                parts.append(text)
+                yield text
+        
+        # Só armazena a resposta se o streaming foi consumido até o fim; os trechos já entregues não
+        # podem ser refeitos, então uma resposta interrompida pelo limite de tokens faz a etapa falhar
+        truncated = (_finish_reason(response) or reason) == "MAX_TOKENS"
+        event["truncated"] = truncated
+        call.settle(response)
+        call.finish(response, "".join(parts).strip(), truncated)
+
+async def _generate_text_async(model, prompt, use_cache=True, stage=None, budget=None):
+    """
+    Versão assíncrona de _generate_text, usando generate_content_async do modelo
+    
+    O cache, a contagem de tokens pela API e a gravação das métricas acessam o disco ou a rede
+    e são executados em threads, fora do laço de eventos
+    """
+    call = _TextCall(model, prompt, use_cache, stage, budget)
+    async with call.track_async() as event:
+        cached = await asyncio.to_thread(call.lookup, event)
+        if cached is not None:
+            return cached
+        
+        call.set_prompt_tokens(await token_budget.count_tokens_async(call.model, prompt))
+        async def request(stats):
+            response = await rate_limit.call_with_retry_async(lambda: call.model.generate_content_async(prompt, generation_config=call.generation_config()), call.estimated_tokens, stats)
+            call.settle(response)
+            return response
+        
+        while True:
+            response = await (hedging.get_hedger().call_async(stage, request, event) if config.HEDGE_ENABLED else request(event))
+            text, truncated = _response_text(response)
+            if not truncated or not call.retry_truncated():
+                return await asyncio.to_thread(call.finish, response, text, truncated)
+
+async def _build_prompt_async(builder, *args):
+    """
+    Monta um prompt na API assíncrona; com a contagem de tokens pela API (config.TOKEN_COUNT_METHOD),
+    o ajuste do contexto ao orçamento faz chamadas de rede e é executado em uma thread
+    """
+    if config.TOKEN_COUNT_METHOD == "api":
+        return await asyncio.to_thread(builder, *args)
+    return builder(*args)
+
+# Funções para geração de conteúdo acadêmico
+def _title_prompt(tema, nivel_academico):
+    """
+    Monta o prompt de generate_title
     """
     prompt = f"""
     Crie um título acadêmico atrativo e profissional para um trabalho de {nivel_academico} sobre o tema: "{tema}".
     O título deve ser claro, conciso e refletir o conteúdo acadêmico esperado.
     Retorne apenas o título, sem aspas ou formatação adicional.
     """
-    
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return prompt
 
-def generate_introduction(model, tema, nivel_academico, titulo):
+def generate_title(model, tema, nivel_academico, stream=False, use_cache=True):
     """
-    Gera a introdução do trabalho acadêmico
+    Gera um título sugestivo para o trabalho acadêmico
     
     Args:
         model: Modelo Gemini configurado
         tema: Tema do trabalho acadêmico
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
-        titulo: Título gerado para o trabalho
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
         
     Returns:
-        String contendo a introdução gerada
+        String contendo o título gerado (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("titulo", nivel_academico)
+    prompt = _title_prompt(tema, nivel_academico)
+    
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="titulo", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="titulo", budget=budget)
+
+def _introduction_prompt(tema, nivel_academico, titulo):
+    """
+    Monta o prompt de generate_introduction
     """
     prompt = f"""
     Escreva uma introdução acadêmica para um trabalho de {nivel_academico} com o título "{titulo}" sobre o tema "{tema}".
@@ -91,25 +423,35 @@ def generate_introduction(model, tema, nivel_academico, titulo):
     A introdução deve ter entre 3 e 5 parágrafos, dependendo do nível acadêmico, sendo mais elaborada para níveis mais avançados.
     Use linguagem formal e acadêmica apropriada para o nível especificado.
     """
-    
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return prompt
 
-def generate_development(model, tema, nivel_academico, titulo, introducao, estilo_referencia):
+def generate_introduction(model, tema, nivel_academico, titulo, stream=False, use_cache=True):
     """
-    Gera o desenvolvimento do trabalho acadêmico
+    Gera a introdução do trabalho acadêmico
     
     Args:
         model: Modelo Gemini configurado
         tema: Tema do trabalho acadêmico
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
         titulo: Título gerado para o trabalho
-        introducao: Introdução gerada para o trabalho
-        estilo_referencia: Estilo de referência (APA ou ABNT)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
         
     Returns:
-        String contendo o desenvolvimento gerado
+        String contendo a introdução gerada (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("introducao", nivel_academico)
+    prompt = _introduction_prompt(tema, nivel_academico, titulo)
+    
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="introducao", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="introducao", budget=budget)
+
+def _development_prompt(tema, nivel_academico, titulo, introducao, estilo_referencia, model=None, context_tokens=None):
+    """
+    Monta o prompt de generate_development, com a introdução limitada a context_tokens tokens
     """
+    introducao = token_budget.fit_text(model, introducao, context_tokens)
     prompt = f"""
     Escreva o desenvolvimento completo para um trabalho acadêmico de {nivel_academico} com o título "{titulo}" sobre o tema "{tema}".
     
@@ -135,31 +477,223 @@ def generate_development(model, tema, nivel_academico, titulo, introducao, estil
     Use linguagem formal e acadêmica apropriada para o nível especificado.
     Inclua citações no formato {estilo_referencia} ao longo do texto.
     """
+    return prompt
+
+def generate_development(model, tema, nivel_academico, titulo, introducao, estilo_referencia, stream=False, use_cache=True):
+    """
+    Gera o desenvolvimento do trabalho acadêmico
+    
+    Args:
+        model: Modelo Gemini configurado
+        tema: Tema do trabalho acadêmico
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        titulo: Título gerado para o trabalho
+        introducao: Introdução gerada para o trabalho
+        estilo_referencia: Estilo de referência (APA ou ABNT)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
+        
+    Returns:
+        String contendo o desenvolvimento gerado (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("desenvolvimento", nivel_academico)
+    prompt = _development_prompt(tema, nivel_academico, titulo, introducao, estilo_referencia, model, budget.context_tokens)
     
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="desenvolvimento", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="desenvolvimento", budget=budget)
 
-def generate_conclusion(model, tema, nivel_academico, titulo, desenvolvimento):
+def _outline_prompt(tema, nivel_academico, titulo, introducao, model=None, context_tokens=None):
     """
-    Gera a conclusão do trabalho acadêmico
+    Monta o prompt de generate_outline, com a introdução limitada a context_tokens tokens
+    """
+    introducao = token_budget.fit_text(model, introducao, context_tokens)
+    prompt = f"""
+    Crie o esboço do desenvolvimento de um trabalho acadêmico de {nivel_academico} com o título "{titulo}" sobre o tema "{tema}".
+    
+    Considere a seguinte introdução para manter a coerência:
+    """
+    prompt += f"""
+    {introducao}
+    """
+    prompt += f"""
+    
+    O esboço deve listar os subtítulos das seções do desenvolvimento, cobrindo revisão teórica,
+    diferentes perspectivas sobre o assunto e análise crítica.
+    
+    Para nível de Ensino Médio: 3-4 seções
+    Para nível de Graduação: 4-5 seções
+    Para nível de Pós-Graduação: 5-6 seções
+    
+    Retorne apenas os subtítulos, um por linha, sem numeração, explicações ou pontuação final.
+    """
+    return prompt
+
+def generate_outline(model, tema, nivel_academico, titulo, introducao, use_cache=True):
+    """
+    Gera o esboço do desenvolvimento: a lista de subtítulos das seções
     
     Args:
         model: Modelo Gemini configurado
         tema: Tema do trabalho acadêmico
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
         titulo: Título gerado para o trabalho
-        desenvolvimento: Desenvolvimento gerado para o trabalho
+        introducao: Introdução gerada para o trabalho
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
         
     Returns:
-        String contendo a conclusão gerada
+        Lista de strings com os subtítulos, na ordem em que as seções devem aparecer
+    """
+    budget = token_budget.plan("esboco", nivel_academico)
+    prompt = _outline_prompt(tema, nivel_academico, titulo, introducao, model, budget.context_tokens)
+    
+    text = _generate_text(model, prompt, use_cache, stage="esboco", budget=budget)
+    return _parse_outline(text)
+
+def _parse_outline(text):
+    """
+    Extrai a lista de subtítulos da resposta do modelo para o esboço
+    """
+    outline = []
+    for line in text.splitlines():
+        # Remove marcadores, numeração e negrito que o modelo às vezes inclui
+        line = re.sub(r"^\s*(?:[-*•]|\d+(?:\.\d+)*[.)]?)\s*", "", line).strip().strip("*#").strip().rstrip(".:")
+        # Linhas longas são explicações, não subtítulos
+        if line and is_subheading(line):
+            outline.append(line)
+    return outline[:config.OUTLINE_MAX_SECTIONS]
+
+def _subsection_prompt(tema, nivel_academico, titulo, introducao, outline, index, estilo_referencia, model=None, context_tokens=None):
+    """
+    Monta o prompt de generate_subsection, com a introdução limitada a context_tokens tokens
+    """
+    introducao = token_budget.fit_text(model, introducao, context_tokens)
+    esboco = "\n".join(f"{i + 1}. {subtitulo}" for i, subtitulo in enumerate(outline))
+    prompt = f"""
+    Escreva a seção "{outline[index]}" do desenvolvimento de um trabalho acadêmico de {nivel_academico} com o título "{titulo}" sobre o tema "{tema}".
+    
+    Considere a seguinte introdução para manter a coerência:
+    """
+    prompt += f"""
+    {introducao}
+    """
+    prompt += f"""
+    
+    Esboço completo do desenvolvimento (as demais seções são escritas separadamente):
+    {esboco}
+    
+    A seção deve:
+    1. Tratar apenas do assunto do seu subtítulo, sem repetir o conteúdo das outras seções do esboço
+    2. Incluir pelo menos uma citação de autor relevante no formato {estilo_referencia}
+    3. Ter profundidade adequada ao nível acadêmico ({nivel_academico})
+    4. Apresentar argumentos bem fundamentados e análise crítica
+    
+    Para nível de Ensino Médio: 2-3 parágrafos mais simples e diretos
+    Para nível de Graduação: 3-4 parágrafos com análise mais aprofundada
+    Para nível de Pós-Graduação: 4-5 parágrafos com análise crítica e teórica mais sofisticada
+    
+    Use linguagem formal e acadêmica apropriada para o nível especificado.
+    Retorne apenas os parágrafos da seção, sem o subtítulo e sem introdução ou conclusão do trabalho.
+    """
+    return prompt
+
+def generate_subsection(model, tema, nivel_academico, titulo, introducao, outline, index, estilo_referencia, stream=False, use_cache=True):
+    """
+    Redige uma seção do desenvolvimento a partir do esboço
+    
+    Args:
+        model: Modelo Gemini configurado
+        tema: Tema do trabalho acadêmico
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        titulo: Título gerado para o trabalho
+        introducao: Introdução gerada para o trabalho
+        outline: Lista de subtítulos gerada por generate_outline
+        index: Posição da seção a ser redigida no esboço
+        estilo_referencia: Estilo de referência (APA ou ABNT)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
+        
+    Returns:
+        String contendo o texto da seção, sem o subtítulo (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("subsecao", nivel_academico)
+    prompt = _subsection_prompt(tema, nivel_academico, titulo, introducao, outline, index, estilo_referencia, model, budget.context_tokens)
+    
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="subsecao", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="subsecao", budget=budget)
+
+def _subsection_heading(index, subtitulo):
+    # Subtítulo numerado, reconhecido por is_subheading na exportação e na divisão em subseções
+    return f"{index + 1}. {subtitulo}"[:99]
+
+def generate_development_outlined(model, tema, nivel_academico, titulo, introducao, estilo_referencia, stream=False, use_cache=True, outline=None, stop_event=None):
+    """
+    Gera o desenvolvimento a partir de um esboço, redigindo as seções em paralelo
+    
+    Os argumentos e o retorno são os mesmos de generate_development; se o esboço vier vazio,
+    o desenvolvimento é gerado em uma única chamada. Um esboço já pronto (ex.: de um trabalho
+    similar do histórico) pode ser passado em outline, dispensando a chamada de generate_outline.
+    No modo streaming, stop_event (threading.Event) interrompe as seções em andamento quando sinalizado.
+    """
+    if stream:
+        return _stream_development_outlined(model, tema, nivel_academico, titulo, introducao, estilo_referencia, use_cache, outline, stop_event)
+    
+    if outline is None:
+        outline = generate_outline(model, tema, nivel_academico, titulo, introducao, use_cache)
+    if not outline:
+        return generate_development(model, tema, nivel_academico, titulo, introducao, estilo_referencia, use_cache=use_cache)
+    
+    with ThreadPoolExecutor(max_workers=config.OUTLINE_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(generate_subsection, model, tema, nivel_academico, titulo, introducao, outline, i,
+                            estilo_referencia, use_cache=use_cache)
+            for i in range(len(outline))
+        ]
+        return _join_subsections(outline, [future.result() for future in futures])
+
+def _join_subsections(outline, corpos):
+    """
+    Junta as seções redigidas, cada uma precedida pelo seu subtítulo numerado
+    """
+    blocks = []
+    for i, corpo in enumerate(corpos):
+        # Descarta o subtítulo se o modelo o repetir no início da resposta
+        primeiro, _, resto = corpo.partition("\n\n")
+        if resto and is_subheading(primeiro) and outline[i].lower() in primeiro.lower():
+            corpo = resto.strip()
+        blocks.append(f"{_subsection_heading(i, outline[i])}\n\n{corpo}")
+    return "\n\n".join(blocks)
+
+def _stream_development_outlined(model, tema, nivel_academico, titulo, introducao, estilo_referencia, use_cache=True, outline=None, stop_event=None):
+    """
+    Versão em streaming de generate_development_outlined: as seções são geradas em paralelo e
+    os trechos são produzidos na ordem do esboço
     """
-    # Extraímos apenas os primeiros 1000 caracteres do desenvolvimento para não sobrecarregar o prompt
-    desenvolvimento_resumido = desenvolvimento[:1000] + "..." if len(desenvolvimento) > 1000 else desenvolvimento
+    if outline is None:
+        outline = generate_outline(model, tema, nivel_academico, titulo, introducao, use_cache)
+    if not outline:
+        yield from generate_development(model, tema, nivel_academico, titulo, introducao, estilo_referencia, stream=True, use_cache=use_cache)
+        return
+    
+    def _section(i):
+        yield ("\n\n" if i else "") + _subsection_heading(i, outline[i]) + "\n\n"
+        yield from generate_subsection(model, tema, nivel_academico, titulo, introducao, outline, i,
+                                       estilo_referencia, stream=True, use_cache=use_cache)
+    
+    yield from _ordered_streams([_section(i) for i in range(len(outline))], config.OUTLINE_MAX_WORKERS, stop_event)
+
+def _conclusion_prompt(tema, nivel_academico, titulo, desenvolvimento, model=None, context_tokens=None):
+    """
+    Monta o prompt de generate_conclusion, com o resumo do desenvolvimento limitado a context_tokens tokens
+    """
+    # Resumo extrativo de todas as subseções, em vez de apenas o início do texto
+    desenvolvimento_resumido = token_budget.fit_text(model, development_digest(desenvolvimento, include_citations=False), context_tokens)
     
     prompt = f"""
     Escreva uma conclusão acadêmica para um trabalho de {nivel_academico} com o título "{titulo}" sobre o tema "{tema}".
     
-    Considere o seguinte início do desenvolvimento para manter a coerência:
+    Considere o seguinte resumo do desenvolvimento (subtítulos e frases principais de cada seção) para manter a coerência:
     """
     prompt += f"""
     {desenvolvimento_resumido}
@@ -176,31 +710,45 @@ def generate_conclusion(model, tema, nivel_academico, titulo, desenvolvimento):
     Use linguagem formal e acadêmica apropriada para o nível especificado.
     Não introduza novas informações ou citações na conclusão.
     """
-    
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return prompt
 
-def generate_references(model, tema, nivel_academico, desenvolvimento, estilo_referencia):
+def generate_conclusion(model, tema, nivel_academico, titulo, desenvolvimento, stream=False, use_cache=True):
     """
-    Gera as referências bibliográficas do trabalho acadêmico
+    Gera a conclusão do trabalho acadêmico
     
     Args:
         model: Modelo Gemini configurado
         tema: Tema do trabalho acadêmico
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        titulo: Título gerado para o trabalho
         desenvolvimento: Desenvolvimento gerado para o trabalho
-        estilo_referencia: Estilo de referência (APA ou ABNT)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
         
     Returns:
-        String contendo as referências geradas
+        String contendo a conclusão gerada (ou gerador de trechos, se stream=True)
     """
-    # Extraímos apenas os primeiros 2000 caracteres do desenvolvimento para não sobrecarregar o prompt
-    desenvolvimento_resumido = desenvolvimento[:2000] + "..." if len(desenvolvimento) > 2000 else desenvolvimento
+    budget = token_budget.plan("conclusao", nivel_academico)
+    prompt = _conclusion_prompt(tema, nivel_academico, titulo, desenvolvimento, model, budget.context_tokens)
+    
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="conclusao", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="conclusao", budget=budget)
+
+def _references_prompt(tema, nivel_academico, desenvolvimento, estilo_referencia, model=None, context_tokens=None):
+    """
+    Monta o prompt de generate_references, com o resumo do desenvolvimento limitado a context_tokens tokens
+    """
+    # Resumo extrativo com todas as citações encontradas no desenvolvimento; o orçamento reduz apenas
+    # as frases do resumo, e a lista de citações é mantida inteira
+    citations = summarizer.extract_citations(desenvolvimento)
+    desenvolvimento_resumido = token_budget.fit_text(model, development_digest(desenvolvimento, include_citations=False), context_tokens)
+    desenvolvimento_resumido += "\n\n" + (f"Citações: {summarizer.format_citations(citations)}" if citations else "Citações: nenhuma")
     
     prompt = f"""
     Crie uma lista de referências bibliográficas reais e relevantes para um trabalho acadêmico de {nivel_academico} sobre o tema "{tema}".
     
-    Considere o seguinte desenvolvimento do trabalho para identificar autores e obras citadas:
+    Considere o seguinte resumo do desenvolvimento do trabalho, com a lista completa dos autores e obras citados:
     """
     prompt += f"""
     {desenvolvimento_resumido}
@@ -221,22 +769,34 @@ def generate_references(model, tema, nivel_academico, desenvolvimento, estilo_re
     
     Formate as referências estritamente de acordo com o padrão {estilo_referencia}.
     """
-    
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return prompt
 
-def expand_section(model, section_content, section_name, nivel_academico):
+def generate_references(model, tema, nivel_academico, desenvolvimento, estilo_referencia, stream=False, use_cache=True):
     """
-    Expande uma seção específica do trabalho acadêmico
+    Gera as referências bibliográficas do trabalho acadêmico
     
     Args:
         model: Modelo Gemini configurado
-        section_content: Conteúdo atual da seção
-        section_name: Nome da seção (Introdução, Desenvolvimento, Conclusão)
+        tema: Tema do trabalho acadêmico
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        desenvolvimento: Desenvolvimento gerado para o trabalho
+        estilo_referencia: Estilo de referência (APA ou ABNT)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
         
     Returns:
-        String contendo a seção expandida
+        String contendo as referências geradas (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("referencias", nivel_academico)
+    prompt = _references_prompt(tema, nivel_academico, desenvolvimento, estilo_referencia, model, budget.context_tokens)
+    
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="referencias", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="referencias", budget=budget)
+
+def _expand_prompt(section_content, section_name, nivel_academico):
+    """
+    Monta o prompt de expand_section
     """
     prompt = f"""
     Expanda e enriqueça a seguinte seção de {section_name} de um trabalho acadêmico de {nivel_academico}:
@@ -252,22 +812,33 @@ def expand_section(model, section_content, section_name, nivel_academico):
     
     Retorne a versão expandida completa da seção, não apenas os trechos adicionados.
     """
-    
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return prompt
 
-def rewrite_section(model, section_content, section_name, nivel_academico):
+def expand_section(model, section_content, section_name, nivel_academico, stream=False, use_cache=True):
     """
-    Reescreve uma seção específica do trabalho acadêmico
+    Expande uma seção específica do trabalho acadêmico
     
     Args:
         model: Modelo Gemini configurado
         section_content: Conteúdo atual da seção
         section_name: Nome da seção (Introdução, Desenvolvimento, Conclusão)
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
         
     Returns:
-        String contendo a seção reescrita
+        String contendo a seção expandida (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("expandir", nivel_academico, token_budget.count_tokens(model, section_content))
+    prompt = _expand_prompt(section_content, section_name, nivel_academico)
+    
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="expandir", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="expandir", budget=budget)
+
+def _rewrite_prompt(section_content, section_name, nivel_academico):
+    """
+    Monta o prompt de rewrite_section
     """
     prompt = f"""
     Reescreva a seguinte seção de {section_name} de um trabalho acadêmico de {nivel_academico}, mantendo as mesmas ideias principais mas com uma abordagem e estrutura diferentes:
@@ -283,9 +854,109 @@ def rewrite_section(model, section_content, section_name, nivel_academico):
     
     Retorne a versão reescrita completa da seção.
     """
+    return prompt
+
+def rewrite_section(model, section_content, section_name, nivel_academico, stream=False, use_cache=True):
+    """
+    Reescreve uma seção específica do trabalho acadêmico
+    
+    Args:
+        model: Modelo Gemini configurado
+        section_content: Conteúdo atual da seção
+        section_name: Nome da seção (Introdução, Desenvolvimento, Conclusão)
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        stream: Se True, retorna um gerador com os trechos do texto à medida que são gerados
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
+        
+    Returns:
+        String contendo a seção reescrita (ou gerador de trechos, se stream=True)
+    """
+    budget = token_budget.plan("reescrever", nivel_academico, token_budget.count_tokens(model, section_content))
+    prompt = _rewrite_prompt(section_content, section_name, nivel_academico)
     
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    if stream:
+        return _stream_text(model, prompt, use_cache, stage="reescrever", budget=budget)
+    return _generate_text(model, prompt, use_cache, stage="reescrever", budget=budget)
+
+# Processamento por subseções
+def split_subsections(section_content):
+    """
+    Divide uma seção nos limites dos subtítulos (mesmo critério de is_subheading usado na exportação para PDF)
+    
+    Args:
+        section_content: Conteúdo da seção, com parágrafos separados por linha em branco
+        
+    Returns:
+        Lista de blocos de texto, cada um começando em um subtítulo (o texto anterior ao primeiro
+        subtítulo forma o primeiro bloco); unidos com "\\n\\n", reproduzem a seção original
+    """
+    blocks = []
+    current = []
+    has_body = False
+    for paragrafo in section_content.split('\n\n'):
+        # Subtítulos consecutivos (ex.: capítulo e item) ficam no mesmo bloco
+        if paragrafo.strip() and is_subheading(paragrafo) and has_body:
+            blocks.append("\n\n".join(current))
+            current = []
+            has_body = False
+        current.append(paragrafo)
+        if paragrafo.strip() and not is_subheading(paragrafo):
+            has_body = True
+    blocks.append("\n\n".join(current))
+    return blocks
+
+def subsection_title(block):
+    """
+    Retorna o subtítulo que abre o bloco, ou None se o bloco não começar por um subtítulo
+    """
+    primeiro = block.strip().split('\n\n', 1)[0].strip()
+    return primeiro if primeiro and is_subheading(primeiro) else None
+
+def development_digest(desenvolvimento, include_citations=True):
+    """
+    Resume localmente o desenvolvimento para uso como contexto das etapas seguintes
+    
+    Args:
+        desenvolvimento: Desenvolvimento gerado para o trabalho
+        include_citations: Se True, inclui todas as citações (autor, ano) encontradas no texto
+        
+    Returns:
+        String com os subtítulos, as frases principais de cada subseção e, opcionalmente, as citações
+    """
+    subsections = [(subsection_title(block), block) for block in split_subsections(desenvolvimento)]
+    return summarizer.digest(subsections, config.SUMMARY_SENTENCES_PER_SUBSECTION, include_citations,
+                             config.SUMMARY_MAX_SENTENCE_CHARS)
+
+def process_subsections(func, model, section_content, section_name, nivel_academico, indices=None, use_cache=True, max_workers=None):
+    """
+    Aplica expand_section ou rewrite_section a cada subseção em paralelo e remonta a seção na ordem original
+    
+    Args:
+        func: expand_section ou rewrite_section
+        model: Modelo Gemini configurado
+        section_content: Conteúdo atual da seção
+        section_name: Nome da seção (Introdução, Desenvolvimento, Conclusão)
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        indices: Índices das subseções a processar (padrão: todas); as demais são mantidas sem alteração
+        use_cache: Se False, ignora o cache de respostas e sempre consulta o modelo
+        max_workers: Número máximo de subseções processadas simultaneamente (padrão: config.SUBSECTION_MAX_WORKERS)
+        
+    Returns:
+        String contendo a seção com as subseções processadas
+    """
+    blocks = split_subsections(section_content)
+    selected = sorted(set(range(len(blocks)) if indices is None else indices))
+    selected = [i for i in selected if blocks[i].strip()]
+    if not selected:
+        return section_content
+    
+    # Cada subseção é uma chamada independente; a cota compartilhada regula a concorrência real
+    results = list(blocks)
+    with ThreadPoolExecutor(max_workers=max_workers or config.SUBSECTION_MAX_WORKERS) as executor:
+        futures = {i: executor.submit(func, model, blocks[i], section_name, nivel_academico, use_cache=use_cache) for i in selected}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return "\n\n".join(block.strip() for block in results if block.strip())
 
 # Funções para gerenciamento de histórico e arquivos
 def save_work_to_json(work_data):
@@ -311,9 +982,12 @@ def save_work_to_json(work_data):
     work_data["timestamp"] = timestamp
     work_data["date_created"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    # Salva o arquivo JSON
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(work_data, f, ensure_ascii=False, indent=4)
+    # Salva o registro do trabalho com o backend de armazenamento configurado
+    previous_version = history_index.folder_version()
+    storage.save_work(filename, work_data)
+    
+    # Atualiza o índice do histórico
+    history_index.add_work(os.path.basename(filename), work_data, previous_version)
     
     return filename
 
@@ -327,47 +1001,325 @@ def load_work_from_json(filename):
     Returns:
         Dicionário contendo os dados do trabalho
     """
-    with open(filename, "r", encoding="utf-8") as f:
-        return json.load(f)
+    # O registro indica o backend com que foi gravado (JSON completo ou seções em blobs),
+    # e as edições do diário posteriores à última reescrita do registro são aplicadas em seguida
+    return journal.load_work(filename)
+
+def load_work_revision(filename, revision):
+    """
+    Reconstrói um trabalho salvo como estava em uma revisão do diário de edições
+    
+    Args:
+        filename: Caminho do arquivo JSON
+        revision: Número da revisão (0 = trabalho original)
+        
+    Returns:
+        Dicionário contendo os dados do trabalho na revisão indicada
+    """
+    work_data = storage.load_work(filename)
+    entries = journal.read_entries(filename)
+    if revision >= work_data.get("revision", 0):
+        return journal.replay(work_data, entries, revision, after=work_data.get("revision", 0))
+    # Revisões anteriores à última reescrita são reconstruídas a partir das seções originais (revisão 0)
+    return journal.replay(work_data, entries, revision, after=-1)
 
-def get_work_history():
+def list_revisions(filename):
+    """
+    Lista as revisões registradas no diário de edições do trabalho
+    
+    Returns:
+        Lista de dicionários com o número da revisão, a data e as seções alteradas
+    """
+    return [
+        {
+            "revision": entry["rev"],
+            "date": datetime.datetime.fromtimestamp(entry["timestamp"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "sections": list(entry["sections"]),
+        }
+        for entry in journal.read_entries(filename)
+    ]
+
+def save_section_edit(work_data, changes):
+    """
+    Persiste a edição de seções de um trabalho salvo, registrando uma nova revisão no diário
+    
+    Args:
+        work_data: Dicionário do trabalho (com "json_filename", se já estiver salvo)
+        changes: Dicionário {seção: novo texto}
+        
+    Returns:
+        Novo dicionário do trabalho, com as seções alteradas
+    """
+    updated = dict(work_data)
+    updated.update(changes)
+    record_path = work_data.get("json_filename")
+    if not record_path:
+        # Trabalho ainda não salvo no histórico: grava o trabalho completo
+        updated["json_filename"] = save_work_to_json(updated)
+        return updated
+    
+    updated["revision"] = journal.append_revision(record_path, work_data, changes)
+    history_index.update_text(os.path.basename(record_path), updated)
+    
+    # Reescreve o registro completo periodicamente, para que a leitura não precise aplicar todo o diário
+    if updated["revision"] % config.JOURNAL_CHECKPOINT_EVERY == 0:
+        previous_version = history_index.folder_version()
+        journal.checkpoint(record_path, updated)
+        history_index.add_work(os.path.basename(record_path), updated, previous_version)
+    return updated
+
+@metrics.timed("historico")
+def get_work_history(limit=None, offset=0, filters=None):
     """
     Obtém o histórico de trabalhos salvos
     
+    Args:
+        limit: Número máximo de trabalhos retornados (opcional, para paginação)
+        offset: Quantidade de trabalhos a pular (opcional, para paginação)
+        filters: Dicionário opcional com nivel_academico, estilo_referencia, date_from e date_to (AAAA-MM-DD)
+        
     Returns:
-        Lista de dicionários contendo metadados dos trabalhos salvos
+        Lista de dicionários contendo metadados dos trabalhos salvos, do mais recente para o mais antigo
     """
     # Cria a pasta de histórico se não existir
     os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
     
-    history = []
-    for filename in os.listdir(config.HISTORY_FOLDER):
-        if filename.endswith(".json"):
-            filepath = os.path.join(config.HISTORY_FOLDER, filename)
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    work_data = json.load(f)
-                    history.append({
-                        "id": work_data.get("id", ""),
-                        "titulo": work_data.get("titulo", ""),
-                        "tema": work_data.get("tema", ""),
-                        "nivel_academico": work_data.get("nivel_academico", ""),
-                        "estilo_referencia": work_data.get("estilo_referencia", ""),
-                        "date_created": work_data.get("date_created", ""),
-                        "filename": filename
-                    })
-            except Exception as e:
-                print(f"Erro ao carregar arquivo {filename}: {e}")
-    
-    # Ordena por data de criação (mais recente primeiro)
-    history.sort(key=lambda x: x.get("date_created", ""), reverse=True)
-    return history
+    # Os metadados vêm do índice, que é sincronizado com a pasta quando ela muda
+    return history_index.query_works(limit, offset, filters)
+
+def count_works(filters=None):
+    """
+    Retorna o número total de trabalhos salvos no histórico que atendem aos filtros (ver get_work_history)
+    """
+    os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
+    return history_index.count_works(filters)
+
+@metrics.timed("busca")
+def search_works(query, limit=20, offset=0, filters=None):
+    """
+    Busca trabalhos salvos pelo título, tema, texto das seções e referências
+    
+    Args:
+        query: Texto da busca (todos os termos devem aparecer; o último pode ser incompleto)
+        limit: Número máximo de trabalhos retornados
+        offset: Quantidade de resultados a pular (para paginação)
+        filters: Filtros opcionais por nível, estilo e período (ver get_work_history)
+        
+    Returns:
+        Lista de dicionários com os metadados dos trabalhos e um trecho do texto encontrado, do mais relevante para o menos relevante
+    """
+    os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
+    return history_index.search_works(query, limit, offset, filters)
+
+def count_search(query, filters=None):
+    """
+    Retorna o número de trabalhos encontrados pela busca que atendem aos filtros
+    """
+    os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
+    return history_index.count_search(query, filters)
+
+def find_similar_works(tema, nivel_academico=None):
+    """
+    Procura no histórico trabalhos com tema quase idêntico, para reaproveitá-los antes de uma nova geração
+    
+    Args:
+        tema: Tema do novo trabalho
+        nivel_academico: Se informado, considera apenas trabalhos do mesmo nível
+        
+    Returns:
+        Lista de dicionários com os metadados dos trabalhos e a similaridade ("score", de 0 a 1)
+    """
+    os.makedirs(config.HISTORY_FOLDER, exist_ok=True)
+    return similarity.find_similar(tema, nivel_academico)
 
 # Funções para exportação
+
+def is_subheading(paragrafo):
+    """
+    Indica se um parágrafo do desenvolvimento é um subtítulo (texto curto que não termina com ponto)
+    """
+    paragrafo = paragrafo.strip()
+    return not paragrafo.endswith('.') and len(paragrafo) < 100
+
+# Fontes com suporte a Unicode, usadas no PDF se disponíveis
+PDF_FONT_CANDIDATES = [
+    os.path.join('fonts', 'DejaVuSansCondensed.ttf'),
+    'DejaVuSansCondensed.ttf',
+]
+
+# Versão do layout do PDF; incrementar ao alterar a renderização invalida o cache de PDFs
+PDF_LAYOUT_VERSION = 2
+
+# Campos do trabalho que aparecem no PDF
+PDF_FIELDS = ["titulo", "tema", "nivel_academico", "estilo_referencia", "date_created",
+              "introducao", "desenvolvimento", "conclusao", "referencias"]
+
+# Métricas da fonte Unicode, carregadas uma única vez por processo
+_UNSET = object()
+_pdf_font_template = _UNSET
+_pdf_font_lock = threading.Lock()
+
+# Larguras de caracteres por fonte, preenchidas sob demanda
+_char_widths = {}
+
+def _unicode_font_template():
+    """
+    Procura a fonte Unicode e carrega suas métricas na primeira chamada
+    
+    Returns:
+        Tupla (fonte, arquivos de fonte) no formato interno do FPDF, ou None se nenhuma fonte estiver disponível
+    """
+    global _pdf_font_template
+    with _pdf_font_lock:
+        if _pdf_font_template is _UNSET:
+            _pdf_font_template = None
+            for fp in PDF_FONT_CANDIDATES:
+                if os.path.exists(fp):
+                    try:
+                        probe = FPDF()
+                        probe.add_font('DejaVu', '', fp, uni=True)
+                        _pdf_font_template = (probe.fonts['dejavu'], probe.font_files)
+                        break
+                    except Exception:
+                        pass
+        return _pdf_font_template
+
+def _add_unicode_font(pdf):
+    """
+    Registra a fonte Unicode no PDF a partir das métricas em cache, sem reler o arquivo TTF
+    
+    Returns:
+        True se a fonte foi registrada
+    """
+    template = _unicode_font_template()
+    if template is None:
+        return False
+    font, font_files = template
+    # O FPDF altera esses dicionários durante a geração, por isso cada PDF recebe sua cópia
+    pdf.fonts['dejavu'] = dict(font, i=len(pdf.fonts) + 1, subset=list(range(0, 32)))
+    pdf.font_files.update({name: dict(info) for name, info in font_files.items()})
+    return True
+
+class _CharWidths(dict):
+    """
+    Larguras dos caracteres de uma fonte (em milésimos do tamanho), calculadas na primeira consulta
+    """
+    def __init__(self, font):
+        super().__init__()
+        self.cw = font['cw']
+        self.missing_width = font.get('desc', {}).get('MissingWidth') or 500
+
+    def __missing__(self, char):
+        if isinstance(self.cw, dict):
+            width = self.cw.get(char, 0)
+        else:
+            code = ord(char)
+            width = self.cw[code] if code < len(self.cw) else self.missing_width
+        self[char] = width
+        return width
+
+def _line_height(font_size):
+    """
+    Altura da linha em milímetros para o tamanho de fonte (em pontos) e o espaçamento configurado
+    """
+    return font_size * 25.4 / 72 * config.PDF_LINE_SPACING
+
+def _write_paragraph(pdf, text, align='J'):
+    """
+    Escreve um parágrafo com quebra de linha automática, equivalente a pdf.multi_cell(0, h, text, 0, align),
+    medindo cada palavra uma única vez com as larguras de caracteres em cache
+    """
+    font = pdf.current_font
+    widths = _char_widths.get(font['name'])
+    if widths is None:
+        widths = _char_widths.setdefault(font['name'], _CharWidths(font))
+    
+    h = _line_height(pdf.font_size_pt)
+    w = pdf.w - pdf.r_margin - pdf.x
+    wmax = (w - 2 * pdf.c_margin) * 1000.0 / pdf.font_size
+    space = widths[' ']
+    
+    for line in text.replace('\r', '').split('\n'):
+        words = line.split(' ')
+        word_widths = [sum(map(widths.__getitem__, word)) for word in words]
+        if word_widths and max(word_widths) > wmax:
+            # Palavras mais largas que a linha precisam ser quebradas caractere a caractere
+            pdf.multi_cell(0, h, line, 0, align)
+            continue
+        
+        start = 0
+        line_width = word_widths[0] if word_widths else 0
+        for i in range(1, len(words)):
+            candidate = line_width + space + word_widths[i]
+            if candidate > wmax:
+                # Quebra automática: justifica distribuindo a sobra entre os espaços da linha
+                spaces = i - start - 1
+                if align == 'J':
+                    pdf.ws = (wmax - line_width) / 1000.0 * pdf.font_size / spaces if spaces else 0
+                    pdf._out('%.3f Tw' % (pdf.ws * pdf.k))
+                pdf.cell(w, h, ' '.join(words[start:i]), 0, 2, align)
+                start = i
+                line_width = word_widths[i]
+            else:
+                line_width = candidate
+        
+        # A última linha do parágrafo não é justificada
+        if pdf.ws > 0:
+            pdf.ws = 0
+            pdf._out('0 Tw')
+        pdf.cell(w, h, ' '.join(words[start:]), 0, 2, align)
+    
+    pdf.x = pdf.l_margin
+
+def _pdf_cache_path(work_data):
+    """
+    Calcula o caminho do PDF em cache a partir do conteúdo do trabalho e da configuração de layout
+    """
+    layout = {
+        "version": PDF_LAYOUT_VERSION,
+        "margins": config.PDF_MARGINS,
+        "bottom_margin": config.PDF_BOTTOM_MARGIN,
+        "font_sizes": [config.PDF_FONT_SIZE_TITLE, config.PDF_FONT_SIZE_HEADING,
+                       config.PDF_FONT_SIZE_SUBHEADING, config.PDF_FONT_SIZE_TEXT],
+        "line_spacing": config.PDF_LINE_SPACING,
+        "font": _unicode_font_template()[0]['ttffile'] if _unicode_font_template() else None,
+    }
+    content = {field: work_data.get(field, "") for field in PDF_FIELDS}
+    payload = json.dumps({"layout": layout, "content": content}, ensure_ascii=False, sort_keys=True)
+    key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return os.path.join(config.PDF_CACHE_FOLDER, f"{key}.pdf")
+
+def _evict_pdf_cache():
+    """
+    Remove os PDFs usados há mais tempo quando o cache excede os limites configurados
+    """
+    entries = []
+    for entry in os.scandir(config.PDF_CACHE_FOLDER):
+        if entry.name.endswith(".pdf"):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    entries.sort(reverse=True)
+    
+    total_bytes = 0
+    for count, (_, size, path) in enumerate(entries, 1):
+        total_bytes += size
+        if count > config.PDF_CACHE_MAX_FILES or total_bytes > config.PDF_CACHE_MAX_BYTES:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+@metrics.timed("exportar_pdf")
 def export_to_pdf(work_data, output_filename=None):
     """
     Exporta o trabalho para um arquivo PDF
     
+    Sem output_filename, o PDF é guardado em um cache indexado pelo conteúdo do trabalho
+    e pela configuração de layout, e exportações repetidas reutilizam o arquivo existente.
+    
     Args:
         work_data: Dicionário contendo os dados do trabalho
         output_filename: Nome do arquivo de saída (opcional)
@@ -375,9 +1327,15 @@ def export_to_pdf(work_data, output_filename=None):
     Returns:
         String contendo o caminho do arquivo PDF gerado
     """
+    cache_path = None
     if output_filename is None:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"{config.HISTORY_FOLDER}/{timestamp}_{work_data.get('id', str(uuid.uuid4()))}.pdf"
+        cache_path = _pdf_cache_path(work_data)
+        if os.path.exists(cache_path):
+            # Marca o PDF como usado recentemente
+            os.utime(cache_path)
+            return cache_path
+        # Renderiza em um arquivo temporário para que o cache nunca contenha um PDF incompleto
+        output_filename = f"{cache_path}.{uuid.uuid4().hex}.tmp"
     
     # Cria a pasta de histórico se não existir
     os.makedirs(os.path.dirname(output_filename), exist_ok=True)
@@ -392,20 +1350,8 @@ def export_to_pdf(work_data, output_filename=None):
         pass
     pdf.add_page()
     
-    # Fonte com suporte a Unicode, se disponível
-    font_path_candidates = [
-        os.path.join('fonts', 'DejaVuSansCondensed.ttf'),
-        'DejaVuSansCondensed.ttf',
-    ]
-    font_loaded = False
-    for fp in font_path_candidates:
-        if os.path.exists(fp):
-            try:
-                pdf.add_font('DejaVu', '', fp, uni=True)
-                font_loaded = True
-                break
-            except Exception:
-                pass
+    # Fonte com suporte a Unicode, se disponível (métricas carregadas uma vez por processo)
+    font_loaded = _add_unicode_font(pdf)
     font_family = 'DejaVu' if font_loaded else 'Arial'
     pdf.set_font(font_family, '', config.PDF_FONT_SIZE_TEXT)
     
@@ -430,7 +1376,7 @@ def export_to_pdf(work_data, output_filename=None):
     pdf.cell(0, 10, "INTRODUÇÃO", 0, 1, 'L')
     pdf.ln(5)
     pdf.set_font(font_family, '', config.PDF_FONT_SIZE_TEXT)
-    pdf.multi_cell(0, 10, _safe_text(work_data.get("introducao", "")), 0, 'J')
+    _write_paragraph(pdf, _safe_text(work_data.get("introducao", "")), 'J')
     pdf.ln(10)
     
     # Desenvolvimento
@@ -440,17 +1386,18 @@ def export_to_pdf(work_data, output_filename=None):
     pdf.set_font(font_family, '', config.PDF_FONT_SIZE_TEXT)
     
     # Dividimos o desenvolvimento em parágrafos para melhor formatação
-    desenvolvimento = work_data.get("desenvolvimento", "")
+    # O texto é normalizado uma única vez, antes da divisão
+    desenvolvimento = _safe_text(work_data.get("desenvolvimento", ""))
     paragrafos = desenvolvimento.split('\n\n')
     for paragrafo in paragrafos:
         # Verifica se o parágrafo é um subtítulo (assumindo que subtítulos não terminam com ponto)
-        if not paragrafo.strip().endswith('.') and len(paragrafo.strip()) < 100:
+        if is_subheading(paragrafo):
             pdf.set_font(font_family, '', config.PDF_FONT_SIZE_SUBHEADING)
             pdf.ln(5)
-            pdf.multi_cell(0, 10, _safe_text(paragrafo), 0, 'L')
+            _write_paragraph(pdf, paragrafo, 'L')
             pdf.set_font(font_family, '', config.PDF_FONT_SIZE_TEXT)
         else:
-            pdf.multi_cell(0, 10, _safe_text(paragrafo), 0, 'J')
+            _write_paragraph(pdf, paragrafo, 'J')
             pdf.ln(5)
     
     pdf.ln(10)
@@ -460,7 +1407,7 @@ def export_to_pdf(work_data, output_filename=None):
     pdf.cell(0, 10, "CONCLUSÃO", 0, 1, 'L')
     pdf.ln(5)
     pdf.set_font(font_family, '', config.PDF_FONT_SIZE_TEXT)
-    pdf.multi_cell(0, 10, _safe_text(work_data.get("conclusao", "")), 0, 'J')
+    _write_paragraph(pdf, _safe_text(work_data.get("conclusao", "")), 'J')
     pdf.ln(10)
     
     # Referências
@@ -470,15 +1417,25 @@ def export_to_pdf(work_data, output_filename=None):
     pdf.set_font(font_family, '', config.PDF_FONT_SIZE_TEXT)
     
     # Dividimos as referências em linhas para melhor formatação
-    referencias = work_data.get("referencias", "")
+    referencias = _safe_text(work_data.get("referencias", ""))
     linhas_ref = referencias.split('\n')
     for linha in linhas_ref:
         if linha.strip():
-            pdf.multi_cell(0, 10, _safe_text(linha), 0, 'L')
+            _write_paragraph(pdf, linha, 'L')
+    
+    # O FPDF registra cada caractere escrito no subconjunto da fonte; sem remover as repetições,
+    # a gravação das larguras fica quadrática no tamanho do texto
+    for font in pdf.fonts.values():
+        if 'subset' in font:
+            font['subset'] = sorted(set(font['subset']))
     
     # Salva o PDF
     try:
         pdf.output(output_filename)
+        if cache_path is not None:
+            os.replace(output_filename, cache_path)
+            _evict_pdf_cache()
+            return cache_path
         return output_filename
     except Exception as e:
         # Fallback para caso de erro com caracteres especiais
@@ -494,8 +1451,112 @@ def export_to_pdf(work_data, output_filename=None):
         pdf.output(fallback_filename)
         return fallback_filename
 
+# Execução concorrente das etapas de geração
+def run_stage_graph(stages, inputs, max_workers=None, timeouts=None, cancel_event=None):
+    """
+    Executa um grafo de etapas, rodando em paralelo as etapas cujas dependências já foram resolvidas
+    
+    Args:
+        stages: Dicionário {nome: (função, dependências)}; a função recebe os valores das dependências, na ordem declarada
+        inputs: Dicionário com os valores iniciais disponíveis para as etapas
+        max_workers: Número máximo de etapas simultâneas (padrão: config.STAGE_MAX_WORKERS)
+        timeouts: Dicionário {nome: segundos} com tempos limite por etapa (padrão: config.STAGE_TIMEOUTS / config.STAGE_TIMEOUT)
+        cancel_event: threading.Event opcional; quando sinalizado, interrompe a execução
+        
+    Returns:
+        Dicionário contendo as entradas iniciais e o resultado de cada etapa
+    """
+    if timeouts is None:
+        timeouts = config.STAGE_TIMEOUTS
+    results = dict(inputs)
+    pending = dict(stages)
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers or config.STAGE_MAX_WORKERS)
+    try:
+        while pending or running:
+            if cancel_event is not None and cancel_event.is_set():
+                raise CancelledError("Geração cancelada")
+            
+            # Submete as etapas cujas dependências já estão disponíveis
+            for name, (func, deps) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    del pending[name]
+                    future = executor.submit(func, *[results[dep] for dep in deps])
+                    timeout = timeouts.get(name, config.STAGE_TIMEOUT)
+                    deadline = time.monotonic() + timeout if timeout else None
+                    running[future] = (name, deadline)
+            
+            if not running:
+                raise ValueError(f"Dependências não satisfeitas para as etapas: {', '.join(pending)}")
+            
+            # Aguarda a próxima etapa terminar ou o prazo mais próximo expirar
+            deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+            wait_timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            if cancel_event is not None:
+                wait_timeout = 0.5 if wait_timeout is None else min(wait_timeout, 0.5)
+            done, _ = wait(running, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                name, _ = running.pop(future)
+                results[name] = future.result()
+            
+            now = time.monotonic()
+            for name, deadline in running.values():
+                if deadline is not None and now >= deadline:
+                    raise TimeoutError(f"A etapa '{name}' excedeu o tempo limite de {timeouts.get(name, config.STAGE_TIMEOUT)}s")
+        
+        return results
+    finally:
+        # Em caso de erro, timeout ou cancelamento, descarta as etapas ainda não iniciadas
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Etapas do trabalho acadêmico e suas dependências
+# Conclusão e referências dependem apenas do desenvolvimento e, portanto, são geradas em paralelo
+WORK_STAGES = {
+    "titulo": (generate_title, ("model", "tema", "nivel_academico")),
+    "introducao": (generate_introduction, ("model", "tema", "nivel_academico", "titulo")),
+    "desenvolvimento": (generate_development, ("model", "tema", "nivel_academico", "titulo", "introducao", "estilo_referencia")),
+    "conclusao": (generate_conclusion, ("model", "tema", "nivel_academico", "titulo", "desenvolvimento")),
+    "referencias": (generate_references, ("model", "tema", "nivel_academico", "desenvolvimento", "estilo_referencia")),
+}
+
+# Funções de geração do desenvolvimento para cada modo (config.DEVELOPMENT_MODES)
+DEVELOPMENT_FUNCTIONS = {
+    "completo": generate_development,
+    "esboco": generate_development_outlined,
+}
+
+def _development_function(development_mode, outline=None, stop_event=None):
+    """
+    Retorna a função de geração do desenvolvimento do modo indicado (padrão: config.DEVELOPMENT_MODE);
+    com um esboço pronto, o desenvolvimento é sempre redigido a partir dele. stop_event é repassado ao
+    modo esboço, que interrompe as seções em streaming quando ele é sinalizado
+    """
+    development_mode = development_mode or config.DEVELOPMENT_MODE
+    if development_mode not in DEVELOPMENT_FUNCTIONS:
+        raise ValueError(f"Modo de desenvolvimento inválido: {development_mode!r}")
+    func = generate_development_outlined if outline else DEVELOPMENT_FUNCTIONS[development_mode]
+    if func is generate_development_outlined and (outline or stop_event is not None):
+        return functools.partial(generate_development_outlined, outline=outline, stop_event=stop_event)
+    return func
+
+def warm_start_from_work(work_data):
+    """
+    Extrai de um trabalho salvo o ponto de partida para um novo trabalho de tema similar
+    
+    Args:
+        work_data: Dicionário contendo os dados do trabalho
+        
+    Returns:
+        Dicionário com o título ("titulo") e os subtítulos do desenvolvimento ("outline")
+    """
+    titles = [subsection_title(block) for block in split_subsections(work_data.get("desenvolvimento") or "")]
+    return {"titulo": work_data["titulo"], "outline": _parse_outline("\n".join(title for title in titles if title))}
+
 # Função principal para gerar trabalho completo
-def generate_academic_work(tema, nivel_academico, estilo_referencia):
+def generate_academic_work(tema, nivel_academico, estilo_referencia, cancel_event=None, use_cache=True, development_mode=None, warm_start=None):
     """
     Gera um trabalho acadêmico completo
     
@@ -503,42 +1564,416 @@ def generate_academic_work(tema, nivel_academico, estilo_referencia):
         tema: Tema do trabalho acadêmico
         nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
         estilo_referencia: Estilo de referência (APA ou ABNT)
+        cancel_event: threading.Event opcional para cancelar a geração em andamento
+        use_cache: Se False, ignora o cache de respostas em todas as etapas
+        development_mode: "completo" (uma chamada) ou "esboco" (esboço e seções em paralelo); padrão: config.DEVELOPMENT_MODE
+        warm_start: Dicionário opcional com "titulo" e "outline" reaproveitados de um trabalho similar (ver warm_start_from_work)
         
     Returns:
         Dicionário contendo todas as seções do trabalho gerado
     """
     # Configura o modelo Gemini
     model = setup_gemini_api()
+    warm_start = warm_start or {}
+    inputs = {
+        "model": model,
+        "tema": tema,
+        "nivel_academico": nivel_academico,
+        "estilo_referencia": estilo_referencia,
+    }
     
-    # Gera o título
-    titulo = generate_title(model, tema, nivel_academico)
-    
-    # Gera a introdução
-    introducao = generate_introduction(model, tema, nivel_academico, titulo)
-    
-    # Gera o desenvolvimento
-    desenvolvimento = generate_development(model, tema, nivel_academico, titulo, introducao, estilo_referencia)
-    
-    # Gera a conclusão
-    conclusao = generate_conclusion(model, tema, nivel_academico, titulo, desenvolvimento)
+    stages = dict(WORK_STAGES)
+    stages["desenvolvimento"] = (_development_function(development_mode, warm_start.get("outline")), WORK_STAGES["desenvolvimento"][1])
+    if warm_start.get("titulo"):
+        # O título reaproveitado entra como valor inicial no lugar da etapa
+        del stages["titulo"]
+        inputs["titulo"] = warm_start["titulo"]
+    if not use_cache:
+        stages = {name: (functools.partial(func, use_cache=False), deps) for name, (func, deps) in stages.items()}
     
-    # Gera as referências
-    referencias = generate_references(model, tema, nivel_academico, desenvolvimento, estilo_referencia)
+    # Gera as seções respeitando as dependências entre as etapas
+    results = run_stage_graph(stages, inputs, cancel_event=cancel_event)
     
+    return _save_generated_work(tema, nivel_academico, estilo_referencia, results)
+
+def _save_generated_work(tema, nivel_academico, estilo_referencia, sections):
+    """
+    Monta o dicionário do trabalho a partir das seções geradas e o salva no histórico
+    """
     # Cria o dicionário com o trabalho completo
     work_data = {
         "tema": tema,
         "nivel_academico": nivel_academico,
         "estilo_referencia": estilo_referencia,
-        "titulo": titulo,
-        "introducao": introducao,
-        "desenvolvimento": desenvolvimento,
-        "conclusao": conclusao,
-        "referencias": referencias
+        "titulo": sections["titulo"],
+        "introducao": sections["introducao"],
+        "desenvolvimento": sections["desenvolvimento"],
+        "conclusao": sections["conclusao"],
+        "referencias": sections["referencias"]
     }
     
     # Salva o trabalho no histórico
     json_filename = save_work_to_json(work_data)
     work_data["json_filename"] = json_filename
     
-    return work_data
\ No newline at end of file
+    return work_data
+
+def _merge_streams(streams, timeouts=None, cancel_event=None, stop=None):
+    """
+    Consome vários geradores de trechos em paralelo, produzindo tuplas (nome, trecho) na ordem de chegada
+    
+    Args:
+        streams: Dicionário {etapa: gerador de trechos}
+        timeouts: Dicionário {etapa: segundos} com tempos limite contados a partir do início do consumo
+            (padrão: config.STAGE_TIMEOUTS / config.STAGE_TIMEOUT)
+        cancel_event: threading.Event opcional; quando sinalizado, interrompe o consumo
+        stop: threading.Event opcional sinalizado ao final do consumo (inclusive por erro, timeout ou cancelamento),
+            para que geradores que executam chamadas em outras threads (ex.: o modo esboço) também as interrompam
+    """
+    if timeouts is None:
+        timeouts = config.STAGE_TIMEOUTS
+    events = queue.Queue()
+    finished = object()
+    if stop is None:
+        stop = threading.Event()
+    
+    def _consume(name, chunks):
+        try:
+            for chunk in chunks:
+                # Após um erro, timeout ou cancelamento, para de pedir trechos ao modelo
+                if stop.is_set():
+                    return
+                events.put((name, chunk))
+            events.put((name, finished))
+        except Exception as e:
+            events.put((name, e))
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+    
+    start = time.monotonic()
+    deadlines = {}
+    for name, chunks in streams.items():
+        timeout = timeouts.get(name, config.STAGE_TIMEOUT)
+        if timeout:
+            deadlines[name] = (start + timeout, timeout)
+        threading.Thread(target=_consume, args=(name, chunks), daemon=True).start()
+    
+    remaining = set(streams)
+    try:
+        while remaining:
+            if cancel_event is not None and cancel_event.is_set():
+                raise CancelledError("Geração cancelada")
+            now = time.monotonic()
+            for name in remaining:
+                if name in deadlines and now >= deadlines[name][0]:
+                    raise TimeoutError(f"A etapa '{name}' excedeu o tempo limite de {deadlines[name][1]}s")
+            
+            # Aguarda o próximo trecho ou o prazo mais próximo expirar
+            pending_deadlines = [deadlines[name][0] for name in remaining if name in deadlines]
+            wait_timeout = max(min(pending_deadlines) - now, 0) if pending_deadlines else None
+            if cancel_event is not None:
+                wait_timeout = 0.5 if wait_timeout is None else min(wait_timeout, 0.5)
+            try:
+                name, item = events.get(timeout=wait_timeout)
+            except queue.Empty:
+                continue
+            if item is finished:
+                remaining.discard(name)
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield name, item
+    finally:
+        stop.set()
+
+def _ordered_streams(streams, max_workers=None, stop_event=None):
+    """
+    Consome vários geradores de trechos em paralelo, produzindo os trechos na ordem dos geradores:
+    os do primeiro são repassados à medida que chegam e os demais ficam guardados até a sua vez
+    
+    Quando o gerador é fechado (erro, timeout ou cancelamento de quem o consome) ou stop_event é sinalizado,
+    os geradores deixam de ser consumidos e são fechados, interrompendo as chamadas ao modelo ainda em andamento
+    """
+    queues = [queue.Queue() for _ in streams]
+    finished = object()
+    stop = threading.Event()
+    
+    def _stopped():
+        return stop.is_set() or (stop_event is not None and stop_event.is_set())
+    
+    def _consume(events, chunks):
+        try:
+            for chunk in chunks:
+                if _stopped():
+                    return
+                events.put(chunk)
+            events.put(finished)
+        except Exception as e:
+            events.put(e)
+        finally:
+            chunks.close()
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(streams) or 1)
+    try:
+        for events, chunks in zip(queues, streams):
+            executor.submit(_consume, events, chunks)
+        for events in queues:
+            while True:
+                # Com stop_event, a espera é interrompida periodicamente para verificar o sinal
+                try:
+                    item = events.get(timeout=0.1 if stop_event is not None else None)
+                except queue.Empty:
+                    if _stopped():
+                        return
+                    continue
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def stream_academic_work(tema, nivel_academico, estilo_referencia, use_cache=True, development_mode=None, warm_start=None,
+                         cancel_event=None, timeouts=None):
+    """
+    Gera um trabalho acadêmico completo em modo streaming
+    
+    Args:
+        tema: Tema do trabalho acadêmico
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        estilo_referencia: Estilo de referência (APA ou ABNT)
+        use_cache: Se False, ignora o cache de respostas em todas as etapas
+        development_mode: "completo" (uma chamada) ou "esboco" (esboço e seções em paralelo); padrão: config.DEVELOPMENT_MODE
+        warm_start: Dicionário opcional com "titulo" e "outline" reaproveitados de um trabalho similar (ver warm_start_from_work)
+        cancel_event: threading.Event opcional para cancelar a geração em andamento
+        timeouts: Dicionário {nome: segundos} com tempos limite por etapa (padrão: config.STAGE_TIMEOUTS / config.STAGE_TIMEOUT)
+        
+    Yields:
+        Tuplas (seção, trecho) à medida que o texto de cada seção é gerado.
+        A última tupla é (None, work_data), com o trabalho completo já salvo no histórico.
+    """
+    # Configura o modelo Gemini
+    model = setup_gemini_api()
+    warm_start = warm_start or {}
+    # O sinal de parada do desenvolvimento alcança as seções redigidas em paralelo no modo esboço
+    development_stop = threading.Event()
+    generate_dev = _development_function(development_mode, warm_start.get("outline"), development_stop)
+    parts = {}
+    
+    def _collect(streams, stop=None):
+        # Cada etapa é consumida com o seu tempo limite, como em run_stage_graph
+        for name, chunk in _merge_streams(streams, timeouts, cancel_event, stop):
+            parts.setdefault(name, []).append(chunk)
+            yield name, chunk
+    
+    def _text(name):
+        return "".join(parts.get(name, [])).strip()
+    
+    if warm_start.get("titulo"):
+        yield from _collect({"titulo": iter([warm_start["titulo"]])})
+    else:
+        yield from _collect({"titulo": generate_title(model, tema, nivel_academico, stream=True, use_cache=use_cache)})
+    yield from _collect({"introducao": generate_introduction(
+        model, tema, nivel_academico, _text("titulo"), stream=True, use_cache=use_cache)})
+    yield from _collect({"desenvolvimento": generate_dev(
+        model, tema, nivel_academico, _text("titulo"), _text("introducao"), estilo_referencia, stream=True, use_cache=use_cache)},
+        development_stop)
+    
+    # Conclusão e referências dependem apenas do desenvolvimento e são geradas em paralelo
+    yield from _collect({
+        "conclusao": generate_conclusion(model, tema, nivel_academico, _text("titulo"), _text("desenvolvimento"), stream=True, use_cache=use_cache),
+        "referencias": generate_references(model, tema, nivel_academico, _text("desenvolvimento"), estilo_referencia, stream=True, use_cache=use_cache),
+    })
+    
+    sections = {name: _text(name) for name in WORK_STAGES}
+    yield None, _save_generated_work(tema, nivel_academico, estilo_referencia, sections)
+
+# API assíncrona
+# Versões das funções de geração para uso em um laço de eventos (asyncio), com os mesmos prompts, cache,
+# cota e métricas das versões síncronas; muitas gerações simultâneas não ocupam uma thread cada
+async def generate_title_async(model, tema, nivel_academico, use_cache=True):
+    """
+    Versão assíncrona de generate_title
+    """
+    budget = token_budget.plan("titulo", nivel_academico)
+    return await _generate_text_async(model, _title_prompt(tema, nivel_academico), use_cache, stage="titulo", budget=budget)
+
+async def generate_introduction_async(model, tema, nivel_academico, titulo, use_cache=True):
+    """
+    Versão assíncrona de generate_introduction
+    """
+    budget = token_budget.plan("introducao", nivel_academico)
+    return await _generate_text_async(model, _introduction_prompt(tema, nivel_academico, titulo), use_cache, stage="introducao", budget=budget)
+
+async def generate_development_async(model, tema, nivel_academico, titulo, introducao, estilo_referencia, use_cache=True):
+    """
+    Versão assíncrona de generate_development
+    """
+    budget = token_budget.plan("desenvolvimento", nivel_academico)
+    prompt = await _build_prompt_async(_development_prompt, tema, nivel_academico, titulo, introducao, estilo_referencia, model, budget.context_tokens)
+    return await _generate_text_async(model, prompt, use_cache, stage="desenvolvimento", budget=budget)
+
+async def generate_outline_async(model, tema, nivel_academico, titulo, introducao, use_cache=True):
+    """
+    Versão assíncrona de generate_outline
+    """
+    budget = token_budget.plan("esboco", nivel_academico)
+    prompt = await _build_prompt_async(_outline_prompt, tema, nivel_academico, titulo, introducao, model, budget.context_tokens)
+    return _parse_outline(await _generate_text_async(model, prompt, use_cache, stage="esboco", budget=budget))
+
+async def generate_subsection_async(model, tema, nivel_academico, titulo, introducao, outline, index, estilo_referencia, use_cache=True):
+    """
+    Versão assíncrona de generate_subsection
+    """
+    budget = token_budget.plan("subsecao", nivel_academico)
+    prompt = await _build_prompt_async(_subsection_prompt, tema, nivel_academico, titulo, introducao, outline, index, estilo_referencia, model, budget.context_tokens)
+    return await _generate_text_async(model, prompt, use_cache, stage="subsecao", budget=budget)
+
+async def generate_development_outlined_async(model, tema, nivel_academico, titulo, introducao, estilo_referencia, use_cache=True):
+    """
+    Versão assíncrona de generate_development_outlined; as seções são redigidas concorrentemente,
+    no máximo config.OUTLINE_MAX_WORKERS por vez
+    """
+    outline = await generate_outline_async(model, tema, nivel_academico, titulo, introducao, use_cache)
+    if not outline:
+        return await generate_development_async(model, tema, nivel_academico, titulo, introducao, estilo_referencia, use_cache)
+    
+    semaphore = asyncio.Semaphore(config.OUTLINE_MAX_WORKERS)
+    
+    async def _section(i):
+        async with semaphore:
+            return await generate_subsection_async(model, tema, nivel_academico, titulo, introducao, outline, i,
+                                                   estilo_referencia, use_cache)
+    
+    corpos = await asyncio.gather(*[_section(i) for i in range(len(outline))])
+    return _join_subsections(outline, corpos)
+
+async def generate_conclusion_async(model, tema, nivel_academico, titulo, desenvolvimento, use_cache=True):
+    """
+    Versão assíncrona de generate_conclusion
+    """
+    budget = token_budget.plan("conclusao", nivel_academico)
+    prompt = await _build_prompt_async(_conclusion_prompt, tema, nivel_academico, titulo, desenvolvimento, model, budget.context_tokens)
+    return await _generate_text_async(model, prompt, use_cache, stage="conclusao", budget=budget)
+
+async def generate_references_async(model, tema, nivel_academico, desenvolvimento, estilo_referencia, use_cache=True):
+    """
+    Versão assíncrona de generate_references
+    """
+    budget = token_budget.plan("referencias", nivel_academico)
+    prompt = await _build_prompt_async(_references_prompt, tema, nivel_academico, desenvolvimento, estilo_referencia, model, budget.context_tokens)
+    return await _generate_text_async(model, prompt, use_cache, stage="referencias", budget=budget)
+
+async def expand_section_async(model, section_content, section_name, nivel_academico, use_cache=True):
+    """
+    Versão assíncrona de expand_section
+    """
+    budget = token_budget.plan("expandir", nivel_academico, await token_budget.count_tokens_async(model, section_content))
+    prompt = _expand_prompt(section_content, section_name, nivel_academico)
+    return await _generate_text_async(model, prompt, use_cache, stage="expandir", budget=budget)
+
+async def rewrite_section_async(model, section_content, section_name, nivel_academico, use_cache=True):
+    """
+    Versão assíncrona de rewrite_section
+    """
+    budget = token_budget.plan("reescrever", nivel_academico, await token_budget.count_tokens_async(model, section_content))
+    prompt = _rewrite_prompt(section_content, section_name, nivel_academico)
+    return await _generate_text_async(model, prompt, use_cache, stage="reescrever", budget=budget)
+
+# Etapas do trabalho acadêmico na API assíncrona, com as mesmas dependências de WORK_STAGES
+WORK_STAGES_ASYNC = {
+    "titulo": (generate_title_async, WORK_STAGES["titulo"][1]),
+    "introducao": (generate_introduction_async, WORK_STAGES["introducao"][1]),
+    "desenvolvimento": (generate_development_async, WORK_STAGES["desenvolvimento"][1]),
+    "conclusao": (generate_conclusion_async, WORK_STAGES["conclusao"][1]),
+    "referencias": (generate_references_async, WORK_STAGES["referencias"][1]),
+}
+
+DEVELOPMENT_FUNCTIONS_ASYNC = {
+    "completo": generate_development_async,
+    "esboco": generate_development_outlined_async,
+}
+
+async def run_stage_graph_async(stages, inputs, timeouts=None):
+    """
+    Versão assíncrona de run_stage_graph: cada etapa é iniciada assim que suas dependências são resolvidas
+    
+    Args:
+        stages: Dicionário {nome: (função assíncrona, dependências)}
+        inputs: Dicionário com os valores iniciais disponíveis para as etapas
+        timeouts: Dicionário {nome: segundos} com tempos limite por etapa (padrão: config.STAGE_TIMEOUTS / config.STAGE_TIMEOUT)
+        
+    Returns:
+        Dicionário contendo as entradas iniciais e o resultado de cada etapa
+    """
+    if timeouts is None:
+        timeouts = config.STAGE_TIMEOUTS
+    results = dict(inputs)
+    pending = dict(stages)
+    running = {}
+    try:
+        while pending or running:
+            for name, (func, deps) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    del pending[name]
+                    timeout = timeouts.get(name, config.STAGE_TIMEOUT)
+                    task = asyncio.ensure_future(asyncio.wait_for(func(*[results[dep] for dep in deps]), timeout))
+                    running[task] = (name, timeout)
+            
+            if not running:
+                raise ValueError(f"Dependências não satisfeitas para as etapas: {', '.join(pending)}")
+            
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, timeout = running.pop(task)
+                try:
+                    results[name] = task.result()
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"A etapa '{name}' excedeu o tempo limite de {timeout}s") from None
+        
+        return results
+    finally:
+        # Em caso de erro, timeout ou cancelamento, interrompe as etapas em andamento
+        for task in running:
+            task.cancel()
+
+async def generate_academic_work_async(tema, nivel_academico, estilo_referencia, use_cache=True, development_mode=None, model=None):
+    """
+    Versão assíncrona de generate_academic_work
+    
+    Para cancelar a geração, basta cancelar a tarefa que executa esta corrotina.
+    
+    Args:
+        tema: Tema do trabalho acadêmico
+        nivel_academico: Nível acadêmico (Ensino Médio, Graduação, Pós-Graduação)
+        estilo_referencia: Estilo de referência (APA ou ABNT)
+        use_cache: Se False, ignora o cache de respostas em todas as etapas
+        development_mode: "completo" (uma chamada) ou "esboco" (esboço e seções em paralelo); padrão: config.DEVELOPMENT_MODE
+        model: Modelo Gemini já configurado (padrão: setup_gemini_api())
+        
+    Returns:
+        Dicionário contendo todas as seções do trabalho gerado
+    """
+    development_mode = development_mode or config.DEVELOPMENT_MODE
+    if development_mode not in DEVELOPMENT_FUNCTIONS_ASYNC:
+        raise ValueError(f"Modo de desenvolvimento inválido: {development_mode!r}")
+    if model is None:
+        model = setup_gemini_api()
+    
+    stages = dict(WORK_STAGES_ASYNC)
+    stages["desenvolvimento"] = (DEVELOPMENT_FUNCTIONS_ASYNC[development_mode], WORK_STAGES_ASYNC["desenvolvimento"][1])
+    if not use_cache:
+        stages = {name: (functools.partial(func, use_cache=False), deps) for name, (func, deps) in stages.items()}
+    
+    results = await run_stage_graph_async(stages, {
+        "model": model,
+        "tema": tema,
+        "nivel_academico": nivel_academico,
+        "estilo_referencia": estilo_referencia,
+    })
+    
+    # A gravação no histórico é feita em uma thread para não bloquear o laço de eventos
+    return await asyncio.to_thread(_save_generated_work, tema, nivel_academico, estilo_referencia, results)